@@ -0,0 +1,86 @@
+"""Measures writing analytics: snapshot build, cached load and the vectorised metrics.
+
+Usage: python benchmarks/bench_analytics.py [--entries N] [--repeat N]
+
+A throwaway database is filled with a generated journal. The columnar
+snapshot is built from the database, loaded back from its cache file,
+and every metric shown by the analytics screen is computed from it.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from rich.console import Console  # noqa: E402
+from rich.table import Table as RichTable  # noqa: E402
+from journal_app import analytics  # noqa: E402
+from journal_app.config import DatabaseSettings  # noqa: E402
+from journal_app.database import build_engine  # noqa: E402
+from journal_app.migrations import bootstrap  # noqa: E402
+from journal_app.tag_cache import tag_cache  # noqa: E402
+from generate import populate  # noqa: E402
+
+console = Console()
+
+
+def _median(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def compute_metrics(snapshot):
+    days, _, _ = analytics.words_per_day(snapshot)
+    analytics.streaks(days)
+    analytics.longest_gaps(days)
+    analytics.hour_heatmap(snapshot)
+    analytics.tag_cooccurrence(snapshot)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    timings = []
+    with tempfile.TemporaryDirectory() as directory:
+        engine = build_engine(DatabaseSettings(path=os.path.join(directory, "analytics.db")))
+        with engine.connect() as connection:
+            bootstrap(connection)
+        tag_cache.invalidate()
+        session = sessionmaker(bind=engine)()
+        populate(session, args.entries, args.seed)
+        path = os.path.join(directory, "analytics.npz")
+
+        seconds, snapshot = _median(lambda: analytics.build_snapshot(session), args.repeat)
+        timings.append(("Build snapshot from the database", seconds))
+        analytics.save_snapshot(snapshot, path)
+        timings.append(("Load cached snapshot", _median(lambda: analytics.get_snapshot(session, path), args.repeat)[0]))
+        timings.append(("All metrics", _median(lambda: compute_metrics(snapshot), args.repeat)[0]))
+        size = os.path.getsize(path)
+        session.close()
+        engine.dispose()
+
+    table = RichTable(title=f"Writing analytics, {args.entries} entries (snapshot {size / 1024:.0f} KiB)",
+                      header_style="bold magenta")
+    table.add_column("Operation", style="green")
+    table.add_column(f"Median of {args.repeat}", justify="right")
+    for name, seconds in timings:
+        table.add_row(name, f"{seconds * 1000:.2f} ms")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Measures the read-only HTTP API: cold and cached responses, and 304 revalidation.
+
+Usage: python benchmarks/bench_api.py [--entries N] [--repeat N]
+
+A throwaway database is filled with a generated journal and served on a
+free local port. Each endpoint is fetched once cold, then again from the
+response cache, then revalidated with If-None-Match; the SQL statements
+run for each kind of request are counted alongside the latency.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from rich.console import Console  # noqa: E402
+from rich.table import Table as RichTable  # noqa: E402
+from journal_app.api import APIServer, JournalAPI  # noqa: E402
+from journal_app.config import DatabaseSettings  # noqa: E402
+from journal_app.database import build_engine  # noqa: E402
+from journal_app.migrations import bootstrap  # noqa: E402
+from journal_app.query_cache import file_signature  # noqa: E402
+from journal_app.tag_cache import tag_cache  # noqa: E402
+from generate import populate  # noqa: E402
+
+console = Console()
+ENDPOINTS = ("/entries?limit=20", "/search?q=coffee", "/search?tags=Tag001&year=2020", "/tags", "/stats")
+
+
+def fetch(url, etag=None):
+    """Returns (status, etag, seconds) for one GET."""
+    request = urllib.request.Request(url, headers={'If-None-Match': etag} if etag else {})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status, etag = response.status, response.headers['ETag']
+    except urllib.error.HTTPError as e:
+        status, etag = e.code, e.headers['ETag']
+    return status, etag, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "api.db")
+        engine = build_engine(DatabaseSettings(path=path))
+        with engine.connect() as connection:
+            bootstrap(connection)
+        tag_cache.invalidate()
+        session_factory = sessionmaker(bind=engine)
+        session = session_factory()
+        populate(session, args.entries, args.seed)
+        session.close()
+
+        statements = []
+        event.listen(engine, "after_cursor_execute", lambda *_: statements.append(1))
+        server = APIServer(("127.0.0.1", 0), JournalAPI(session_factory, file_signature(path)), quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            for endpoint in ENDPOINTS:
+                url = base + endpoint
+                statements.clear()
+                status, etag, cold = fetch(url)
+                cold_queries = len(statements)
+                statements.clear()
+                cached = statistics.median(fetch(url)[2] for _ in range(args.repeat))
+                cached_queries = len(statements) / args.repeat
+                statements.clear()
+                results = [fetch(url, etag) for _ in range(args.repeat)]
+                revalidated = statistics.median(result[2] for result in results)
+                assert all(result[0] == 304 for result in results), results[0]
+                rows.append((endpoint, cold, cold_queries, cached, cached_queries, revalidated,
+                             len(statements) / args.repeat))
+        finally:
+            server.shutdown()
+            server.server_close()
+            engine.dispose()
+
+    table = RichTable(title=f"Read-only HTTP API, {args.entries} entries (median of {args.repeat})",
+                      header_style="bold magenta")
+    table.add_column("Endpoint", style="green")
+    table.add_column("Cold", justify="right")
+    table.add_column("Cached 200", justify="right")
+    table.add_column("304", justify="right")
+    table.add_column("SQL per request (cold/cached/304)", justify="right")
+    for endpoint, cold, cold_queries, cached, cached_queries, revalidated, revalidated_queries in rows:
+        table.add_row(endpoint, f"{cold * 1000:.2f} ms", f"{cached * 1000:.2f} ms", f"{revalidated * 1000:.2f} ms",
+                      f"{cold_queries} / {cached_queries:g} / {revalidated_queries:g}")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
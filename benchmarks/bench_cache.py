@@ -0,0 +1,123 @@
+"""Measures the query result cache on repeated listing and search screens.
+
+Usage: python benchmarks/bench_cache.py [--entries N] [--repeat N] [--cache-size N]
+
+A throwaway database is filled with a generated journal. Each scenario
+(first page of the listing, a month, a keyword search, a tag expression)
+is timed the way the menu runs it: query, build the Rich table and render
+it. 'Uncached' bypasses the cache; 'cached' repeats the same query
+through cli.cached_listing, which keeps the rendered table. The last column times the first run after a
+write, which must miss. Cache counters are printed at the end.
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from rich.console import Console  # noqa: E402
+from rich.table import Table as RichTable  # noqa: E402
+from journal_app.config import DatabaseSettings  # noqa: E402
+from journal_app.database import build_engine, build_query_cache  # noqa: E402
+from journal_app.migrations import bootstrap  # noqa: E402
+from journal_app import cli  # noqa: E402
+from journal_app.cli import build_entries_table, cached_listing  # noqa: E402
+from journal_app.queries import page_entries, month_range  # noqa: E402
+from journal_app.query_cache import keyword_key  # noqa: E402
+from journal_app.tag_cache import tag_cache  # noqa: E402
+from journal_app import services  # noqa: E402
+from generate import populate  # noqa: E402
+
+console = Console()
+
+# A write that leaves the data as it was but still has to invalidate the cache.
+TOUCH = text("UPDATE entries SET is_private = is_private WHERE id = 1")
+
+
+def timed(function, repeat):
+    """Runs function repeat times and returns the median wall time in seconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def scenarios(session):
+    start, end = month_range(2020, 6)
+    return [
+        ("First page", ('page', 20, None, None), lambda: (page_entries(session, 20), None)),
+        ("Month 2020-06", ('dates', start, end), lambda: (services.search_dates(session, start, end), None)),
+        ("Keyword 'garden tired'", ('keyword', keyword_key("garden tired")),
+         lambda: services.search_keyword(session, "garden tired")),
+        ("Tags 'Tag020 AND NOT Tag001'", ('tags', "Tag020 AND NOT Tag001", None, None, None),
+         lambda: services.search_tags(session, "Tag020 AND NOT Tag001")),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--cache-size", type=int, default=128)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Render into a wide, discarded buffer so terminal output does not skew the timings.
+    sink = Console(file=io.StringIO(), width=160)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        settings = DatabaseSettings(path=os.path.join(directory, "cache.db"), query_cache_size=args.cache_size)
+        engine = build_engine(settings)
+        with engine.connect() as connection:
+            bootstrap(connection)
+        tag_cache.invalidate()
+        # cached_listing uses the app's cache; point it at this database's instead.
+        cache = cli.query_cache = build_query_cache(engine, settings)
+        session = sessionmaker(bind=engine)()
+        populate(session, args.entries, args.seed)
+
+        for name, key, fetch in scenarios(session):
+            def show():
+                rows, snippets = fetch()
+                sink.print(build_entries_table(rows, snippets))
+
+            def show_cached():
+                sink.print(cached_listing(key, fetch, sink)[1])
+
+            def after_write():
+                session.execute(TOUCH)
+                session.commit()
+                show_cached()
+
+            uncached = timed(show, args.repeat)
+            show_cached()  # warm up
+            cached = timed(show_cached, args.repeat)
+            results.append((name, uncached, cached, timed(after_write, max(3, args.repeat // 4))))
+        stats = cache.stats()
+        session.close()
+        engine.dispose()
+
+    table = RichTable(title=f"Query cache, {args.entries} entries (median of {args.repeat})",
+                      header_style="bold magenta")
+    for column in ("Scenario", "Uncached", "Cached", "Speed-up", "After write"):
+        table.add_column(column, justify="left" if column == "Scenario" else "right")
+    for name, uncached, cached, after_write in results:
+        table.add_row(name, f"{uncached * 1000:.2f} ms", f"{cached * 1000:.2f} ms",
+                      f"{uncached / cached:.0f}x", f"{after_write * 1000:.2f} ms")
+    console.print(table)
+    console.print(f"Counters: {stats.hits} hits, {stats.misses} misses, {stats.evictions} evictions, "
+                  f"{stats.invalidations} invalidations.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Compares entry content storage codecs for on-disk size and read latency.
+
+Usage: python benchmarks/bench_content.py [--entries N] [--threshold BYTES] [--repeat N]
+
+For each codec (none, zlib and, when the zstandard package is installed,
+zstd) a throwaway database is filled with the same generated journal, then
+checkpointed and vacuumed before its file size is measured. List latency is
+timed for the listing query, for an ORM listing with content deferred (the
+default) and with content loaded (the old behaviour); detail latency covers
+loading one entry and rendering Entry.display(), which decompresses.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, func, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker, undefer  # noqa: E402
+from rich.console import Console  # noqa: E402
+from rich.table import Table as RichTable  # noqa: E402
+from journal_app.config import DatabaseSettings  # noqa: E402
+from journal_app.content_codec import zstandard  # noqa: E402
+from journal_app.database import build_engine  # noqa: E402
+from journal_app.migrations import bootstrap  # noqa: E402
+from journal_app.models import Entry  # noqa: E402
+from journal_app.queries import page_entries  # noqa: E402
+from journal_app.tag_cache import tag_cache  # noqa: E402
+from generate import populate  # noqa: E402
+
+console = Console()
+
+
+def timed(function, repeat):
+    """Runs function repeat times and returns the median wall time in seconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def run_codec(codec, directory, entries, threshold, repeat, seed):
+    path = os.path.join(directory, f"content_{codec}.db")
+    engine = build_engine(DatabaseSettings(path=path, compression=codec, compression_threshold=threshold))
+    with engine.connect() as connection:
+        bootstrap(connection)
+    tag_cache.invalidate()
+    Session = sessionmaker(bind=engine)
+    session = Session()
+
+    started = time.perf_counter()
+    populate(session, entries, seed)
+    insert_seconds = time.perf_counter() - started
+    session.close()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        connection.exec_driver_sql("VACUUM")
+        stored = connection.execute(text("SELECT sum(length(CAST(content AS BLOB))) FROM entries")).scalar()
+        compressed = connection.execute(text("SELECT count(*) FROM entries WHERE typeof(content) = 'blob'")).scalar()
+
+    session = Session()
+    max_id = session.scalar(select(func.max(Entry.id)))
+    rng = random.Random(seed)
+    detail_ids = iter([rng.randint(1, max_id) for _ in range(repeat)])
+    newest = select(Entry).order_by(Entry.date.desc(), Entry.id.desc()).limit(100)
+
+    def detail():
+        session.expunge_all()
+        session.get(Entry, next(detail_ids)).display()
+
+    result = {
+        'codec': codec,
+        'file_bytes': os.path.getsize(path),
+        'content_bytes': stored,
+        'compressed_rows': compressed,
+        'insert': insert_seconds,
+        'list_rows': timed(lambda: page_entries(session, 100), repeat),
+        'list_orm_deferred': timed(lambda: (session.expunge_all(), session.scalars(newest).all()), repeat),
+        'list_orm_with_content': timed(
+            lambda: (session.expunge_all(), session.scalars(newest.options(undefer(Entry.content))).all()), repeat
+        ),
+        'detail': timed(detail, repeat),
+    }
+    session.close()
+    engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--threshold", type=int, default=1024, help="compression threshold in bytes")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    codecs = ['none', 'zlib'] + (['zstd'] if zstandard is not None else [])
+    with tempfile.TemporaryDirectory() as directory:
+        results = [run_codec(codec, directory, args.entries, args.threshold, args.repeat, args.seed) for codec in codecs]
+
+    table = RichTable(title=f"Content storage, {args.entries} entries, threshold {args.threshold} B",
+                      header_style="bold magenta")
+    for column in ("Codec", "File", "Content", "Packed", "Insert", "List", "ORM", "ORM+body", "Detail"):
+        table.add_column(column, justify="left" if column == "Codec" else "right")
+    for result in results:
+        table.add_row(
+            result['codec'],
+            f"{result['file_bytes'] / 1048576:.1f} MiB",
+            f"{result['content_bytes'] / 1048576:.1f} MiB",
+            str(result['compressed_rows']),
+            f"{result['insert']:.2f} s",
+            *(f"{result[key] * 1000:.2f} ms"
+              for key in ('list_rows', 'list_orm_deferred', 'list_orm_with_content', 'detail')),
+        )
+    console.print(table)
+    console.print("List: listing query. ORM: 100 entries with content deferred; ORM+body: with content loaded.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Compares SQLite engine configurations for write and concurrent-read throughput.
+
+Usage: python benchmarks/bench_engine.py [--writes N] [--readers N] [--reads N]
+
+Runs against throwaway databases in a temporary directory, once with SQLite's
+stock settings (rollback journal, synchronous=FULL) and once with the app's
+defaults from journal_app.config (WAL, synchronous=NORMAL, larger cache, mmap).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import replace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from rich.console import Console  # noqa: E402
+from rich.table import Table as RichTable  # noqa: E402
+from journal_app.config import DatabaseSettings  # noqa: E402
+from journal_app.database import build_engine  # noqa: E402
+from journal_app.migrations import bootstrap  # noqa: E402
+from journal_app.models import Entry  # noqa: E402
+from journal_app.queries import page_entries  # noqa: E402
+
+STOCK = dict(journal_mode="delete", synchronous="full", cache_size=-2000, mmap_size=0, temp_store="default")
+
+
+def setup(settings):
+    engine = build_engine(settings)
+    with engine.connect() as connection:
+        bootstrap(connection)
+    return engine, sessionmaker(bind=engine)
+
+
+def bench_writes(Session, writes):
+    """One committed transaction per entry, like the interactive add path."""
+    started = time.perf_counter()
+    for i in range(writes):
+        session = Session()
+        session.add(Entry(title=f"Entry {i}", content="Some journal text " * 20))
+        session.commit()
+        session.close()
+    return writes / (time.perf_counter() - started)
+
+
+def bench_concurrent_reads(Session, readers, reads):
+    """Reader threads page through entries while one writer keeps committing."""
+    stop = threading.Event()
+    written = [0]
+
+    def writer():
+        session = Session()
+        while not stop.is_set():
+            session.add(Entry(title="Concurrent", content="written during reads"))
+            session.commit()
+            written[0] += 1
+        session.close()
+
+    def reader():
+        session = Session()
+        for _ in range(reads):
+            page_entries(session, 20)
+            session.rollback()
+        session.close()
+
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    writer_thread.join()
+    return readers * reads / elapsed, written[0] / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=1000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--reads", type=int, default=500)
+    args = parser.parse_args()
+
+    table = RichTable(title="SQLite engine configuration", header_style="bold magenta")
+    table.add_column("Configuration")
+    table.add_column("Writes/sec", justify="right")
+    table.add_column("Concurrent reads/sec", justify="right")
+    table.add_column("Writes/sec during reads", justify="right")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, overrides in (("stock", STOCK), ("tuned", {})):
+            settings = replace(DatabaseSettings(path=os.path.join(directory, f"{name}.db")), **overrides)
+            engine, Session = setup(settings)
+            writes = bench_writes(Session, args.writes)
+            reads, concurrent_writes = bench_concurrent_reads(Session, args.readers, args.reads)
+            engine.dispose()
+            table.add_row(name, f"{writes:,.0f}", f"{reads:,.0f}", f"{concurrent_writes:,.0f}")
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
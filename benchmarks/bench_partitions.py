@@ -0,0 +1,126 @@
+"""Compares the single-file layout with past years archived to per-year partition files.
+
+Usage: python benchmarks/bench_partitions.py [--entries N] [--repeat N]
+
+A generated journal (dates spread over 2015-2024) is written once and
+copied; in the copy every year before 2024 is archived, standing in for
+"the current year stays live". The same listings and searches run against
+both, followed by the maintenance work that grows with the live file:
+VACUUM and an online backup.
+"""
+import argparse
+import datetime
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from rich.console import Console  # noqa: E402
+from rich.table import Table as RichTable  # noqa: E402
+from journal_app import partitions  # noqa: E402
+from journal_app.backup import create_backup  # noqa: E402
+from journal_app.config import DatabaseSettings  # noqa: E402
+from journal_app.database import build_engine  # noqa: E402
+from journal_app.migrations import bootstrap  # noqa: E402
+from journal_app.queries import month_range, year_range  # noqa: E402
+from journal_app.tag_cache import tag_cache  # noqa: E402
+from generate import populate  # noqa: E402
+
+console = Console()
+LIVE_YEAR = 2024
+
+
+def _median(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def _open(path):
+    engine = build_engine(DatabaseSettings(path=path))
+    return engine, sessionmaker(bind=engine)()
+
+
+def measure(path, directory, repeat):
+    engine, session = _open(path)
+    old_key = (datetime.datetime(2018, 6, 1), 0)
+    scenarios = [
+        ("First page (20)", lambda: partitions.page_entries(session, 20)),
+        ("Page from mid-2018", lambda: partitions.page_entries(session, 20, after=old_key)),
+        (f"Month in {LIVE_YEAR}", lambda: partitions.search_dates(session, *month_range(LIVE_YEAR, 6))),
+        ("Month in 2017", lambda: partitions.search_dates(session, *month_range(2017, 3))),
+        ("Tag in 2016", lambda: partitions.search_tags(session, "Tag001", None, *year_range(2016))),
+        ("Keyword, all years", lambda: partitions.search_keyword(session, "coffee")),
+    ]
+    results = {name: _median(function, repeat) for name, function in scenarios}
+    session.close()
+    results["Live file size"] = os.path.getsize(path)
+    results["Online backup"] = _median(lambda: create_backup(engine, os.path.join(directory, "backups"), pages=-1, sleep=0), 1)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        started = time.perf_counter()
+        connection.exec_driver_sql("VACUUM")
+        results["VACUUM"] = time.perf_counter() - started
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        single = os.path.join(directory, "single", "journal.db")
+        partitioned = os.path.join(directory, "partitioned", "journal.db")
+        os.makedirs(os.path.dirname(single))
+        os.makedirs(os.path.dirname(partitioned))
+        engine, session = _open(single)
+        with engine.connect() as connection:
+            bootstrap(connection)
+        tag_cache.invalidate()
+        populate(session, args.entries, args.seed)
+        session.close()
+        engine.dispose()
+        shutil.copyfile(single, partitioned)
+
+        engine, session = _open(partitioned)
+        started = time.perf_counter()
+        archived = partitions.archive_years(session, LIVE_YEAR)
+        session.close()
+        partitions.compact_database(engine)
+        migration = time.perf_counter() - started
+        engine.dispose()
+
+        baseline = measure(single, os.path.dirname(single), args.repeat)
+        split = measure(partitioned, os.path.dirname(partitioned), args.repeat)
+
+    table = RichTable(
+        title=f"Single file vs {len(archived)} archived years, {args.entries} entries "
+              f"(migration {migration:.2f} s)",
+        header_style="bold magenta",
+    )
+    table.add_column("Operation", style="green")
+    table.add_column("Single file", justify="right")
+    table.add_column("Partitioned", justify="right")
+    for name in baseline:
+        if name == "Live file size":
+            table.add_row(name, f"{baseline[name] / 2**20:.1f} MiB", f"{split[name] / 2**20:.1f} MiB")
+        else:
+            table.add_row(name, f"{baseline[name] * 1000:.2f} ms", f"{split[name] * 1000:.2f} ms")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Measures the related-entries similarity index: build, query and incremental update.
+
+Usage: python benchmarks/bench_similarity.py [--entries N] [--repeat N]
+
+A throwaway database is filled with a generated journal. The index is
+built from scratch, reopened from disk (memory-mapped), queried for the
+top 5 related entries of random entries, and brought up to date after
+100 entries are edited and 100 deleted.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, func, update, delete  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from rich.console import Console  # noqa: E402
+from rich.table import Table as RichTable  # noqa: E402
+from journal_app.config import DatabaseSettings  # noqa: E402
+from journal_app.database import build_engine  # noqa: E402
+from journal_app.migrations import bootstrap  # noqa: E402
+from journal_app.models import Entry  # noqa: E402
+from journal_app.similarity import SimilarityIndex  # noqa: E402
+from journal_app.tag_cache import tag_cache  # noqa: E402
+from generate import populate  # noqa: E402
+
+console = Console()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    timings = []
+    with tempfile.TemporaryDirectory() as directory:
+        engine = build_engine(DatabaseSettings(path=os.path.join(directory, "similarity.db")))
+        with engine.connect() as connection:
+            bootstrap(connection)
+        tag_cache.invalidate()
+        session = sessionmaker(bind=engine)()
+        populate(session, args.entries, args.seed)
+        max_id = session.scalar(select(func.max(Entry.id)))
+        index_directory = os.path.join(directory, "index")
+
+        started = time.perf_counter()
+        SimilarityIndex(index_directory).rebuild(session)
+        timings.append(("Build", time.perf_counter() - started))
+
+        started = time.perf_counter()
+        index = SimilarityIndex(index_directory)
+        index.sync(session)
+        timings.append(("Open (memory-mapped)", time.perf_counter() - started))
+
+        samples = []
+        for _ in range(args.repeat):
+            entry_id = rng.randint(1, max_id)
+            started = time.perf_counter()
+            index.related(session, entry_id, 5)
+            samples.append(time.perf_counter() - started)
+        timings.append((f"Related, top 5 (median of {args.repeat})", statistics.median(samples)))
+
+        edited = rng.sample(range(1, max_id + 1), 200)
+        session.execute(update(Entry).where(Entry.id.in_(edited[:100])).values(title=Entry.title + " revised"))
+        session.execute(delete(Entry).where(Entry.id.in_(edited[100:])))
+        session.commit()
+        started = time.perf_counter()
+        applied = index.sync(session)
+        timings.append((f"Sync {applied} changes", time.perf_counter() - started))
+        session.close()
+        engine.dispose()
+
+    table = RichTable(title=f"Similarity index, {args.entries} entries", header_style="bold magenta")
+    table.add_column("Operation", style="green")
+    table.add_column("Time", justify="right")
+    for name, seconds in timings:
+        table.add_row(name, f"{seconds * 1000:.2f} ms")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Measures how long main.py takes to start, against a wall-clock budget.
+
+Usage: python benchmarks/bench_startup.py [--repeat N] [--menu-budget MS] [--command-budget MS]
+
+Each scenario runs main.py in a fresh interpreter against a throwaway
+database: time until the interactive menu is on screen, a small subcommand
+('list --limit 1') against a current schema, the same on a brand-new
+database (full bootstrap), and '--help'. It then runs
+'python -X importtime' for the menu and subcommand paths and lists the
+slowest top-level imports. Exits with status 1 when a median exceeds its budget.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+sys.path.insert(0, ROOT)
+
+from rich.console import Console  # noqa: E402
+from rich.table import Table as RichTable  # noqa: E402
+
+console = Console()
+
+MENU_PROMPT = b"Enter your choice:"
+
+
+def _environ(db_path):
+    return dict(os.environ, JOURNAL_DB_PATH=db_path)
+
+
+def time_to_menu(db_path):
+    """Seconds from process start until the menu prompt is printed."""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, MAIN], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL, env=_environ(db_path),
+    )
+    output = b""
+    while MENU_PROMPT not in output:
+        chunk = process.stdout.read1(4096)
+        if not chunk:
+            raise RuntimeError("main.py exited before showing the menu")
+        output += chunk
+    elapsed = time.perf_counter() - started
+    process.communicate(b"q\n")
+    return elapsed
+
+
+def time_command(db_path, *args):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, MAIN, *args], check=True, stdout=subprocess.DEVNULL, env=_environ(db_path))
+    return time.perf_counter() - started
+
+
+def import_profile(db_path, args, stdin=None, top=8):
+    """Runs main.py under -X importtime; returns the slowest (cumulative microseconds, module) top-level imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", MAIN, *args], input=stdin, capture_output=True, env=_environ(db_path),
+    )
+    imports = []
+    for line in result.stderr.decode().splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith(" ") or name.startswith("  "):
+            continue  # only modules imported directly by the program, not their dependencies
+        imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def median_ms(function, repeat):
+    return statistics.median(function() for _ in range(repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--menu-budget", type=float, default=250, help="milliseconds until the menu is shown")
+    parser.add_argument("--command-budget", type=float, default=1000,
+                        help="milliseconds for a subcommand on a current schema")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "startup.db")
+        time_command(db_path, "list", "--limit", "1")  # create the schema once
+
+        def fresh_database():
+            path = os.path.join(directory, f"fresh_{time.perf_counter_ns()}.db")
+            return time_command(path, "list", "--limit", "1")
+
+        results = [
+            ("Menu shown", median_ms(lambda: time_to_menu(db_path), args.repeat), args.menu_budget),
+            ("list --limit 1", median_ms(lambda: time_command(db_path, "list", "--limit", "1"), args.repeat),
+             args.command_budget),
+            ("list on a new database", median_ms(fresh_database, args.repeat), None),
+            ("--help", median_ms(lambda: time_command(db_path, "--help"), args.repeat), None),
+        ]
+        menu_imports = import_profile(db_path, [], stdin=b"q\n")
+        command_imports = import_profile(db_path, ["list", "--limit", "1"])
+
+    table = RichTable(title=f"Startup time (median of {args.repeat})", header_style="bold magenta")
+    table.add_column("Scenario", style="green")
+    table.add_column("Wall time", justify="right")
+    table.add_column("Budget", justify="right")
+    over_budget = False
+    for name, milliseconds, budget in results:
+        status = "-"
+        if budget is not None:
+            ok = milliseconds <= budget
+            over_budget = over_budget or not ok
+            status = f"[{'green' if ok else 'red'}]{budget:.0f} ms[/]"
+        table.add_row(name, f"{milliseconds:.0f} ms", status)
+    console.print(table)
+
+    for title, imports in (("menu", menu_imports), ("list", command_imports)):
+        imports_table = RichTable(title=f"Slowest top-level imports ({title})", header_style="bold magenta")
+        imports_table.add_column("Module", style="cyan")
+        imports_table.add_column("Cumulative", justify="right")
+        for microseconds, module in imports:
+            imports_table.add_row(module, f"{microseconds / 1000:.1f} ms")
+        console.print(imports_table)
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
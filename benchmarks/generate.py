@@ -0,0 +1,119 @@
+"""Deterministic synthetic journal generator for benchmarks.
+
+Usage: python benchmarks/generate.py ENTRIES [--db PATH | --jsonl PATH] [--seed N]
+
+Entries get log-normally distributed content lengths, dates spread evenly
+(with jitter) over several years, Zipf-distributed words so full-text search
+sees realistic term frequencies, and a Zipfian tag distribution where a few
+tags are on many entries and most tags are rare.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMMON_WORDS = (
+    "today went work home friend family morning evening coffee walk read book "
+    "meeting project idea travel city train rain sun dinner lunch music film "
+    "garden run tired happy plan week weekend call write note think learn"
+).split()
+SYLLABLES = ["ka", "lo", "mi", "ne", "su", "ta", "ri", "po", "de", "fa", "gu", "ze", "vo", "ba", "chi"]
+
+
+def _zipf_weights(count, exponent=1.1):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def build_vocabulary(rng, size=5000):
+    """Returns common words followed by deterministic pseudo-words, most frequent first."""
+    words = list(COMMON_WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def generate_records(count, seed=42, years=10, tag_count=200, end=datetime.datetime(2025, 1, 1)):
+    """Yields count normalised entry records, identical for the same arguments."""
+    rng = random.Random(seed)
+    vocabulary = build_vocabulary(rng)
+    word_weights = list(itertools.accumulate(_zipf_weights(len(vocabulary))))
+    tags = [f"Tag{rank:03d}" for rank in range(1, tag_count + 1)]
+    tag_weights = list(itertools.accumulate(_zipf_weights(tag_count, 1.3)))
+    start = end - datetime.timedelta(days=365 * years)
+    step = (end - start) / max(count, 1)
+
+    for i in range(count):
+        # Median ~120 words with a long tail of long-form entries.
+        length = max(3, min(5000, int(rng.lognormvariate(math.log(120), 0.8))))
+        words = rng.choices(vocabulary, cum_weights=word_weights, k=length)
+        title_words = rng.choices(vocabulary, cum_weights=word_weights, k=rng.randint(2, 6))
+        jitter = datetime.timedelta(seconds=rng.randint(0, max(int(step.total_seconds()), 1)))
+        tag_total = min(tag_count, int(rng.expovariate(1 / 2.5)))
+        yield {
+            'title': " ".join(title_words).capitalize(),
+            'content': " ".join(words),
+            'date': start + step * i + jitter,
+            'is_private': rng.random() < 0.7,
+            'tags': sorted(set(rng.choices(tags, cum_weights=tag_weights, k=tag_total))),
+        }
+
+
+def populate(session, count, seed=42, batch_size=5000, **kwargs):
+    """Inserts generated entries through the bulk import path. Returns the number inserted."""
+    from journal_app.transfer import insert_batch
+    records = generate_records(count, seed, **kwargs)
+    inserted = 0
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return inserted
+        insert_batch(session, batch)
+        session.commit()
+        inserted += len(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("entries", type=int)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--db", help="SQLite database file to create or extend")
+    target.add_argument("--jsonl", help="write records as JSON Lines instead")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--tags", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.jsonl:
+        with open(args.jsonl, "w", encoding="utf-8") as handle:
+            for record in generate_records(args.entries, args.seed, args.years, args.tags):
+                handle.write(json.dumps(dict(record, date=record['date'].isoformat())) + "\n")
+        return
+
+    from sqlalchemy.orm import sessionmaker
+    from journal_app.config import DatabaseSettings
+    from journal_app.database import build_engine
+    from journal_app.migrations import bootstrap
+
+    engine = build_engine(DatabaseSettings(path=args.db))
+    with engine.connect() as connection:
+        bootstrap(connection)
+    session = sessionmaker(bind=engine)()
+    try:
+        populate(session, args.entries, args.seed, years=args.years, tag_count=args.tags)
+    finally:
+        session.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
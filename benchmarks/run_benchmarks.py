@@ -0,0 +1,181 @@
+"""Benchmark suite for the journal's main operations at several dataset sizes.
+
+Usage: python benchmarks/run_benchmarks.py [--sizes 10000 100000 1000000]
+                                           [--output results.json] [--compare old.json]
+
+For each size a fresh temporary database is filled by benchmarks/generate.py
+and the suite times insert, list (first and deep page), keyword search, date
+search, tag add/remove and delete. Results are written as JSON together with
+the git commit, so runs from different commits can be compared with --compare.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, func  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from rich.console import Console  # noqa: E402
+from rich.table import Table as RichTable  # noqa: E402
+from journal_app.config import DatabaseSettings  # noqa: E402
+from journal_app.database import build_engine  # noqa: E402
+from journal_app.migrations import bootstrap  # noqa: E402
+from journal_app.models import Entry  # noqa: E402
+from journal_app.queries import page_entries, month_range  # noqa: E402
+from journal_app.tag_cache import tag_cache  # noqa: E402
+from journal_app import services  # noqa: E402
+from generate import populate, build_vocabulary  # noqa: E402
+
+console = Console()
+
+
+def timed(function, repeat):
+    """Runs function repeat times and returns the median wall time in seconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_size(size, directory, repeat, seed):
+    """Builds a database of size entries and times each operation against it."""
+    engine = build_engine(DatabaseSettings(path=os.path.join(directory, f"bench_{size}.db")))
+    with engine.connect() as connection:
+        bootstrap(connection)
+    Session = sessionmaker(bind=engine)
+    tag_cache.invalidate()  # ids from the previous database must not leak into this one
+    session = Session()
+    rng = random.Random(seed)
+    results = []
+
+    def record(operation, seconds, count=1):
+        results.append({
+            'size': size, 'operation': operation, 'seconds': seconds,
+            'ops_per_second': count / seconds if seconds else None,
+        })
+
+    started = time.perf_counter()
+    populate(session, size, seed)
+    record('insert', time.perf_counter() - started, size)
+
+    max_id = session.scalar(select(func.max(Entry.id)))
+    vocabulary = build_vocabulary(random.Random(seed))
+    record('list_first_page', timed(lambda: page_entries(session, 20), repeat))
+
+    # Seek to roughly the middle of the journal to show page depth does not matter.
+    middle = session.execute(
+        select(Entry.date, Entry.id).order_by(Entry.date.desc(), Entry.id.desc()).offset(size // 2).limit(1)
+    ).first()
+    if middle:
+        record('list_deep_page', timed(lambda: page_entries(session, 20, after=tuple(middle)), repeat))
+
+    record('keyword_search_common', timed(lambda: services.search_keyword(session, vocabulary[0]), repeat))
+    record('keyword_search_rare', timed(lambda: services.search_keyword(session, vocabulary[-1]), repeat))
+    record('keyword_search_prefix', timed(lambda: services.search_keyword(session, vocabulary[40][:3] + "*"), repeat))
+    record('date_search_month', timed(lambda: services.search_dates(session, *month_range(2020, 6)), repeat))
+    record('date_search_day', timed(
+        lambda: services.search_dates(session, datetime.datetime(2020, 6, 1), datetime.datetime(2020, 6, 2)), repeat
+    ))
+
+    entry_ids = [rng.randint(1, max_id) for _ in range(repeat)]
+    tag_names = [f"Bench{n}" for n in range(10)]
+
+    def tag_add_remove():
+        entry = services.get_entry(session, entry_ids[rng.randrange(len(entry_ids))])
+        services.change_entry_tags(session, entry, add=tag_names)
+        session.commit()
+        services.change_entry_tags(session, entry, remove=tag_names)
+        session.commit()
+    record('tag_add_remove_10', timed(tag_add_remove, repeat))
+
+    delete_ids = iter(rng.sample(range(1, max_id + 1), repeat))
+    record('delete_entry', timed(lambda: services.delete_entry(session, next(delete_ids)), repeat))
+
+    session.close()
+    engine.dispose()
+    return results
+
+
+def print_results(results, baseline=None):
+    table = RichTable(show_header=True, header_style="bold magenta")
+    table.add_column("Size", justify="right")
+    table.add_column("Operation", style="green")
+    table.add_column("Time", justify="right", style="cyan")
+    table.add_column("Ops/sec", justify="right")
+    if baseline:
+        table.add_column("vs baseline", justify="right")
+    previous = {(r['size'], r['operation']): r['seconds'] for r in (baseline or {}).get('results', [])}
+    for result in results:
+        row = [
+            f"{result['size']:,}", result['operation'],
+            f"{result['seconds'] * 1000:.2f} ms",
+            f"{result['ops_per_second']:,.0f}" if result['ops_per_second'] else "-",
+        ]
+        if baseline:
+            old = previous.get((result['size'], result['operation']))
+            if old:
+                change = (result['seconds'] - old) / old * 100
+                style = "red" if change > 10 else "green" if change < -10 else "white"
+                row.append(f"[{style}]{change:+.0f}%[/{style}]")
+            else:
+                row.append("-")
+        table.add_row(*row)
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20, help="samples per timed operation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            console.print(f"[dim]Benchmarking {size:,} entries...[/dim]")
+            results.extend(run_size(size, directory, args.repeat, args.seed))
+
+    report = {
+        'commit': git_commit(),
+        'created': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'results': results,
+    }
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+    print_results(results, baseline)
+    console.print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
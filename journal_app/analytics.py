@@ -0,0 +1,215 @@
+import datetime
+import importlib.util
+import os
+from collections import namedtuple
+from sqlalchemy import func, select
+from .change_state import change_version
+from .models import Entry, Tag, entry_tag_association
+
+# numpy is optional and slow to import; it is loaded the first time a snapshot is used.
+numpy = None
+
+SNAPSHOT_VERSION = 1
+DEFAULT_CHUNK_SIZE = 1000
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+Snapshot = namedtuple('Snapshot', ['ids', 'dates', 'is_private', 'word_counts', 'tag_offsets', 'tag_ids', 'version'])
+Streaks = namedtuple('Streaks', ['current', 'longest', 'longest_start', 'longest_end'])
+Gap = namedtuple('Gap', ['days', 'after', 'before'])
+
+
+class AnalyticsUnavailable(RuntimeError):
+    """Raised when analytics are used without numpy installed."""
+
+
+def available() -> bool:
+    """Reports whether numpy is installed, without importing it."""
+    return numpy is not None or importlib.util.find_spec("numpy") is not None
+
+
+def _numpy():
+    global numpy
+    if numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            raise AnalyticsUnavailable("Writing analytics need the 'numpy' package.") from None
+    return numpy
+
+
+def build_snapshot(session, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Snapshot:
+    """Streams (id, date, privacy, word count) and tag links out of the database into NumPy arrays.
+
+    Rows arrive chunk_size at a time and only the word count of each
+    entry's content is kept. Dates are UTC-naive seconds since the epoch
+    (datetime64[s]); entries without a date are left out. Tags are stored
+    in CSR form: the tag ids of entry i are tag_ids[tag_offsets[i]:tag_offsets[i + 1]].
+    """
+    np = _numpy()
+    version = change_version(session)
+    seconds = func.cast(func.strftime('%s', Entry.date), Entry.id.type)
+    statement = (
+        select(Entry.id, seconds.label('seconds'), Entry.is_private, Entry.content)
+        .where(Entry.date.is_not(None))
+        .order_by(Entry.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    ids, dates, private, words = [], [], [], []
+    for partition in session.execute(statement).partitions():
+        ids.append(np.fromiter((row.id for row in partition), np.int64, len(partition)))
+        dates.append(np.fromiter((row.seconds for row in partition), np.int64, len(partition)))
+        private.append(np.fromiter((bool(row.is_private) for row in partition), np.bool_, len(partition)))
+        words.append(np.fromiter((len(row.content.split()) for row in partition), np.int32, len(partition)))
+    ids = np.concatenate(ids) if ids else np.empty(0, np.int64)
+
+    links = session.execute(
+        select(entry_tag_association.c.entry_id, entry_tag_association.c.tag_id)
+        .order_by(entry_tag_association.c.entry_id)
+    ).all()
+    link_entries = np.fromiter((entry_id for entry_id, _ in links), np.int64, len(links))
+    link_tags = np.fromiter((tag_id for _, tag_id in links), np.int32, len(links))
+    # Drop links to entries without a date, then index the rest by position in ids.
+    known = np.isin(link_entries, ids)
+    link_entries, link_tags = link_entries[known], link_tags[known]
+    tag_offsets = np.searchsorted(link_entries, np.append(ids, np.iinfo(np.int64).max), side='left')
+
+    return Snapshot(
+        ids=ids,
+        dates=(np.concatenate(dates) if dates else np.empty(0, np.int64)).astype('datetime64[s]'),
+        is_private=np.concatenate(private) if private else np.empty(0, np.bool_),
+        word_counts=np.concatenate(words) if words else np.empty(0, np.int32),
+        tag_offsets=tag_offsets.astype(np.int64),
+        tag_ids=link_tags,
+        version=version,
+    )
+
+
+def save_snapshot(snapshot: Snapshot, path: str):
+    """Writes a snapshot as an uncompressed .npz (one array per column), replacing the old one atomically."""
+    np = _numpy()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    partial = path + ".partial"
+    with open(partial, 'wb') as handle:
+        np.savez(handle, format=np.array(SNAPSHOT_VERSION), **snapshot._asdict())
+    os.replace(partial, path)
+
+
+def load_snapshot(path: str):
+    """Reads a snapshot written by save_snapshot, or returns None if it is missing or from another format."""
+    np = _numpy()
+    try:
+        with np.load(path) as data:
+            if int(data['format']) != SNAPSHOT_VERSION:
+                return None
+            return Snapshot(**{field: data[field] for field in Snapshot._fields if field != 'version'},
+                            version=int(data['version']))
+    except (FileNotFoundError, KeyError, ValueError, OSError):
+        return None
+
+
+def get_snapshot(session, path: str, refresh: bool = False):
+    """Returns (snapshot, rebuilt): the cached snapshot when the change counter still matches, else a new one."""
+    if not refresh:
+        cached = load_snapshot(path)
+        if cached is not None and cached.version == change_version(session):
+            return cached, False
+    snapshot = build_snapshot(session)
+    save_snapshot(snapshot, path)
+    return snapshot, True
+
+
+def select_entries(snapshot: Snapshot, is_private: bool = None):
+    """Narrows a snapshot to private or public entries (None keeps all)."""
+    if is_private is None:
+        return snapshot
+    np = _numpy()
+    keep = snapshot.is_private == is_private
+    counts = np.diff(snapshot.tag_offsets)
+    tag_mask = np.repeat(keep, counts)
+    offsets = np.concatenate(([0], np.cumsum(counts[keep])))
+    return Snapshot(snapshot.ids[keep], snapshot.dates[keep], snapshot.is_private[keep],
+                    snapshot.word_counts[keep], offsets, snapshot.tag_ids[tag_mask], snapshot.version)
+
+
+def words_per_day(snapshot: Snapshot):
+    """Returns (days, words, entries): datetime64[D] days that have entries, with their totals."""
+    np = _numpy()
+    days, inverse = np.unique(snapshot.dates.astype('datetime64[D]'), return_inverse=True)
+    words = np.bincount(inverse, weights=snapshot.word_counts, minlength=len(days)).astype(np.int64)
+    entries = np.bincount(inverse, minlength=len(days))
+    return days, words, entries
+
+
+def streaks(days, today=None) -> Streaks:
+    """Longest and current runs of consecutive days with entries; days is sorted and unique.
+
+    The current streak counts back from today, or from yesterday if there
+    is no entry yet today.
+    """
+    np = _numpy()
+    if not len(days):
+        return Streaks(0, 0, None, None)
+    ordinal = days.astype(np.int64)
+    breaks = np.flatnonzero(np.diff(ordinal) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [len(ordinal)])) - 1
+    lengths = ends - starts + 1
+    best = int(np.argmax(lengths))
+    today = np.datetime64(today or datetime.date.today(), 'D').astype(np.int64)
+    current = int(lengths[-1]) if ordinal[-1] >= today - 1 else 0
+    return Streaks(current, int(lengths[best]), days[starts[best]], days[ends[best]])
+
+
+def longest_gaps(days, limit: int = 5):
+    """The longest stretches without entries between two days that have them, longest first."""
+    np = _numpy()
+    if len(days) < 2:
+        return []
+    gaps = np.diff(days.astype(np.int64)) - 1
+    order = np.argsort(gaps, kind='stable')[::-1][:limit]
+    return [Gap(int(gaps[i]), days[i], days[i + 1]) for i in order if gaps[i] > 0]
+
+
+def hour_heatmap(snapshot: Snapshot):
+    """A 7 x 24 array of entry counts by weekday (Monday first) and hour of day."""
+    np = _numpy()
+    seconds = snapshot.dates.astype(np.int64)
+    days = seconds // 86400
+    weekday = (days + 3) % 7            # 1970-01-01 was a Thursday
+    hour = (seconds // 3600) % 24
+    return np.bincount(weekday * 24 + hour, minlength=7 * 24).reshape(7, 24)
+
+
+def tag_cooccurrence(snapshot: Snapshot, top: int = 10):
+    """Returns (tag ids, matrix) for the top most used tags; matrix[i, j] counts entries with both.
+
+    The diagonal holds each tag's own entry count.
+    """
+    np = _numpy()
+    if not len(snapshot.tag_ids):
+        return np.empty(0, np.int32), np.zeros((0, 0), np.int64)
+    counts = np.bincount(snapshot.tag_ids)
+    top_ids = np.argsort(counts, kind='stable')[::-1][:top]
+    top_ids = top_ids[counts[top_ids] > 0]
+    position = np.full(len(counts), -1)
+    position[top_ids] = np.arange(len(top_ids))
+    rows = np.repeat(np.arange(len(snapshot.ids)), np.diff(snapshot.tag_offsets))
+    columns = position[snapshot.tag_ids]
+    chosen = columns >= 0
+    incidence = np.zeros((len(snapshot.ids), len(top_ids)), np.int64)
+    incidence[rows[chosen], columns[chosen]] = 1
+    return top_ids.astype(np.int32), incidence.T @ incidence
+
+
+def tag_names(session, tag_ids):
+    """Maps tag ids to names in one query."""
+    tag_ids = [int(tag_id) for tag_id in tag_ids]
+    if not tag_ids:
+        return {}
+    return dict(session.execute(select(Tag.id, Tag.name).where(Tag.id.in_(tag_ids))).all())
+
+
+def default_snapshot_path() -> str:
+    from .database import settings
+    return settings.analytics_file
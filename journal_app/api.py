@@ -0,0 +1,289 @@
+import datetime
+import json
+import re
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+from .change_state import ChangeCounter
+from .query_cache import QueryCache
+from .queries import day_range, month_range, year_range, last_days_range
+from .tag_query import TagQueryError
+from . import fts, partitions, services
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+ENTRY_PATH = re.compile(r"^/entries/(\d+)$")
+# Query parameters whose meaning depends on the current day, not only on the data.
+RELATIVE_PARAMETERS = ('last_days',)
+
+
+class APIError(Exception):
+    """Raised by a route to answer with an error status; the message goes into the JSON body."""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _single(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _int(params, name, default=None, minimum=None, maximum=None):
+    value = _single(params, name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise APIError(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer.")
+    if minimum is not None and number < minimum:
+        raise APIError(HTTPStatus.BAD_REQUEST, f"'{name}' must be at least {minimum}.")
+    return min(number, maximum) if maximum is not None else number
+
+
+def _date(params, name, fmt, example):
+    value = _single(params, name)
+    if value is None:
+        return None
+    try:
+        return datetime.datetime.strptime(value, fmt)
+    except ValueError:
+        raise APIError(HTTPStatus.BAD_REQUEST, f"'{name}' must look like {example}.")
+
+
+def _date_window(params):
+    """Resolves date, month, year, last_days or from/to query parameters into a (start, end) pair."""
+    day = _date(params, 'date', '%Y-%m-%d', 'YYYY-MM-DD')
+    if day:
+        return day_range(day.date())
+    month = _date(params, 'month', '%Y-%m', 'YYYY-MM')
+    if month:
+        return month_range(month.year, month.month)
+    year = _int(params, 'year')
+    if year:
+        return year_range(year)
+    last_days = _int(params, 'last_days', minimum=1)
+    if last_days:
+        return last_days_range(last_days)
+    start = _date(params, 'from', '%Y-%m-%d', 'YYYY-MM-DD')
+    end = _date(params, 'to', '%Y-%m-%d', 'YYYY-MM-DD')
+    return start, day_range(end.date())[1] if end else None
+
+
+def _encode_cursor(row) -> str:
+    return f"{row.date.isoformat()}_{row.id}"
+
+
+def _decode_cursor(value: str):
+    try:
+        date, entry_id = value.rsplit('_', 1)
+        return datetime.datetime.fromisoformat(date), int(entry_id)
+    except ValueError:
+        raise APIError(HTTPStatus.BAD_REQUEST, "'cursor' is not one this server handed out.")
+
+
+def _plain_snippet(snippet):
+    if snippet is None:
+        return None
+    return snippet.replace(fts.HIGHLIGHT_START, '').replace(fts.HIGHLIGHT_END, '')
+
+
+def _today() -> str:
+    """The current UTC day, which relative windows such as last_days count back from."""
+    return datetime.datetime.utcnow().date().isoformat()
+
+
+def _relative_day(target: str):
+    """Returns today's date when target has a relative date parameter, else None."""
+    params = parse_qs(urlsplit(target).query)
+    return _today() if any(name in params for name in RELATIVE_PARAMETERS) else None
+
+
+def _matches_etag(header: str, etag: str) -> bool:
+    """Implements If-None-Match: a list of entity tags, weak or strong, or '*'."""
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(',')]
+    return '*' in candidates or any(
+        candidate.removeprefix('W/') == etag for candidate in candidates
+    )
+
+
+class JournalAPI:
+    """Answers read-only GET requests for entries, search, tags and stats with JSON.
+
+    Every response carries an ETag made from the database's change counter
+    (see change_state), so a client revalidating with If-None-Match gets
+    304 Not Modified while nothing was written. While the database file is
+    untouched the counter is not even queried, and bodies of answered
+    requests are kept in a small LRU cache keyed on the counter and URL.
+    For relative windows (?last_days=N) the current day joins both the
+    ETag and the cache key, so those answers move on at midnight.
+    """
+
+    def __init__(self, session_factory, signature=None, cache_size: int = 128):
+        self.session_factory = session_factory
+        self.counter = ChangeCounter(session_factory, signature)
+        self.cache = QueryCache(cache_size, signature)
+        self.routes = {
+            '/entries': self.list_entries,
+            '/search': self.search,
+            '/tags': self.list_tags,
+            '/stats': self.show_stats,
+        }
+
+    def handle(self, target: str, if_none_match: str = None):
+        """Returns (status, headers, body bytes) for a GET of target."""
+        version = self.counter.current()
+        day = _relative_day(target)
+        etag = f'"{version}-{day}"' if day else f'"{version}"'
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if _matches_etag(if_none_match, etag):
+            return HTTPStatus.NOT_MODIFIED, headers, b''
+        try:
+            body = self.cache.get((version, target, day), lambda: self._render(target))
+        except APIError as e:
+            return e.status, {}, self._encode({'error': str(e)})
+        return HTTPStatus.OK, headers, body
+
+    def _render(self, target: str) -> bytes:
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        path = url.path.rstrip('/') or '/'
+        match = ENTRY_PATH.match(path)
+        if match:
+            route, arguments = self.show_entry, (int(match.group(1)),)
+        elif path in self.routes:
+            route, arguments = self.routes[path], (params,)
+        else:
+            raise APIError(HTTPStatus.NOT_FOUND, f"No such resource '{path}'.")
+        session = self.session_factory()
+        try:
+            return self._encode(route(session, *arguments))
+        except TagQueryError as e:
+            raise APIError(HTTPStatus.BAD_REQUEST, str(e))
+        finally:
+            session.close()
+
+    @staticmethod
+    def _encode(result) -> bytes:
+        return json.dumps(result, ensure_ascii=False).encode('utf-8')
+
+    def list_entries(self, session, params):
+        """GET /entries?limit=N&cursor=C: newest first, one keyset page at a time."""
+        limit = _int(params, 'limit', DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+        cursor = _single(params, 'cursor')
+        # One row more than asked for tells whether another page follows.
+        rows = partitions.page_entries(session, limit + 1, after=_decode_cursor(cursor) if cursor else None)
+        page, more = rows[:limit], len(rows) > limit
+        return {
+            'entries': [services.entry_row_to_dict(row) for row in page],
+            'next': f"/entries?{urlencode({'limit': limit, 'cursor': _encode_cursor(page[-1])})}" if more else None,
+        }
+
+    def show_entry(self, session, entry_id):
+        """GET /entries/ID: one entry with its content, tags and attachments."""
+        entry = partitions.get_entry(session, entry_id)
+        if not entry:
+            raise APIError(HTTPStatus.NOT_FOUND, f"Entry with ID {entry_id} not found.")
+        return services.entry_to_dict(entry)
+
+    def search(self, session, params):
+        """GET /search?q=&tags=&date=|month=|year=|last_days=|from=&to=&limit=&offset=
+
+        Keyword results come in relevance order with a snippet, the others newest first.
+        """
+        keyword = _single(params, 'q', '').strip()
+        expression = _single(params, 'tags', '').strip()
+        limit = _int(params, 'limit', DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+        offset = _int(params, 'offset', 0, minimum=0)
+        start, end = _date_window(params)
+        snippets = None
+        if expression:
+            rows, snippets = partitions.search_tags(session, expression, keyword or None, start, end)
+        elif keyword:
+            rows, snippets = partitions.search_keyword(session, keyword)
+        elif start is not None or end is not None:
+            rows = partitions.search_dates(session, start, end, limit=offset + limit + 1)
+        else:
+            raise APIError(HTTPStatus.BAD_REQUEST, "Give 'q', 'tags' or a date parameter to search by.")
+        page = rows[offset:offset + limit]
+        more = len(rows) > offset + limit
+        following = {key: values[-1] for key, values in params.items()}
+        following['offset'] = offset + limit
+        return {
+            'entries': [
+                services.entry_row_to_dict(row, _plain_snippet(snippets.get(row.id)) if snippets else None)
+                for row in page
+            ],
+            'next': f"/search?{urlencode(following)}" if more else None,
+        }
+
+    def list_tags(self, session, params):
+        """GET /tags: every tag with its entry count, archived years included, most used first."""
+        return [{'name': name, 'entries': entry_count} for name, entry_count in partitions.get_tag_counts(session)]
+
+    def show_stats(self, session, params):
+        """GET /stats?months=N: totals and the newest N months (default 12), archived years included."""
+        months = _int(params, 'months', 12, minimum=1)
+        return {
+            'totals': partitions.get_totals(session),
+            'monthly': [
+                {'month': month, 'entries': entry_count, 'private': private_count}
+                for month, entry_count, private_count in partitions.get_monthly(session, limit=months)
+            ],
+        }
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    server_version = "JournalAPI/1"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body: bool):
+        try:
+            status, headers, body = self.server.api.handle(self.path, self.headers.get('If-None-Match'))
+        except Exception as e:
+            status, headers, body = HTTPStatus.INTERNAL_SERVER_ERROR, {}, JournalAPI._encode({'error': str(e)})
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body and status != HTTPStatus.NOT_MODIFIED:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class APIServer(ThreadingHTTPServer):
+    """Threaded HTTP server around a JournalAPI; requests share the engine's connection pool."""
+    daemon_threads = True
+
+    def __init__(self, address, api: JournalAPI, quiet: bool = False):
+        super().__init__(address, APIRequestHandler)
+        self.api = api
+        self.quiet = quiet
+
+
+def make_server(host: str = None, port: int = None, quiet: bool = False) -> APIServer:
+    """Creates a server for the app's configured database (see DatabaseSettings.api_host/api_port).
+
+    Port 0 picks a free port; the chosen one is in server.server_address.
+    """
+    from .database import get_session, query_cache, settings
+    api = JournalAPI(get_session, query_cache.signature, settings.query_cache_size)
+    return APIServer(
+        (settings.api_host if host is None else host, settings.api_port if port is None else port), api, quiet
+    )
@@ -0,0 +1,135 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from .config import load_settings
+from .database import apply_pragmas, instrument_engine
+from .content_codec import attach_codec, register_functions
+from .attachments import AttachmentStore
+from .migrations import bootstrap
+from . import partitions, services
+
+
+def async_database_url(url: str) -> str:
+    """Switches a sqlite:// URL to the aiosqlite driver."""
+    if url.startswith("sqlite+aiosqlite://"):
+        return url
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    raise ValueError(f"Only SQLite URLs are supported, got '{url}'.")
+
+
+class AsyncJournalService:
+    """Async CRUD, search and tag operations backed by an AsyncEngine (needs aiosqlite).
+
+    Each call runs the same business logic the CLI uses (journal_app.services,
+    and journal_app.partitions for reads that span archived years) through
+    AsyncSession.run_sync and returns plain dicts, so callers never trigger
+    lazy loads outside the session.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or load_settings()
+        self.engine = create_async_engine(
+            async_database_url(self.settings.database_url),
+            connect_args={"timeout": self.settings.busy_timeout / 1000},
+            pool_size=self.settings.pool_size,
+            max_overflow=self.settings.max_overflow,
+        )
+        event.listen(self.engine.sync_engine, "connect", self._on_connect)
+        attach_codec(self.engine.sync_engine, self.settings)
+        instrument_engine(self.engine.sync_engine)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.attachment_store = AttachmentStore(self.settings.attachments_directory)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, self.settings)
+        register_functions(dbapi_connection)
+
+    async def init(self):
+        """Creates or upgrades the database schema."""
+        async with self.engine.connect() as connection:
+            await connection.run_sync(bootstrap)
+
+    async def close(self):
+        await self.engine.dispose()
+
+    async def __aenter__(self):
+        await self.init()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _run(self, function, *args, **kwargs):
+        """Runs a sync services-style function inside a fresh AsyncSession."""
+        async with self.sessionmaker() as session:
+            try:
+                return await session.run_sync(function, *args, **kwargs)
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def add_entry(self, title: str, content: str, is_private: bool = True, tags=()):
+        def _add(session):
+            return services.entry_to_dict(services.create_entry(session, title, content, is_private, tags))
+        return await self._run(_add)
+
+    async def get_entry(self, entry_id: int):
+        def _get(session):
+            entry = partitions.get_entry(session, entry_id)
+            return services.entry_to_dict(entry) if entry else None
+        return await self._run(_get)
+
+    async def update_entry(self, entry_id: int, title: str = None, content: str = None, is_private: bool = None):
+        def _update(session):
+            entry = services.update_entry(session, entry_id, title, content, is_private)
+            return services.entry_to_dict(entry) if entry else None
+        return await self._run(_update)
+
+    async def delete_entry(self, entry_id: int) -> bool:
+        return await self._run(services.delete_entry, entry_id, self.attachment_store)
+
+    async def list_entries(self, limit: int = 20, after=None, before=None):
+        def _list(session):
+            return [services.entry_row_to_dict(row) for row in partitions.page_entries(session, limit, after, before)]
+        return await self._run(_list)
+
+    async def search_keyword(self, keyword: str):
+        def _search(session):
+            rows, snippets = partitions.search_keyword(session, keyword)
+            return [services.entry_row_to_dict(row, snippets.get(row.id)) for row in rows]
+        return await self._run(_search)
+
+    async def search_dates(self, start, end, limit: int = None):
+        def _search(session):
+            return [services.entry_row_to_dict(row) for row in partitions.search_dates(session, start, end, limit)]
+        return await self._run(_search)
+
+    async def list_tags(self):
+        def _list(session):
+            return [{'id': tag.id, 'name': tag.name} for tag in services.list_tags(session)]
+        return await self._run(_list)
+
+    async def create_tag(self, name: str):
+        def _create(session):
+            tag, created = services.create_tag(session, name)
+            return {'id': tag.id, 'name': tag.name, 'created': created}
+        return await self._run(_create)
+
+    async def delete_tag(self, name_or_id) -> bool:
+        def _delete(session):
+            tag = services.get_tag(session, name_or_id)
+            if not tag:
+                return False
+            services.delete_tag(session, tag)
+            return True
+        return await self._run(_delete)
+
+    async def change_entry_tags(self, entry_id: int, add=(), remove=()):
+        def _change(session):
+            entry = services.get_entry(session, entry_id)
+            if not entry:
+                return None
+            changes = services.change_entry_tags(session, entry, add=add, remove=remove)
+            session.commit()
+            return changes._asdict()
+        return await self._run(_change)
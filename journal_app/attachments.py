@@ -0,0 +1,336 @@
+import hashlib
+import mimetypes
+import mmap
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+from .models import Attachment, AttachmentBlob, Entry
+
+CHUNK_SIZE = 1024 * 1024
+
+# Reference counts live in attachment_blobs and are kept by triggers, so an entry
+# deleted through any path (ORM, bulk SQL) releases its files for collection.
+ATTACHMENT_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS attachments_ref_ai AFTER INSERT ON attachments BEGIN
+        INSERT INTO attachment_blobs(sha256, size, ref_count) VALUES (new.sha256, new.size, 1)
+            ON CONFLICT(sha256) DO UPDATE SET ref_count = ref_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS attachments_ref_ad AFTER DELETE ON attachments BEGIN
+        UPDATE attachment_blobs SET ref_count = ref_count - 1 WHERE sha256 = old.sha256;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS entries_attachments_ad AFTER DELETE ON entries BEGIN
+        DELETE FROM attachments WHERE entry_id = old.id;
+    END
+    """,
+]
+
+
+def ensure_attachments(connection):
+    """Creates the reference-counting triggers for the attachment tables."""
+    for statement in ATTACHMENT_TRIGGERS:
+        connection.execute(text(statement))
+
+
+class AttachmentStore:
+    """Content-addressed file store: each file is saved once, named by its SHA-256.
+
+    Files live at <root>/<first 2 hex>/<next 2 hex>/<sha256> and are made
+    read-only; ingest writes to <root>/tmp first and renames into place, so a
+    file under its hash name is always complete.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self.path_for(sha256))
+
+    def put(self, source):
+        """Streams a path or binary file object into the store. Returns (sha256, size)."""
+        sha256, size, staged = self.stage(source)
+        self.place(sha256, staged)
+        return sha256, size
+
+    def stage(self, source):
+        """Streams a path or binary file object into <root>/tmp. Returns (sha256, size, staged path).
+
+        The data is read in CHUNK_SIZE pieces into one reused buffer, hashed and
+        written as it arrives, so memory use does not depend on the file size.
+        Pass the staged path to place() or discard().
+        """
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        buffer = bytearray(CHUNK_SIZE)
+        view = memoryview(buffer)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out, _open_source(source) as handle:
+                while True:
+                    read = handle.readinto(buffer)
+                    if not read:
+                        break
+                    digest.update(view[:read])
+                    out.write(view[:read])
+                    size += read
+                out.flush()
+                os.fsync(out.fileno())
+            return digest.hexdigest(), size, tmp_path
+        except BaseException:
+            self.discard(tmp_path)
+            raise
+
+    def place(self, sha256: str, staged: str):
+        """Moves a staged file under its hash name, or drops it when that file is already stored."""
+        final_path = self.path_for(sha256)
+        if os.path.exists(final_path):
+            os.unlink(staged)  # already stored; deduplicated
+            return
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.chmod(staged, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(staged, final_path)
+
+    def discard(self, staged: str):
+        """Deletes a staged file that was not placed."""
+        if os.path.exists(staged):
+            os.unlink(staged)
+
+    def bury(self, sha256: str):
+        """Moves a stored file aside to <root>/tmp before it is deleted. Returns its new path, or None if gone.
+
+        Once buried, the hash name is free, so a concurrent add stores the data
+        again instead of relying on a file that is about to be removed.
+        """
+        tombstone = os.path.join(self.tmp_dir, sha256 + ".deleted")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        try:
+            os.replace(self.path_for(sha256), tombstone)
+        except FileNotFoundError:
+            return None
+        return tombstone
+
+    def unbury(self, sha256: str, tombstone: str):
+        """Puts a buried file back under its hash name."""
+        final_path = self.path_for(sha256)
+        if os.path.exists(final_path):
+            os.unlink(tombstone)
+        else:
+            os.replace(tombstone, final_path)
+
+    @contextmanager
+    def open_view(self, sha256: str):
+        """Yields a read-only memoryview of a stored file, backed by mmap rather than a copy."""
+        with open(self.path_for(sha256), 'rb') as handle:
+            if os.fstat(handle.fileno()).st_size == 0:
+                yield memoryview(b'')  # empty files cannot be mapped
+                return
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def copy_to(self, sha256: str, destination: str) -> int:
+        """Copies a stored file to destination without passing it through Python buffers.
+
+        Uses os.sendfile where the platform supports it, otherwise writes from
+        the mmap view. Returns the number of bytes copied.
+        """
+        with open(self.path_for(sha256), 'rb') as source, open(destination, 'wb') as target:
+            size = os.fstat(source.fileno()).st_size
+            try:
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(target.fileno(), source.fileno(), offset, size - offset)
+                    if not sent:
+                        break
+                    offset += sent
+                if offset == size:
+                    return size
+            except (AttributeError, OSError):
+                pass  # no sendfile here, or not between these files
+            target.seek(0)
+            target.truncate()
+            with self.open_view(sha256) as view:
+                target.write(view)
+                return len(view)
+
+    def remove(self, sha256: str) -> bool:
+        """Deletes a stored file. Returns False if it was already gone."""
+        try:
+            os.unlink(self.path_for(sha256))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_hashes(self):
+        """Yields the hash of every file in the store."""
+        for directory, _, names in os.walk(self.root):
+            if os.path.abspath(directory).startswith(os.path.abspath(self.tmp_dir)):
+                continue
+            for name in names:
+                if len(name) == 64:
+                    yield name
+
+
+@contextmanager
+def _open_source(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as handle:
+            yield handle
+    else:
+        yield source
+
+
+_default_store = None
+
+
+def default_store() -> AttachmentStore:
+    """Returns the store configured for the app's database (see DatabaseSettings.attachments_path)."""
+    global _default_store
+    if _default_store is None:
+        from .database import settings
+        _default_store = AttachmentStore(settings.attachments_directory)
+    return _default_store
+
+
+def add_attachment(session: Session, store: AttachmentStore, entry: Entry, source,
+                   filename: str = None, media_type: str = None):
+    """Streams a file into the store, links it to entry and commits. Returns the Attachment.
+
+    source is a path or a binary file object; filename defaults to the path's base name.
+    """
+    if filename is None:
+        if not isinstance(source, (str, os.PathLike)):
+            raise ValueError("A filename is required when attaching from a file object.")
+        filename = os.path.basename(source)
+    sha256, size, staged = store.stage(source)
+    try:
+        attachment = Attachment(
+            entry_id=entry.id, sha256=sha256, filename=filename, size=size,
+            media_type=media_type or mimetypes.guess_type(filename)[0],
+        )
+        session.add(attachment)
+        # The INSERT takes the database write lock, which collect_garbage holds while it
+        # buries files, so the file is placed (or found) only once it can no longer be released.
+        session.flush()
+        store.place(sha256, staged)
+        session.commit()
+    finally:
+        store.discard(staged)
+    return attachment
+
+
+def get_attachment(session: Session, attachment_id: int):
+    """Returns the attachment with the given ID, or None."""
+    return session.get(Attachment, attachment_id)
+
+
+def list_attachments(session: Session, entry_id: int):
+    """Returns an entry's attachments in the order they were added."""
+    return session.scalars(select(Attachment).where(Attachment.entry_id == entry_id).order_by(Attachment.id)).all()
+
+
+def remove_attachment(session: Session, store: AttachmentStore, attachment: Attachment):
+    """Unlinks an attachment from its entry, commits and collects its file if unreferenced."""
+    sha256 = attachment.sha256
+    session.delete(attachment)
+    session.commit()
+    return collect_garbage(session, store, [sha256])
+
+
+def attachment_hashes(session: Session, entry_ids):
+    """Returns the file hashes referenced by the given entries; collect_garbage candidates."""
+    return set(session.scalars(select(Attachment.sha256).where(Attachment.entry_id.in_(entry_ids))))
+
+
+def collect_garbage(session: Session, store: AttachmentStore, candidates=None):
+    """Deletes files whose reference count has dropped to zero. Returns (files removed, bytes freed).
+
+    With candidates only those hashes are checked, which keeps the work
+    proportional to what was just deleted; without, every blob is checked.
+    Files are buried (see AttachmentStore.bury) while the row deletion still
+    holds the write lock, and unlinked only after the commit.
+    """
+    statement = delete(AttachmentBlob).where(AttachmentBlob.ref_count <= 0)
+    if candidates is not None:
+        candidates = list(candidates)
+        if not candidates:
+            return 0, 0
+        statement = statement.where(AttachmentBlob.sha256.in_(candidates))
+    released = session.execute(statement.returning(AttachmentBlob.sha256, AttachmentBlob.size)).all()
+    buried = []
+    try:
+        for sha256, size in released:
+            tombstone = store.bury(sha256)
+            if tombstone:
+                buried.append((sha256, tombstone, size))
+        session.commit()
+    except BaseException:
+        session.rollback()
+        for sha256, tombstone, _ in buried:
+            store.unbury(sha256, tombstone)
+        raise
+    for _, tombstone, _ in buried:
+        os.unlink(tombstone)
+    return len(buried), sum(size for _, _, size in buried)
+
+
+def sweep_store(session: Session, store: AttachmentStore):
+    """Removes stored files with no blob row (e.g. left by an interrupted ingest) and stale temp files.
+
+    Returns the number of files removed. Run it while nothing is being attached.
+    """
+    known = set(session.scalars(select(AttachmentBlob.sha256)))
+    removed = 0
+    for sha256 in list(store.iter_hashes()):
+        if sha256 not in known and store.remove(sha256):
+            removed += 1
+    if os.path.isdir(store.tmp_dir):
+        for name in os.listdir(store.tmp_dir):
+            os.unlink(os.path.join(store.tmp_dir, name))
+            removed += 1
+    return removed
+
+
+def export_attachments(session: Session, store: AttachmentStore, entry_id: int, directory: str):
+    """Copies an entry's attachments into directory. Returns [(attachment, destination path)].
+
+    Clashing file names get the attachment ID prefixed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    exported, used = [], set()
+    for attachment in list_attachments(session, entry_id):
+        name = os.path.basename(attachment.filename) or f"attachment-{attachment.id}"
+        if name in used:
+            name = f"{attachment.id}-{name}"
+        used.add(name)
+        destination = os.path.join(directory, name)
+        store.copy_to(attachment.sha256, destination)
+        exported.append((attachment, destination))
+    return exported
+
+
+def attachment_to_dict(attachment: Attachment):
+    """Converts an Attachment into a plain dict."""
+    return {
+        'id': attachment.id,
+        'entry_id': attachment.entry_id,
+        'filename': attachment.filename,
+        'media_type': attachment.media_type,
+        'size': attachment.size,
+        'sha256': attachment.sha256,
+    }
@@ -0,0 +1,357 @@
+import datetime
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from sqlalchemy import text
+from .change_state import change_version
+from .migrations import SCHEMA_VERSION, bootstrap
+from .partitions import PARTITION_PREFIX, PARTITION_SUFFIX, PartitionError, partitions_directory
+from .similarity import queue_rebuild
+from .tag_cache import tag_cache
+
+BACKUP_PREFIX = "journal-"
+PRE_RESTORE_PREFIX = "pre-restore-"
+BACKUP_SUFFIX = ".db"
+PARTIAL_SUFFIX = ".partial"
+PARTITIONS_SUFFIX = "_partitions"
+NAME_FORMAT = "%Y%m%d-%H%M%S"
+
+BackupResult = namedtuple('BackupResult', ['path', 'pages', 'seconds', 'size'])
+BackupFile = namedtuple('BackupFile', ['path', 'created', 'size'])
+
+
+class BackupError(RuntimeError):
+    """Raised when a backup cannot be written, or a snapshot fails verification."""
+
+
+def _unique_path(directory: str, prefix: str) -> str:
+    stamp = datetime.datetime.now().strftime(NAME_FORMAT)
+    path = os.path.join(directory, f"{prefix}{stamp}{BACKUP_SUFFIX}")
+    counter = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, f"{prefix}{stamp}-{counter}{BACKUP_SUFFIX}")
+        counter += 1
+    return path
+
+
+def _fsync(path: str):
+    with open(path, 'rb') as handle:
+        os.fsync(handle.fileno())
+
+
+def backup_partitions_directory(path: str) -> str:
+    """Where a snapshot keeps the archived years it references: <snapshot name>_partitions next to it."""
+    return os.path.splitext(path)[0] + PARTITIONS_SUFFIX
+
+
+def _archived_years(connection):
+    """(year, filename, size) for each year a database has archived to a partition file."""
+    try:
+        return connection.execute("SELECT year, filename, size FROM partitions ORDER BY year").fetchall()
+    except sqlite3.OperationalError:
+        return []
+
+
+def _place_file(source: str, target: str):
+    """Puts a copy of an archived year's file at target, replacing what is there.
+
+    Partition files are never modified once written, so a hard link is as
+    good as a copy; files on another device are copied.
+    """
+    if os.path.exists(target) and os.path.samefile(source, target):
+        return
+    partial = target + PARTIAL_SUFFIX
+    if os.path.exists(partial):
+        os.unlink(partial)
+    try:
+        os.link(source, partial)
+    except OSError:
+        shutil.copyfile(source, partial)
+        _fsync(partial)
+    os.replace(partial, target)
+
+
+def _pacing(progress, sleep: float):
+    """Wraps a progress callback so it also pauses between steps.
+
+    sqlite3's own sleep argument only applies when a step finds the
+    database locked; the pause is what gives other connections room.
+    """
+    def callback(status, remaining, total):
+        if progress:
+            progress(status, remaining, total)
+        if remaining and sleep > 0:
+            time.sleep(sleep)
+    return callback
+
+
+def create_backup(engine, directory: str, pages: int = 256, sleep: float = 0.05, progress=None,
+                  prefix: str = BACKUP_PREFIX) -> BackupResult:
+    """Copies the live database into a new snapshot file in directory using SQLite's online backup API.
+
+    The copy runs pages at a time with sleep seconds between steps, so other
+    connections keep reading and writing meanwhile; each step holds only a
+    brief shared lock. A write from another connection makes SQLite restart
+    the copy, so under a constant stream of writes the backup takes longer
+    rather than capturing a torn state. progress(status, remaining, total)
+    is called after every step.
+
+    The snapshot is written under a .partial name, switched to rollback
+    journal mode so it is one self-contained file, checked with
+    verify_backup and only then renamed into place. The archived years
+    its registry names go into <snapshot name>_partitions beside it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = _unique_path(directory, prefix)
+    partial = path + PARTIAL_SUFFIX
+    started = time.perf_counter()
+    source = engine.raw_connection()
+    try:
+        target = sqlite3.connect(partial)
+        try:
+            source.driver_connection.backup(target, pages=pages, progress=_pacing(progress, sleep), sleep=sleep)
+            target.execute("PRAGMA journal_mode = DELETE")
+            page_count = target.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            target.close()
+        years_directory = backup_partitions_directory(path)
+        _copy_archived_years(engine, partial, years_directory)
+    except BaseException:
+        if os.path.exists(partial):
+            os.unlink(partial)
+        shutil.rmtree(backup_partitions_directory(path), ignore_errors=True)
+        raise
+    finally:
+        source.close()
+
+    problems = verify_backup(partial, years_directory)
+    if problems:
+        os.unlink(partial)
+        shutil.rmtree(years_directory, ignore_errors=True)
+        raise BackupError(f"The new backup failed verification: {'; '.join(problems)}")
+    _fsync(partial)
+    os.replace(partial, path)
+    return BackupResult(path, page_count, time.perf_counter() - started, os.path.getsize(path))
+
+
+def _copy_archived_years(engine, snapshot: str, directory: str):
+    """Copies the partition files a snapshot's registry names from the live partition directory into directory."""
+    connection = sqlite3.connect(f"file:{snapshot}?mode=ro", uri=True)
+    try:
+        years = _archived_years(connection)
+    finally:
+        connection.close()
+    if not years:
+        return
+    source = partitions_directory(engine)
+    os.makedirs(directory, exist_ok=True)
+    for year, filename, size in years:
+        if not os.path.exists(os.path.join(source, filename)):
+            raise BackupError(f"Archived year {year} is missing from '{source}'; see partition check and forget.")
+        _place_file(os.path.join(source, filename), os.path.join(directory, filename))
+
+
+def verify_backup(path: str, partitions: str = None):
+    """Checks a snapshot's integrity without modifying it. Returns a list of problems, empty when it is sound.
+
+    Runs PRAGMA integrity_check, confirms the file is a journal database
+    this version of the app can open, and that every archived year it
+    references is in partitions (by default <snapshot name>_partitions)
+    with the registered size.
+    """
+    if not os.path.exists(path):
+        return [f"'{path}' does not exist."]
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    except sqlite3.Error as e:
+        return [f"cannot open: {e}"]
+    try:
+        results = [line for row in connection.execute("PRAGMA integrity_check") for line in row[0].splitlines()]
+        if results != ['ok']:
+            return results
+        try:
+            version = connection.execute("SELECT max(version) FROM schema_version").fetchone()[0]
+        except sqlite3.DatabaseError:
+            return ["not a journal database (no schema_version table)"]
+        if version is None or version > SCHEMA_VERSION:
+            return [f"schema version {version} is not one this app can restore (up to {SCHEMA_VERSION})"]
+        directory = partitions or backup_partitions_directory(path)
+        problems = []
+        for year, filename, size in _archived_years(connection):
+            archived = os.path.join(directory, filename)
+            if not os.path.exists(archived):
+                problems.append(f"archived year {year}: '{archived}' is missing")
+            elif os.path.getsize(archived) != size:
+                problems.append(f"archived year {year}: '{archived}' is not the registered size")
+        return problems
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    finally:
+        connection.close()
+
+
+def restore_backup(engine, path: str, safety_directory: str = None) -> BackupResult:
+    """Replaces the live database's contents with a verified snapshot.
+
+    The snapshot is verified first. When safety_directory is given, the
+    current database is backed up there (prefixed 'pre-restore-') before
+    anything is overwritten; that backup is returned, or None. The copy
+    into the live database runs in one step, which other connections see
+    as a single commit.
+
+    The snapshot's archived years are put back into the partition
+    directory first. Year files it does not reference are deleted when
+    the safety backup holds them, and otherwise left for partition check
+    to report.
+    """
+    problems = verify_backup(path)
+    if problems:
+        raise BackupError(f"'{path}' failed verification: {'; '.join(problems)}")
+    safety = create_backup(engine, safety_directory, prefix=PRE_RESTORE_PREFIX) if safety_directory else None
+    with engine.connect() as connection:
+        version = change_version(connection)
+
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        years = _archived_years(source)
+        directory = _place_archived_years(engine, years, backup_partitions_directory(path))
+        target = engine.raw_connection()
+        try:
+            source.backup(target.driver_connection)
+        finally:
+            target.close()
+    finally:
+        source.close()
+    if safety and directory and os.path.isdir(directory):
+        registered = {filename for _, filename, _ in years}
+        for name in os.listdir(directory):
+            if name.startswith(PARTITION_PREFIX) and name.endswith(PARTITION_SUFFIX) and name not in registered:
+                os.unlink(os.path.join(directory, name))
+
+    # Connections opened before the restore may hold cached schema or results.
+    engine.dispose()
+    with engine.connect() as connection:
+        bootstrap(connection)
+    # The snapshot brings back an older change counter; caches and ETags built since
+    # would match it again after the next write, so move it past the old value.
+    # The related-entries index on disk is newer than the snapshot, and the snapshot's
+    # change queue knows nothing of the difference, so have the next sync rebuild it.
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE change_state SET version = max(version, :version) + 1 WHERE id = 1"), {'version': version}
+        )
+        queue_rebuild(connection)
+    tag_cache.invalidate()
+    return safety
+
+
+def _place_archived_years(engine, years, source: str):
+    """Puts a snapshot's archived years into the live partition directory. Returns that directory, or None."""
+    try:
+        directory = partitions_directory(engine)
+    except PartitionError:
+        return None
+    if years:
+        os.makedirs(directory, exist_ok=True)
+    for year, filename, size in years:
+        _place_file(os.path.join(source, filename), os.path.join(directory, filename))
+    return directory
+
+
+def list_backups(directory: str, prefix: str = BACKUP_PREFIX):
+    """Returns the snapshots in directory, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    backups = []
+    for name in os.listdir(directory):
+        if not (name.startswith(prefix) and name.endswith(BACKUP_SUFFIX)):
+            continue
+        stamp = name[len(prefix):-len(BACKUP_SUFFIX)][:15]
+        try:
+            created = datetime.datetime.strptime(stamp, NAME_FORMAT)
+        except ValueError:
+            continue
+        path = os.path.join(directory, name)
+        backups.append(BackupFile(path, created, os.path.getsize(path)))
+    return sorted(backups, key=lambda backup: (backup.created, backup.path), reverse=True)
+
+
+def rotate_backups(directory: str, keep: int):
+    """Deletes all but the newest keep snapshots, plus partial files left by interrupted backups.
+
+    Pre-restore safety copies are never rotated. A snapshot's archived
+    years go with it. Returns the deleted paths.
+    """
+    removed = []
+    for backup in list_backups(directory)[max(keep, 0):]:
+        os.unlink(backup.path)
+        shutil.rmtree(backup_partitions_directory(backup.path), ignore_errors=True)
+        removed.append(backup.path)
+    for name in os.listdir(directory) if os.path.isdir(directory) else ():
+        path = os.path.join(directory, name)
+        # Only stale ones; a backup may be in progress in another process.
+        if time.time() - os.path.getmtime(path) <= 3600:
+            continue
+        if name.endswith(BACKUP_SUFFIX + PARTIAL_SUFFIX):
+            os.unlink(path)
+            removed.append(path)
+        elif name.endswith(PARTITIONS_SUFFIX) and not os.path.exists(path[:-len(PARTITIONS_SUFFIX)] + BACKUP_SUFFIX):
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+    return removed
+
+
+class BackupScheduler(threading.Thread):
+    """Daemon thread that takes a backup every interval seconds and rotates old ones.
+
+    The last result and error are kept on the instance; a failed backup is
+    retried at the next interval rather than stopping the thread.
+    """
+
+    def __init__(self, engine, directory: str, interval: float, keep: int, pages: int = 256, sleep: float = 0.05):
+        super().__init__(name="journal-backup", daemon=True)
+        self.engine = engine
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.pages = pages
+        self.sleep = sleep
+        self.last_result = None
+        self.last_error = None
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.last_result = create_backup(self.engine, self.directory, self.pages, self.sleep)
+                rotate_backups(self.directory, self.keep)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+
+    def stop(self):
+        self._stopped.set()
+
+
+_scheduler = None
+
+
+def start_scheduled_backups():
+    """Starts the background backup thread when backup_interval is configured. Returns it, or None."""
+    global _scheduler
+    from .database import engine, settings
+    if _scheduler is None and settings.backup_interval > 0:
+        _scheduler = BackupScheduler(
+            engine, settings.backups_directory, settings.backup_interval * 60, settings.backup_keep,
+            settings.backup_pages, settings.backup_sleep / 1000,
+        )
+        _scheduler.start()
+    return _scheduler
+
+
+def backup_file_to_dict(backup: BackupFile):
+    """Converts a BackupFile into a plain dict."""
+    return {'path': backup.path, 'created': backup.created.isoformat(), 'size': backup.size}
@@ -0,0 +1,127 @@
+from collections import namedtuple
+from sqlalchemy import Column, Integer, MetaData, Table, and_, delete, func, insert, select, text, true, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from .models import Attachment, Entry, Tag, entry_tag_association
+from .queries import date_range
+from .services import normalize_tag_name
+from .tag_query import tag_criteria
+from . import attachments, fts
+
+# Entries matching the filter, and rows that were (or, for a dry run, would be) changed.
+BulkResult = namedtuple('BulkResult', ['matched', 'changed'])
+
+# Matching entry ids are written to a per-connection temporary table once, so a
+# full-text or tag-expression filter is evaluated a single time and every later
+# statement in the operation joins on a primary key.
+SELECTION_DDL = "CREATE TEMP TABLE IF NOT EXISTS bulk_selection (id INTEGER PRIMARY KEY)"
+selection = Table('bulk_selection', MetaData(), Column('id', Integer, primary_key=True))
+
+
+def entry_criteria(start=None, end=None, keyword: str = None, tags: str = None, is_private: bool = None):
+    """Builds WHERE criteria on entries from the bulk filter options; unset options do not filter.
+
+    tags is a boolean tag expression as accepted by tag_query.
+    """
+    criteria = list(date_range(start, end))
+    if keyword:
+        ids = fts.match_ids(keyword)
+        if ids is None:
+            raise ValueError("The keyword contains no searchable terms.")
+        criteria.append(Entry.id.in_(ids))
+    if tags:
+        criteria.append(tag_criteria(tags))
+    if is_private is not None:
+        criteria.append(Entry.is_private == is_private)
+    return criteria
+
+
+def _select(session: Session, criteria) -> int:
+    """Replaces the selection with the ids of entries matching criteria. Returns how many matched."""
+    session.execute(text(SELECTION_DDL))
+    session.execute(delete(selection))
+    session.execute(insert(selection).from_select(['id'], select(Entry.id).where(*criteria)))
+    return session.scalar(select(func.count()).select_from(selection))
+
+
+def _finish(session: Session, dry_run: bool):
+    if dry_run:
+        session.rollback()
+    else:
+        session.commit()
+
+
+def delete_entries(session: Session, criteria, dry_run: bool = False, store=None) -> BulkResult:
+    """Deletes every matching entry with its tag links, then collects unreferenced attachment files.
+
+    Triggers keep the search index, statistics and attachment rows in step.
+    """
+    matched = _select(session, criteria)
+    if dry_run or not matched:
+        _finish(session, True)
+        return BulkResult(matched, matched)
+    selected = select(selection.c.id)
+    hashes = set(session.scalars(select(Attachment.sha256).where(Attachment.entry_id.in_(selected)).distinct()))
+    session.execute(delete(entry_tag_association).where(entry_tag_association.c.entry_id.in_(selected)))
+    deleted = session.execute(delete(Entry.__table__).where(Entry.id.in_(selected))).rowcount
+    session.commit()
+    if hashes:
+        attachments.collect_garbage(session, store or attachments.default_store(), hashes)
+    return BulkResult(matched, deleted)
+
+
+def set_privacy(session: Session, criteria, is_private: bool, dry_run: bool = False) -> BulkResult:
+    """Marks every matching entry private or public; entries already in that state are not touched."""
+    matched = _select(session, criteria)
+    to_change = and_(Entry.id.in_(select(selection.c.id)), Entry.is_private != is_private)
+    if dry_run:
+        changed = session.scalar(select(func.count()).select_from(Entry).where(to_change))
+    else:
+        changed = session.execute(update(Entry.__table__).where(to_change).values(is_private=is_private)).rowcount
+    _finish(session, dry_run)
+    return BulkResult(matched, changed)
+
+
+def _tag_ids(names):
+    """Subquery for the ids of the named tags, resolved inside each statement rather than from the
+    process-wide tag cache, whose ids may be stale when another process deleted or recreated a tag."""
+    return select(Tag.id).where(Tag.name.in_(names))
+
+
+def add_tags(session: Session, criteria, names, dry_run: bool = False) -> BulkResult:
+    """Adds the named tags to every matching entry, creating missing tags. changed counts new links."""
+    names = {normalize_tag_name(name) for name in names if name.strip()}
+    matched = _select(session, criteria)
+    if dry_run:
+        present = session.scalar(select(func.count()).select_from(entry_tag_association).where(
+            entry_tag_association.c.tag_id.in_(_tag_ids(names)),
+            entry_tag_association.c.entry_id.in_(select(selection.c.id)),
+        ))
+        _finish(session, True)
+        return BulkResult(matched, matched * len(names) - present)
+    session.execute(
+        sqlite_insert(Tag).on_conflict_do_nothing(index_elements=['name']), [{'name': name} for name in names]
+    )
+    # Every selected entry paired with every requested tag; existing links are skipped.
+    pairs = select(selection.c.id, Tag.id).join_from(selection, Tag, true()).where(Tag.name.in_(names))
+    changed = session.execute(
+        sqlite_insert(entry_tag_association).from_select(['entry_id', 'tag_id'], pairs).on_conflict_do_nothing()
+    ).rowcount
+    _finish(session, False)
+    return BulkResult(matched, changed)
+
+
+def remove_tags(session: Session, criteria, names, dry_run: bool = False) -> BulkResult:
+    """Removes the named tags from every matching entry. changed counts removed links."""
+    names = {normalize_tag_name(name) for name in names if name.strip()}
+    matched = _select(session, criteria)
+    links = and_(
+        entry_tag_association.c.tag_id.in_(_tag_ids(names)),
+        entry_tag_association.c.entry_id.in_(select(selection.c.id)),
+    )
+    if dry_run:
+        changed = session.scalar(select(func.count()).select_from(entry_tag_association).where(links))
+    else:
+        changed = session.execute(delete(entry_tag_association).where(links)).rowcount
+    _finish(session, dry_run)
+    return BulkResult(matched, changed)
@@ -0,0 +1,94 @@
+import threading
+from sqlalchemy import text
+
+
+def _counter_triggers(events):
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS change_state_{name} AFTER {event} BEGIN
+            UPDATE change_state SET version = version + 1 WHERE id = 1;
+        END
+        """
+        for name, event in events
+    ]
+
+
+# A single counter bumped by triggers whenever data readers cache changes, from any
+# write path or process. Caches record the counter they were built at.
+CHANGE_STATE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS change_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO change_state(id, version) VALUES (1, 0)",
+] + _counter_triggers((
+    ('entries_ai', "INSERT ON entries"),
+    ('entries_ad', "DELETE ON entries"),
+    ('entries_au', "UPDATE OF date, is_private, content ON entries"),
+    ('tags_ai', "INSERT ON entry_tag_association"),
+    ('tags_ad', "DELETE ON entry_tag_association"),
+))
+
+# Added for the HTTP API, whose responses also show titles, tag names and attachments.
+CHANGE_TRIGGERS_DDL = _counter_triggers((
+    ('entries_title_au', "UPDATE OF title ON entries"),
+    ('tag_names_ai', "INSERT ON tags"),
+    ('tag_names_au', "UPDATE OF name ON tags"),
+    ('tag_names_ad', "DELETE ON tags"),
+    ('attachments_ai', "INSERT ON attachments"),
+    ('attachments_ad', "DELETE ON attachments"),
+))
+
+
+def ensure_change_state(connection):
+    """Creates the change counter and the triggers that bump it."""
+    for statement in CHANGE_STATE_DDL:
+        connection.execute(text(statement))
+
+
+def ensure_change_triggers(connection):
+    """Makes title, tag and attachment changes bump the change counter too."""
+    for statement in CHANGE_TRIGGERS_DDL:
+        connection.execute(text(statement))
+
+
+def change_version(session) -> int:
+    """The change counter; it differs from a cache's version once anything it covers was written."""
+    return session.execute(text("SELECT version FROM change_state WHERE id = 1")).scalar() or 0
+
+
+class ChangeCounter:
+    """Reads the change counter, skipping the query while the database file is untouched.
+
+    signature is a callable such as query_cache.file_signature(path); every
+    commit changes it, so while it is unchanged the last version read is
+    still current. Without a signature (in-memory databases) every call
+    queries.
+    """
+
+    def __init__(self, session_factory, signature=None):
+        self.session_factory = session_factory
+        self.signature = signature
+        self.queries = 0
+        self._seen = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        # The signature is taken before querying: a commit in between leaves a
+        # stale signature stored, which only costs one extra query next time.
+        seen = self.signature() if self.signature else None
+        with self._lock:
+            if seen is not None and seen == self._seen:
+                return self._version
+        session = self.session_factory()
+        try:
+            version = change_version(session)
+        finally:
+            session.close()
+        with self._lock:
+            self.queries += 1
+            self._seen, self._version = seen, version
+        return version
@@ -1,14 +1,62 @@
+import os
 from datetime import datetime
-from sqlalchemy import or_ 
 from sqlalchemy.orm import Session
-from .models import Entry, Tag
-from .database import get_session
+from .database import get_session, engine, query_cache, settings
+from . import fts, transfer, services, stats, attachments, bulk, backup, static_site, similarity, analytics, partitions
+from .tag_query import TagQueryError
+from .query_cache import keyword_key
+from .queries import entries_by_ids, day_range, month_range, year_range, last_days_range
 from rich.console import Console # For better CLI output
 from rich.table import Table as RichTable
 from rich.text import Text 
+from rich.segment import Segments
 
 console = Console()
 
+PAGE_SIZE = 20
+
+
+def build_entries_table(rows, snippets=None):
+    """Builds the Rich table used by the listing screens from EntryRow objects."""
+    table = RichTable(show_header=True, header_style="bold magenta")
+    table.add_column("ID", style="dim", width=5)
+    table.add_column("Date", style="cyan", width=18)
+    table.add_column("Title", style="green", max_width=30)
+    table.add_column("Status", style="purple", width=10)
+    table.add_column("Tags", style="yellow")
+    if snippets is not None:
+        table.add_column("Match", style="white")
+
+    for row in rows:
+        cells = [
+            str(row.id),
+            row.date.strftime('%Y-%m-%d %H:%M'),
+            row.title,
+            "Private" if row.is_private else "Public",
+            ", ".join(row.tags) if row.tags else "None",
+        ]
+        if snippets is not None:
+            cells.append(fts.snippet_markup(snippets.get(row.id)))
+        table.add_row(*cells)
+    return table
+
+
+def cached_listing(key, fetch, output: Console = None):
+    """Returns (rows, rendered table) for a listing or search, reusing both while the data is unchanged.
+
+    fetch returns (rows, snippets). The table is rendered once to segments
+    for the console's current width, which is part of the cache key; the
+    rendered table is None when there are no rows.
+    """
+    output = output or console
+
+    def compute():
+        rows, snippets = fetch()
+        if not rows:
+            return rows, None
+        return rows, Segments(list(output.render(build_entries_table(rows, snippets))))
+    return query_cache.get((*key, output.width), compute)
+
 
 def add_entry():
     """CLI function to add a new journal entry."""
@@ -35,9 +83,7 @@ def add_entry():
 
     session: Session = get_session()
     try:
-        new_entry = Entry(title=title, content=content, is_private=is_private_status) 
-        session.add(new_entry)
-        session.commit()
+        new_entry = services.create_entry(session, title, content, is_private_status)
         console.print(f"Entry '{title}' created successfully with ID {new_entry.id}.")
 
         console.print("Do you want to add tags to this entry? (y/n)")
@@ -56,34 +102,52 @@ def add_entry():
 
 
 
-def view_all_entries():
-    """CLI function to view all journal entries."""
+def view_all_entries(page_size: int = PAGE_SIZE):
+    """CLI function to view all journal entries, one page at a time."""
     session = get_session()
     try:
-        entries = session.query(Entry).order_by(Entry.date.desc()).all()
+        def load_page(after=None, before=None):
+            def fetch():
+                rows = partitions.page_entries(session, page_size, after=after, before=before)
+                return rows, None
+            rows, table = cached_listing(('page', page_size, after, before), fetch)
+            has_next = rows and query_cache.get(
+                ('has_next', rows[-1].date, rows[-1].id),
+                lambda: partitions.has_entries(session, after=(rows[-1].date, rows[-1].id)),
+            )
+            return rows, table, has_next
+
+        entries, table, has_next = load_page()
         if not entries:
             console.print("No entries found.")
             return
 
         console.print("\n--- All Journal Entries ---")
-        table = RichTable(show_header=True, header_style="bold magenta")
-        table.add_column("ID", style="dim", width=5)
-        table.add_column("Date", style="cyan", width=18)
-        table.add_column("Title", style="green", max_width=30)
-        table.add_column("Status", style="purple", width=10) 
-        table.add_column("Tags", style="yellow")
-
-        for entry in entries:
-            tag_names = ", ".join([tag.name for tag in entry.tags]) if entry.tags else "None"
-            privacy_status = "Private" if entry.is_private else "Public" 
-            table.add_row(
-                str(entry.id),
-                entry.date.strftime('%Y-%m-%d %H:%M'),
-                entry.title,
-                privacy_status, 
-                tag_names
-            )
-        console.print(table)
+        page_number = 1
+        while True:
+            console.print(table)
+            first_key = (entries[0].date, entries[0].id)
+            last_key = (entries[-1].date, entries[-1].id)
+            has_previous = page_number > 1
+
+            options = []
+            if has_next:
+                options.append("[N]ext")
+            if has_previous:
+                options.append("[P]revious")
+            if not options:
+                break
+            console.print(f"[dim]Page {page_number}[/dim]")
+            choice = console.input(f"{', '.join(options)} or [Q]uit: ").strip().lower()
+
+            if choice == 'n' and has_next:
+                entries, table, has_next = load_page(after=last_key)
+                page_number += 1
+            elif choice == 'p' and has_previous:
+                entries, table, has_next = load_page(before=first_key)
+                page_number -= 1
+            else:
+                break
         console.print("---------------------------\n")
 
     except Exception as e:
@@ -101,9 +165,10 @@ def view_entry_details():
 
     session = get_session()
     try:
-        entry = session.query(Entry).filter_by(id=entry_id).first()
+        entry = partitions.get_entry(session, entry_id)
         if entry:
             console.print(entry.display())
+            show_related_entries(session, entry_id)
         else:
             console.print(f"[red]Entry with ID {entry_id} not found.[/red]")
     except Exception as e:
@@ -112,11 +177,109 @@ def view_entry_details():
         session.close()
 
 
+def show_related_entries(session: Session, entry_id: int, limit: int = 5):
+    """Prints the entries most similar to entry_id. Skipped quietly when numpy is not installed."""
+    if not similarity.available():
+        return
+    index = similarity.default_index()
+    if not index.exists():
+        console.print("[dim]Building the related-entries index (first use only)...[/dim]")
+    related = index.related(session, entry_id, limit)
+    if not related:
+        return
+    rows = {row.id: row for row in entries_by_ids(session, [item.entry_id for item in related])}
+    table = RichTable(title="Related entries", show_header=True, header_style="bold magenta")
+    table.add_column("ID", style="dim", width=5)
+    table.add_column("Date", style="cyan", width=18)
+    table.add_column("Title", style="green", max_width=30)
+    table.add_column("Score", justify="right")
+    table.add_column("Shared tags", justify="right", style="yellow")
+    for item in related:
+        row = rows.get(item.entry_id)
+        if row:
+            table.add_row(str(row.id), row.date.strftime('%Y-%m-%d %H:%M'), row.title,
+                          f"{item.score:.2f}", str(item.shared_tags))
+    console.print(table)
+
+
+DATE_SEARCH_TYPES = ('d', 'r', 'm', 'y', 'l')
+
+
+def _parse_date_input(prompt: str, fmt: str, label: str, allow_blank: bool = False):
+    """Prompts for a date in the given format. Returns (value, ok); ok is False on quit or bad input."""
+    value = console.input(prompt).strip()
+    if value.lower() in ('q', 'quit'):
+        console.print("Operation cancelled. Returning to main menu.")
+        return None, False
+    if not value and allow_blank:
+        return None, True
+    try:
+        return datetime.strptime(value, fmt), True
+    except ValueError:
+        console.print(f"[red]Invalid date format. Please use {label} or 'q' to quit.[/red]")
+        return None, False
+
+
+def prompt_date_range(search_type: str):
+    """Asks for the inputs of a date search mode and returns (start, end, label), or None."""
+    if search_type == 'd':
+        day, ok = _parse_date_input("Enter date (YYYY-MM-DD): ", '%Y-%m-%d', 'YYYY-MM-DD')
+        if not ok:
+            return None
+        start, end = day_range(day.date())
+        return start, end, f"date {day:%Y-%m-%d}"
+
+    if search_type == 'r':
+        start, ok = _parse_date_input("From date (YYYY-MM-DD, blank for no limit): ", '%Y-%m-%d', 'YYYY-MM-DD', allow_blank=True)
+        if not ok:
+            return None
+        to_date, ok = _parse_date_input("To date, inclusive (YYYY-MM-DD, blank for no limit): ", '%Y-%m-%d', 'YYYY-MM-DD', allow_blank=True)
+        if not ok:
+            return None
+        end = day_range(to_date.date())[1] if to_date else None
+        if start and end and start >= end:
+            console.print("[red]The 'from' date must not be after the 'to' date.[/red]")
+            return None
+        label = f"{start:%Y-%m-%d}" if start else "the beginning"
+        label += f" to {to_date:%Y-%m-%d}" if to_date else " to now"
+        return start, end, label
+
+    if search_type == 'm':
+        month, ok = _parse_date_input("Enter month (YYYY-MM): ", '%Y-%m', 'YYYY-MM')
+        if not ok:
+            return None
+        start, end = month_range(month.year, month.month)
+        return start, end, f"month {month:%Y-%m}"
+
+    if search_type == 'y':
+        year, ok = _parse_date_input("Enter year (YYYY): ", '%Y', 'YYYY')
+        if not ok:
+            return None
+        start, end = year_range(year.year)
+        return start, end, f"year {year:%Y}"
+
+    days_input = console.input("Number of days: ").strip()
+    if days_input.lower() in ('q', 'quit'):
+        console.print("Operation cancelled. Returning to main menu.")
+        return None
+    try:
+        days = int(days_input)
+        if days <= 0:
+            raise ValueError
+    except ValueError:
+        console.print("[red]Invalid number of days. Please enter a positive number.[/red]")
+        return None
+    start, end = last_days_range(days)
+    return start, end, f"the last {days} days"
+
+
 def search_entries():
-    """CLI function to search entries by date or keyword."""
+    """CLI function to search entries by date, date range, keyword or tag expression."""
     console.print("\n--- Search Journal Entries ---")
 
-    search_type = console.input("Search by [D]ate or [K]eyword? (D/K):").strip().lower()
+    search_type = console.input(
+        "Search by [D]ate, date [R]ange, [M]onth, [Y]ear, [L]ast N days, [K]eyword or [T]ags? (D/R/M/Y/L/K/T):"
+    ).strip().lower()
     if search_type in ('q', 'quit'):
         console.print("Operation cancelled. Returning to main menu.")
         return
@@ -124,66 +287,76 @@ def search_entries():
     session = get_session()
     try:
         entries = [] 
+        table = None
 
-        if search_type == 'd':
-            date_str = console.input("Enter date (YYYY-MM-DD): ").strip()
-            if date_str.lower() in ('q', 'quit'):
-                console.print("Operation cancelled. Returning to main menu.")
-                return
-            try:
-                search_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            except ValueError:
-                console.print("[red]Invalid date format. Please use YYYY-MM-DD or 'q' to quit.[/red]")
+        if search_type in DATE_SEARCH_TYPES:
+            date_search = prompt_date_range(search_type)
+            if date_search is None:
                 return
+            start, end, label = date_search
+            # "Last N days" starts at a different instant on every call, so key it on
+            # today's date instead, as the API does; otherwise it would never hit the cache.
+            key = ('last_days', label, datetime.utcnow().date()) if search_type == 'l' else ('dates', start, end)
 
-            entries = session.query(Entry).filter(
-                Entry.date.like(f"{date_str}%")
-            ).order_by(Entry.date.desc()).all()
+            entries, table = cached_listing(key, lambda: (partitions.search_dates(session, start, end), None))
 
             if not entries:
-                console.print(f"No entries found for date {date_str}.")
+                console.print(f"No entries found for {label}.")
                 return
-            console.print(f"--- Entries for {date_str} ---")
+            console.print(f"--- Entries for {label} ---")
 
         elif search_type == 'k':
+            console.print("[dim]Use \"quotes\" for phrases and a trailing * for prefixes, e.g. travel* \"long weekend\"[/dim]")
             keyword = console.input("Enter keyword: ").strip()
             if not keyword or keyword.lower() in ('q', 'quit'):
                 console.print("Operation cancelled. Returning to main menu.")
                 return
             
-            entries = session.query(Entry).filter(
-                or_(
-                    Entry.title.ilike(f'%{keyword}%'),
-                    Entry.content.ilike(f'%{keyword}%')
-                )
-            ).order_by(Entry.date.desc()).all()
+            entries, table = cached_listing(
+                ('keyword', keyword_key(keyword)), lambda: partitions.search_keyword(session, keyword)
+            )
 
             if not entries:
                 console.print(f"No entries found containing '{keyword}'.")
                 return
             console.print(f"--- Entries containing '{keyword}' ---")
 
+        elif search_type == 't':
+            console.print("[dim]Combine tags with AND, OR, NOT and parentheses, e.g. work AND (travel OR idea) AND NOT draft[/dim]")
+            expression = console.input("Tag expression: ").strip()
+            if not expression or expression.lower() in ('q', 'quit'):
+                console.print("Operation cancelled. Returning to main menu.")
+                return
+            keyword = console.input("Also containing keyword (leave blank to skip): ").strip()
+            if keyword.lower() in ('q', 'quit'):
+                console.print("Operation cancelled. Returning to main menu.")
+                return
+            date_search = prompt_date_range('r')
+            if date_search is None:
+                return
+            start, end, label = date_search
+
+            try:
+                entries, table = cached_listing(
+                    ('tags', ' '.join(expression.split()), keyword_key(keyword) if keyword else None, start, end),
+                    lambda: partitions.search_tags(session, expression, keyword or None, start, end),
+                )
+            except TagQueryError as e:
+                console.print(f"[red]Invalid tag expression: {e}[/red]")
+                return
+
+            description = f"tags '{expression}'" + (f" containing '{keyword}'" if keyword else "")
+            if start or end:
+                description += f" from {label}"
+            if not entries:
+                console.print(f"No entries found matching {description}.")
+                return
+            console.print(f"--- Entries matching {description} ---")
+
         else:
-            console.print("[red]Invalid search type. Please choose 'D' or 'K' or 'q' to quit.[/red]")
+            console.print("[red]Invalid search type. Please choose 'D', 'R', 'M', 'Y', 'L', 'K' or 'T', or 'q' to quit.[/red]")
             return
 
-        table = RichTable(show_header=True, header_style="bold magenta")
-        table.add_column("ID", style="dim", width=5)
-        table.add_column("Date", style="cyan", width=18)
-        table.add_column("Title", style="green", max_width=30)
-        table.add_column("Status", style="purple", width=10)
-        table.add_column("Tags", style="yellow")
-
-        for entry in entries:
-            tag_names = ", ".join([tag.name for tag in entry.tags]) if entry.tags else "None"
-            privacy_status = "Private" if entry.is_private else "Public" 
-            table.add_row(
-                str(entry.id),
-                entry.date.strftime('%Y-%m-%d %H:%M'),
-                entry.title,
-                privacy_status, 
-                tag_names
-            )
         console.print(table)
         console.print("---------------------------\n")
 
@@ -210,7 +383,7 @@ def update_entry():
 
     session = get_session()
     try:
-        entry = session.query(Entry).filter_by(id=entry_id).first()
+        entry = services.get_entry(session, entry_id)
         if not entry:
             console.print(f"[red]Entry with ID {entry_id} not found.[/red]")
             return
@@ -220,24 +393,21 @@ def update_entry():
         console.print("Enter new title (leave blank to keep current): ")
         new_title = console.input().strip()
         if new_title.lower() in ('q', 'quit'): return
-        if new_title:
-            entry.title = new_title
 
         console.print("Enter new content (leave blank to keep current): ")
         new_content = console.input().strip()
         if new_content.lower() in ('q', 'quit'): return 
-        if new_content:
-            entry.content = new_content
 
         current_privacy = "Private" if entry.is_private else "Public"
         privacy_change_choice = console.input(f"Current status is {current_privacy}. Change to [P]rivate or [U]ublic? (P/U, leave blank to keep current): ").strip().lower()
         if privacy_change_choice.lower() in ('q', 'quit'): return
 
+        new_privacy = None
         if privacy_change_choice == 'p':
-            entry.is_private = True
+            new_privacy = True
             console.print("Status set to Private.")
         elif privacy_change_choice == 'u':
-            entry.is_private = False
+            new_privacy = False
             console.print("Status set to Public.")
         elif privacy_change_choice == '': 
             pass
@@ -245,7 +415,7 @@ def update_entry():
             console.print("Invalid privacy choice. Keeping current status.")
       
 
-        session.commit()
+        services.update_entry(session, entry_id, new_title, new_content, new_privacy)
         console.print(f"Entry ID {entry_id} updated successfully.")
 
         console.print("Do you want to modify tags for this entry? (y/n)")
@@ -273,15 +443,14 @@ def delete_entry():
 
     session = get_session()
     try:
-        entry = session.query(Entry).filter_by(id=entry_id).first()
+        entry = services.get_entry(session, entry_id)
         if not entry:
             console.print(f"[red]Entry with ID {entry_id} not found.[/red]")
             return
 
         confirm = console.input(f"[bold red]Are you sure you want to delete '{entry.title}' (ID: {entry.id})? (y/n): [/bold red]").lower()
         if confirm == 'y':
-            session.delete(entry)
-            session.commit()
+            services.delete_entry(session, entry_id)
             console.print(f"Entry ID {entry_id} deleted successfully.")
         else:
             console.print("Deletion cancelled.")
@@ -302,15 +471,11 @@ def create_tag():
 
     session = get_session()
     try:
-    
-        existing_tag = session.query(Tag).filter_by(name=tag_name).first()
-        if existing_tag:
-            console.print(f"Tag '{tag_name}' already exists with ID {existing_tag.id}.")
+        tag, created = services.create_tag(session, tag_name)
+        if not created:
+            console.print(f"Tag '{tag_name}' already exists with ID {tag.id}.")
         else:
-            new_tag = Tag(name=tag_name)
-            session.add(new_tag)
-            session.commit()
-            console.print(f"Tag '{tag_name}' created successfully with ID {new_tag.id}.")
+            console.print(f"Tag '{tag_name}' created successfully with ID {tag.id}.")
     except Exception as e:
         session.rollback()
         console.print(f"[red]Error creating tag: {e}[/red]")
@@ -325,7 +490,7 @@ def list_all_tags(session: Session = None):
         close_session_after = True
 
     try:
-        tags = session.query(Tag).order_by(Tag.name).all()
+        tags = services.list_tags(session)
         if not tags:
             console.print("No tags found.")
             return []
@@ -346,7 +511,7 @@ def list_all_tags(session: Session = None):
 
 def assign_tags_to_entry_by_id(entry_id: int, session: Session):
     """Helper to assign tags to a specific entry ID."""
-    entry = session.query(Entry).filter_by(id=entry_id).first()
+    entry = services.get_entry(session, entry_id)
     if not entry:
         console.print(f"[red]Entry with ID {entry_id} not found.[/red]")
         return
@@ -374,37 +539,19 @@ def assign_tags_to_entry_by_id(entry_id: int, session: Session):
         console.print("No tags entered. Skipping tag assignment.")
         return
 
-    tags_to_add = []
-    tags_to_remove = []
-
-    for tag_name in [t.strip() for t in tag_input.split(',') if t.strip()]:
-        if tag_name.startswith('+'):
-            tags_to_add.append(tag_name[1:]) 
-        elif tag_name.startswith('-'):
-            tags_to_remove.append(tag_name[1:]) 
-        else:
-            tags_to_add.append(tag_name) 
-
-    for name in set(tags_to_add): 
-        tag_obj = session.query(Tag).filter_by(name=name.capitalize()).first()
-        if not tag_obj:
-            console.print(f"Tag '{name.capitalize()}' does not exist. Creating it.")
-            tag_obj = Tag(name=name.capitalize())
-            session.add(tag_obj)
-            session.flush() 
-        if tag_obj not in entry.tags:
-            entry.tags.append(tag_obj)
-            console.print(f"Assigned tag '{tag_obj.name}' to entry.")
-        else:
-            console.print(f"Entry already has tag '{tag_obj.name}'.")
+    tags_to_add, tags_to_remove = services.parse_tag_input(tag_input)
+    changes = services.change_entry_tags(session, entry, add=tags_to_add, remove=tags_to_remove)
 
-    for name in set(tags_to_remove):
-        tag_obj = session.query(Tag).filter_by(name=name.capitalize()).first()
-        if tag_obj and tag_obj in entry.tags:
-            entry.tags.remove(tag_obj)
-            console.print(f"Removed tag '{tag_obj.name}' from entry.")
-        else:
-            console.print(f"Entry does not have tag '{name.capitalize()}' to remove, or tag not found.")
+    for name in changes.created:
+        console.print(f"Tag '{name}' does not exist. Creating it.")
+    for name in changes.added:
+        console.print(f"Assigned tag '{name}' to entry.")
+    for name in changes.already_present:
+        console.print(f"Entry already has tag '{name}'.")
+    for name in changes.removed:
+        console.print(f"Removed tag '{name}' from entry.")
+    for name in changes.not_found:
+        console.print(f"Entry does not have tag '{name}' to remove, or tag not found.")
 
     session.commit()
     console.print(f"Tags for Entry ID {entry_id} updated successfully.")
@@ -424,6 +571,15 @@ def manage_tags_for_entry(entry_id: int, session: Session = None):
         if close_session_after:
             session.close()
 
+def manage_tags_by_id():
+    """Prompts for an entry ID and opens tag management for it."""
+    try:
+        entry_id = int(console.input("Enter Entry ID to manage tags for: "))
+    except ValueError:
+        console.print("[red]Invalid ID. Please enter a number.[/red]")
+        return
+    manage_tags_for_entry(entry_id)
+
 def delete_tag():
     """CLI function to delete an existing tag."""
     console.print("\n--- Delete Tag ---")
@@ -442,12 +598,7 @@ def delete_tag():
             console.print("[red]Input cannot be empty. Aborting.[/red]")
             return
 
-        tag_to_delete = None
-        try:
-            tag_id = int(tag_name_or_id)
-            tag_to_delete = session.query(Tag).filter_by(id=tag_id).first()
-        except ValueError:
-            tag_to_delete = session.query(Tag).filter_by(name=tag_name_or_id.capitalize()).first()
+        tag_to_delete = services.get_tag(session, tag_name_or_id)
 
         if not tag_to_delete:
             console.print(f"[red]Tag '{tag_name_or_id}' not found.[/red]")
@@ -458,8 +609,7 @@ def delete_tag():
         ).lower()
 
         if confirm == 'y':
-            session.delete(tag_to_delete)
-            session.commit()
+            services.delete_tag(session, tag_to_delete)
             console.print(f"Tag '{tag_to_delete.name}' deleted successfully.")
         else:
             console.print("Tag deletion cancelled.")
@@ -470,3 +620,454 @@ def delete_tag():
     finally:
         session.close()
 
+def _format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def manage_attachments():
+    """CLI function to list, add, export and remove the attachments of an entry."""
+    console.print("\n--- Manage Attachments ---")
+    try:
+        entry_id = int(console.input("Enter Entry ID to manage attachments for: "))
+    except ValueError:
+        console.print("[red]Invalid ID. Please enter a number.[/red]")
+        return
+
+    session = get_session()
+    store = attachments.default_store()
+    try:
+        entry = services.get_entry(session, entry_id)
+        if not entry:
+            console.print(f"[red]Entry with ID {entry_id} not found.[/red]")
+            return
+        while True:
+            table = RichTable(title=f"Attachments of '{entry.title}'", show_header=True, header_style="bold magenta")
+            table.add_column("ID", style="dim", width=5)
+            table.add_column("File", style="green")
+            table.add_column("Type", style="cyan")
+            table.add_column("Size", justify="right")
+            for attachment in attachments.list_attachments(session, entry_id):
+                table.add_row(str(attachment.id), attachment.filename, attachment.media_type or "-",
+                              _format_size(attachment.size))
+            console.print(table)
+
+            choice = console.input("[A]dd file, [E]xport all, [R]emove, or [Q]uit: ").strip().lower()
+            if choice == 'a':
+                path = console.input("Path of the file to attach: ").strip()
+                if not os.path.isfile(path):
+                    console.print(f"[red]File '{path}' not found.[/red]")
+                    continue
+                attachment = attachments.add_attachment(session, store, entry, path)
+                console.print(f"Attached '{attachment.filename}' ({_format_size(attachment.size)}).")
+            elif choice == 'e':
+                directory = console.input("Directory to export to: ").strip()
+                if not directory:
+                    continue
+                exported = attachments.export_attachments(session, store, entry_id, directory)
+                console.print(f"Exported {len(exported)} attachment(s) to '{directory}'.")
+            elif choice == 'r':
+                try:
+                    attachment_id = int(console.input("Attachment ID to remove: "))
+                except ValueError:
+                    console.print("[red]Invalid ID. Please enter a number.[/red]")
+                    continue
+                attachment = attachments.get_attachment(session, attachment_id)
+                if not attachment or attachment.entry_id != entry_id:
+                    console.print(f"[red]Attachment with ID {attachment_id} not found on this entry.[/red]")
+                    continue
+                name = attachment.filename
+                attachments.remove_attachment(session, store, attachment)
+                console.print(f"Removed '{name}'.")
+            elif choice in ('q', 'quit', ''):
+                return
+            else:
+                console.print("[red]Invalid choice. Please try again.[/red]")
+    except Exception as e:
+        session.rollback()
+        console.print(f"[red]Error managing attachments: {e}[/red]")
+    finally:
+        session.close()
+
+
+def bulk_operations():
+    """CLI function to delete, change privacy of, or retag every entry matching a filter."""
+    console.print("\n--- Bulk Operations ---")
+    console.print("[dim]Choose which entries to change. Leave a filter blank to skip it.[/dim]")
+    date_search = prompt_date_range('r')
+    if date_search is None:
+        return
+    start, end, label = date_search
+    keyword = console.input("Containing keyword: ").strip()
+    expression = console.input("Matching tag expression: ").strip()
+    status = console.input("Only [P]rivate or p[U]blic entries: ").strip().lower()
+    if 'q' in (keyword.lower(), expression.lower(), status):
+        console.print("Operation cancelled. Returning to main menu.")
+        return
+    if status not in ('', 'p', 'u'):
+        console.print("[red]Invalid status. Please choose 'P', 'U' or leave it blank.[/red]")
+        return
+
+    operation = console.input(
+        "Operation: [D]elete, make [P]rivate, make p[U]blic, [A]dd tags or [R]emove tags? "
+    ).strip().lower()
+    if operation not in ('d', 'p', 'u', 'a', 'r'):
+        console.print("Operation cancelled. Returning to main menu.")
+        return
+    names = []
+    if operation in ('a', 'r'):
+        names = [name for name in console.input("Tag names (comma-separated): ").split(',') if name.strip()]
+        if not names:
+            console.print("[red]No tag names given. Aborting.[/red]")
+            return
+
+    def run(session, dry_run):
+        criteria = bulk.entry_criteria(start, end, keyword or None, expression or None,
+                                       None if not status else status == 'p')
+        if not criteria:
+            raise ValueError("Refusing to change every entry; give at least one filter.")
+        if operation == 'd':
+            return bulk.delete_entries(session, criteria, dry_run)
+        if operation in ('p', 'u'):
+            return bulk.set_privacy(session, criteria, operation == 'p', dry_run)
+        if operation == 'a':
+            return bulk.add_tags(session, criteria, names, dry_run)
+        return bulk.remove_tags(session, criteria, names, dry_run)
+
+    session = get_session()
+    try:
+        preview = run(session, dry_run=True)
+        if not preview.matched:
+            console.print(f"No entries match (dates: {label}).")
+            return
+        action = {
+            'd': "delete them", 'p': "make them private", 'u': "make them public",
+            'a': f"add tags {', '.join(names)} to them", 'r': f"remove tags {', '.join(names)} from them",
+        }[operation]
+        confirm = console.input(
+            f"[bold red]{preview.matched} entries match; this will {action} "
+            f"({preview.changed} changes). Proceed? (y/n): [/bold red]"
+        ).lower()
+        if confirm != 'y':
+            console.print("Bulk operation cancelled.")
+            return
+        result = run(session, dry_run=False)
+        console.print(f"Done: {result.changed} changes across {result.matched} entries.")
+    except (TagQueryError, ValueError) as e:
+        session.rollback()
+        console.print(f"[red]{e}[/red]")
+    except Exception as e:
+        session.rollback()
+        console.print(f"[red]Error running bulk operation: {e}[/red]")
+    finally:
+        session.close()
+
+
+def backup_and_restore():
+    """CLI function to back up, list, verify and restore database snapshots."""
+    console.print("\n--- Backup & Restore ---")
+    directory = settings.backups_directory
+    choice = console.input("[B]ack up now, [L]ist, [V]erify or [R]estore a snapshot? ").strip().lower()
+    try:
+        if choice == 'b':
+            result = backup.create_backup(engine, directory, settings.backup_pages, settings.backup_sleep / 1000)
+            rotated = backup.rotate_backups(directory, settings.backup_keep) if settings.backup_keep > 0 else []
+            console.print(
+                f"Backed up {result.pages} pages ({_format_size(result.size)}) to {result.path} "
+                f"in {result.seconds:.2f}s."
+            )
+            if rotated:
+                console.print(f"[dim]Removed {len(rotated)} old snapshot(s).[/dim]")
+            return
+        if choice not in ('l', 'v', 'r'):
+            console.print("Operation cancelled. Returning to main menu.")
+            return
+
+        snapshots = backup.list_backups(directory)
+        if not snapshots:
+            console.print(f"No snapshots in {directory}.")
+            return
+        table = RichTable(show_header=True, header_style="bold magenta")
+        table.add_column("#", style="dim", width=4)
+        table.add_column("Taken", style="cyan")
+        table.add_column("Size", justify="right")
+        table.add_column("File", style="green")
+        for number, snapshot in enumerate(snapshots, start=1):
+            table.add_row(str(number), f"{snapshot.created:%Y-%m-%d %H:%M:%S}", _format_size(snapshot.size),
+                          os.path.basename(snapshot.path))
+        console.print(table)
+        if choice == 'l':
+            return
+
+        selected = console.input("Snapshot number: ").strip()
+        if not selected.isdigit() or not 1 <= int(selected) <= len(snapshots):
+            console.print("[red]Invalid snapshot number.[/red]")
+            return
+        path = snapshots[int(selected) - 1].path
+        if choice == 'v':
+            problems = backup.verify_backup(path)
+            if problems:
+                console.print(f"[red]{os.path.basename(path)} failed verification:[/red]")
+                for problem in problems[:10]:
+                    console.print(f"[red]  {problem}[/red]")
+            else:
+                console.print(f"{os.path.basename(path)} is intact.")
+            return
+
+        confirm = console.input(
+            f"[bold red]Replace the journal with {os.path.basename(path)}? "
+            f"The current data is backed up first. (y/n): [/bold red]"
+        ).lower()
+        if confirm != 'y':
+            console.print("Restore cancelled.")
+            return
+        safety = backup.restore_backup(engine, path, directory)
+        console.print(f"Restored {os.path.basename(path)}. The previous data was saved to {safety.path}.")
+    except Exception as e:
+        console.print(f"[red]Error in backup operation: {e}[/red]")
+
+
+def publish_site():
+    """CLI function to export public entries as a static HTML or Markdown site."""
+    console.print("\n--- Publish Static Site ---")
+    directory = console.input("Output directory (default 'site'): ").strip() or "site"
+    if directory.lower() in ('q', 'quit'):
+        console.print("Operation cancelled. Returning to main menu.")
+        return
+    fmt = console.input("Format: [H]TML or [M]arkdown? (default HTML): ").strip().lower()
+    fmt = 'md' if fmt == 'm' else 'html'
+
+    session = get_session()
+    try:
+        summary = static_site.export_site(session, directory, fmt)
+        console.print(
+            f"Published {summary.entries} public entries to {directory} in {summary.seconds:.2f}s: "
+            f"{summary.rendered} pages rendered, {summary.unchanged} unchanged, {summary.removed} removed, "
+            f"{summary.index_pages} index pages updated."
+        )
+    except Exception as e:
+        console.print(f"[red]Error publishing site: {e}[/red]")
+    finally:
+        session.close()
+
+
+def show_writing_analytics():
+    """CLI function to show words per day, streaks, gaps, posting hours and tag co-occurrence."""
+    console.print("\n--- Writing Analytics ---")
+    if not analytics.available():
+        console.print("[red]Writing analytics need the 'numpy' package.[/red]")
+        return
+    status = console.input("Only [P]rivate or p[U]blic entries (leave blank for all): ").strip().lower()
+    if status == 'q':
+        console.print("Operation cancelled. Returning to main menu.")
+        return
+    if status not in ('', 'p', 'u'):
+        console.print("[red]Invalid status. Please choose 'P', 'U' or leave it blank.[/red]")
+        return
+
+    session = get_session()
+    try:
+        snapshot, rebuilt = analytics.get_snapshot(session, settings.analytics_file)
+        snapshot = analytics.select_entries(snapshot, None if not status else status == 'p')
+        if not len(snapshot.ids):
+            console.print("No entries to analyse.")
+            return
+        days, words, entries = analytics.words_per_day(snapshot)
+        streak = analytics.streaks(days)
+        console.print(
+            f"Entries: [bold]{len(snapshot.ids)}[/bold]  Words: [bold]{int(words.sum())}[/bold]  "
+            f"Days written: [bold]{len(days)}[/bold]"
+        )
+        console.print(
+            f"Current streak: [bold]{streak.current}[/bold] days  Longest streak: [bold]{streak.longest}[/bold] "
+            f"days ({streak.longest_start} to {streak.longest_end})"
+        )
+
+        recent = RichTable(title="Words per day (last 14 written)", show_header=True, header_style="bold magenta")
+        recent.add_column("Day", style="cyan")
+        recent.add_column("Entries", justify="right")
+        recent.add_column("Words", justify="right")
+        for day, word_count, entry_count in zip(days[-14:][::-1], words[-14:][::-1], entries[-14:][::-1]):
+            recent.add_row(str(day), str(entry_count), str(word_count))
+        console.print(recent)
+
+        gaps = RichTable(title="Longest gaps", show_header=True, header_style="bold magenta")
+        gaps.add_column("Days without entries", justify="right")
+        gaps.add_column("After", style="cyan")
+        gaps.add_column("Until", style="cyan")
+        for gap in analytics.longest_gaps(days):
+            gaps.add_row(str(gap.days), str(gap.after), str(gap.before))
+        console.print(gaps)
+
+        heatmap = analytics.hour_heatmap(snapshot)
+        peak = max(int(heatmap.max()), 1)
+        hours = RichTable(title="Entries by hour and weekday", show_header=True, header_style="bold magenta")
+        hours.add_column("Hour", style="cyan")
+        for weekday in analytics.WEEKDAYS:
+            hours.add_column(weekday, justify="right")
+        for hour, counts in enumerate(heatmap.T):
+            hours.add_row(f"{hour:02d}:00", *(
+                Text(str(count), style="bold green" if count * 4 >= peak * 3 else "green" if count else "dim")
+                for count in counts
+            ))
+        console.print(hours)
+
+        tag_ids, matrix = analytics.tag_cooccurrence(snapshot, top=8)
+        if len(tag_ids):
+            names = analytics.tag_names(session, tag_ids)
+            tags = RichTable(title="Tag co-occurrence (entries with both)", show_header=True, header_style="bold magenta")
+            tags.add_column("", style="yellow")
+            for tag_id in tag_ids:
+                tags.add_column(names.get(int(tag_id), "?"), justify="right")
+            for tag_id, row in zip(tag_ids, matrix):
+                tags.add_row(names.get(int(tag_id), "?"), *(str(count) for count in row))
+            console.print(tags)
+        console.print(f"[dim]Snapshot {'rebuilt' if rebuilt else 'reused'} at change {snapshot.version}.[/dim]")
+    except Exception as e:
+        console.print(f"[red]Error computing analytics: {e}[/red]")
+    finally:
+        session.close()
+
+
+def rebuild_search_index():
+    """CLI function to rebuild the full-text search index from all entries."""
+    console.print("\n--- Rebuild Search Index ---")
+    try:
+        with engine.begin() as connection:
+            fts.ensure_fts(connection)
+            fts.rebuild_fts(connection)
+        console.print("Search index rebuilt successfully.")
+    except Exception as e:
+        console.print(f"[red]Error rebuilding search index: {e}[/red]")
+
+
+def show_statistics():
+    """CLI function to show entry counts per month and per tag, with verify/rebuild options."""
+    console.print("\n--- Journal Statistics ---")
+    session = get_session()
+    try:
+        totals = partitions.get_totals(session)
+        console.print(
+            f"Entries: [bold]{totals['entries']}[/bold]  "
+            f"Private: [purple]{totals['private']}[/purple]  Public: [purple]{totals['public']}[/purple]"
+        )
+
+        months = RichTable(title="Last 12 months", show_header=True, header_style="bold magenta")
+        months.add_column("Month", style="cyan")
+        months.add_column("Entries", justify="right")
+        months.add_column("Private", justify="right", style="purple")
+        for month, entry_count, private_count in partitions.get_monthly(session, limit=12):
+            months.add_row(month, str(entry_count), str(private_count))
+        console.print(months)
+
+        tags = RichTable(title="Top tags", show_header=True, header_style="bold magenta")
+        tags.add_column("Tag", style="yellow")
+        tags.add_column("Entries", justify="right")
+        for name, entry_count in partitions.get_tag_counts(session, limit=10):
+            tags.add_row(name, str(entry_count))
+        console.print(tags)
+
+        cache = query_cache.stats()
+        console.print(
+            f"[dim]Query cache: {cache.hits} hits, {cache.misses} misses, {cache.evictions} evictions, "
+            f"{cache.invalidations} invalidations; {cache.size}/{cache.maxsize} results cached.[/dim]"
+        )
+    except Exception as e:
+        console.print(f"[red]Error reading statistics: {e}[/red]")
+        return
+    finally:
+        session.close()
+
+    choice = console.input("[V]erify, [R]ebuild, or press Enter to return: ").strip().lower()
+    if choice not in ('v', 'r'):
+        return
+    try:
+        with engine.begin() as connection:
+            differences = stats.verify_stats(connection)
+            if choice == 'r':
+                stats.rebuild_stats(connection)
+        if not differences:
+            console.print("Statistics match the entries.")
+        for table, key, stored, actual in differences[:10]:
+            console.print(f"[yellow]{table} {key}: stored {stored}, actual {actual}[/yellow]")
+        if len(differences) > 10:
+            console.print(f"[yellow]... and {len(differences) - 10} more differences.[/yellow]")
+        if choice == 'r':
+            console.print("Statistics rebuilt successfully.")
+    except Exception as e:
+        console.print(f"[red]Error checking statistics: {e}[/red]")
+
+
+def _prompt_format(path: str):
+    """Asks for a transfer format, defaulting to the one implied by the file extension."""
+    detected = transfer.detect_format(path)
+    fmt = console.input(
+        f"Format ({'/'.join(transfer.FORMATS)}, default {detected or 'none'}): "
+    ).strip().lower() or detected
+    if fmt not in transfer.FORMATS:
+        console.print(f"[red]Unsupported format. Please choose one of: {', '.join(transfer.FORMATS)}.[/red]")
+        return None
+    return fmt
+
+
+def import_entries():
+    """CLI function to bulk import entries from a JSONL, CSV or Markdown file."""
+    console.print("\n--- Import Entries ---")
+    path = console.input("Path to import from: ").strip()
+    if not path or path.lower() in ('q', 'quit'):
+        console.print("Operation cancelled. Returning to main menu.")
+        return
+    if not os.path.exists(path):
+        console.print(f"[red]File '{path}' not found.[/red]")
+        return
+    fmt = _prompt_format(path)
+    if not fmt:
+        return
+    batch_input = console.input(f"Batch size (default {transfer.DEFAULT_BATCH_SIZE}): ").strip()
+    try:
+        batch_size = int(batch_input) if batch_input else transfer.DEFAULT_BATCH_SIZE
+        if batch_size <= 0:
+            raise ValueError
+    except ValueError:
+        console.print("[red]Invalid batch size. Please enter a positive number.[/red]")
+        return
+
+    session = get_session()
+    errors = []
+    try:
+        imported, elapsed = transfer.import_entries(session, path, fmt, batch_size, errors)
+        rate = imported / elapsed if elapsed else 0
+        console.print(f"Imported {imported} entries in {elapsed:.2f}s ({rate:,.0f} rows/sec).")
+        for number, message in errors[:10]:
+            console.print(f"[yellow]Skipped record {number}: {message}[/yellow]")
+        if len(errors) > 10:
+            console.print(f"[yellow]... and {len(errors) - 10} more skipped records.[/yellow]")
+    except Exception as e:
+        session.rollback()
+        console.print(f"[red]Error importing entries: {e}[/red]")
+    finally:
+        session.close()
+
+
+def export_entries():
+    """CLI function to export all entries to a JSONL, CSV or Markdown file."""
+    console.print("\n--- Export Entries ---")
+    path = console.input("Path to export to: ").strip()
+    if not path or path.lower() in ('q', 'quit'):
+        console.print("Operation cancelled. Returning to main menu.")
+        return
+    fmt = _prompt_format(path)
+    if not fmt:
+        return
+
+    session = get_session()
+    try:
+        exported, elapsed = transfer.export_entries(session, path, fmt)
+        rate = exported / elapsed if elapsed else 0
+        console.print(f"Exported {exported} entries to '{path}' in {elapsed:.2f}s ({rate:,.0f} rows/sec).")
+    except Exception as e:
+        console.print(f"[red]Error exporting entries: {e}[/red]")
+    finally:
+        session.close()
@@ -0,0 +1,781 @@
+import argparse
+import csv
+import json
+import shlex
+import sys
+from datetime import datetime
+from .database import create_db_and_tables, get_session, engine, settings
+from . import (analytics, attachments, backup, bulk, content_codec, fts, partitions, services, similarity, static_site,
+               stats, transfer)
+from .profiling import profiler
+from .queries import entries_by_ids, day_range, month_range, year_range, last_days_range
+
+class CommandError(Exception):
+    """Raised when a subcommand cannot complete; the message is shown to the user."""
+
+
+class _ArgumentParser(argparse.ArgumentParser):
+    """ArgumentParser that raises CommandError instead of exiting, so --batch can continue."""
+
+    def error(self, message):
+        raise CommandError(message)
+
+
+def _entry_row_dict(row, snippet=None):
+    """Converts an EntryRow into a JSON-friendly dict, with a plain-text snippet if given."""
+    if snippet is not None:
+        snippet = snippet.replace(fts.HIGHLIGHT_START, '').replace(fts.HIGHLIGHT_END, '')
+    return services.entry_row_to_dict(row, snippet)
+
+
+def _parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+
+def _parse_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid month '{value}', expected YYYY-MM")
+
+
+def _parse_tags(value):
+    return [name for name in value.split(',') if name.strip()]
+
+
+def _date_window(args):
+    """Resolves the date filter options of a command into a (start, end) pair.
+
+    --to only ends an open window, so it is rejected next to --date, --month,
+    --year or --last-days, which would otherwise ignore it.
+    """
+    if getattr(args, 'to_date', None):
+        for option in ('date', 'month', 'year', 'last_days'):
+            if getattr(args, option, None):
+                raise CommandError(f"argument --to: not allowed with argument --{option.replace('_', '-')}")
+    if getattr(args, 'date', None):
+        return day_range(args.date.date())
+    if getattr(args, 'month', None):
+        return month_range(args.month.year, args.month.month)
+    if getattr(args, 'year', None):
+        return year_range(args.year)
+    if getattr(args, 'last_days', None):
+        return last_days_range(args.last_days)
+    start = getattr(args, 'from_date', None)
+    end = day_range(args.to_date.date())[1] if getattr(args, 'to_date', None) else None
+    return start, end
+
+
+def _add_date_options(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--date', type=_parse_day, help="a single day (YYYY-MM-DD)")
+    group.add_argument('--month', type=_parse_month, help="a calendar month (YYYY-MM)")
+    group.add_argument('--year', type=int, help="a calendar year")
+    group.add_argument('--last-days', type=int, help="the last N days")
+    group.add_argument('--from', dest='from_date', type=_parse_day, help="start day, inclusive")
+    parser.add_argument('--to', dest='to_date', type=_parse_day, help="end day, inclusive")
+
+
+def _privacy(args):
+    if args.private:
+        return True
+    if args.public:
+        return False
+    return None
+
+
+def cmd_add(session, args):
+    entry = services.create_entry(
+        session, args.title, args.content,
+        is_private=_privacy(args) is not False, tags=args.tags or ()
+    )
+    return services.entry_to_dict(entry)
+
+
+def cmd_list(session, args):
+    start, end = _date_window(args)
+    if start is None and end is None:
+        return [_entry_row_dict(row) for row in partitions.page_entries(session, args.limit)]
+    return [_entry_row_dict(row) for row in partitions.search_dates(session, start, end, limit=args.limit)]
+
+
+def cmd_show(session, args):
+    entry = partitions.get_entry(session, args.id)
+    if not entry:
+        raise CommandError(f"Entry with ID {args.id} not found.")
+    return services.entry_to_dict(entry)
+
+
+def cmd_search(session, args):
+    if args.tags:
+        start, end = _date_window(args)
+        rows, snippets = partitions.search_tags(session, args.tags, args.keyword, start, end)
+        return [_entry_row_dict(row, snippets.get(row.id) if snippets else None) for row in rows]
+    if args.keyword:
+        rows, snippets = partitions.search_keyword(session, args.keyword)
+        return [_entry_row_dict(row, snippets.get(row.id)) for row in rows]
+    start, end = _date_window(args)
+    if start is None and end is None:
+        raise CommandError("Give a keyword or a date option to search by.")
+    return [_entry_row_dict(row) for row in partitions.search_dates(session, start, end)]
+
+
+def cmd_update(session, args):
+    entry = services.update_entry(session, args.id, args.title, args.content, _privacy(args))
+    if not entry:
+        raise CommandError(f"Entry with ID {args.id} not found.")
+    return services.entry_to_dict(entry)
+
+
+def cmd_delete(session, args):
+    if not services.delete_entry(session, args.id):
+        raise CommandError(f"Entry with ID {args.id} not found.")
+    return {'id': args.id, 'deleted': True}
+
+
+def cmd_related(session, args):
+    index = similarity.default_index()
+    if args.rebuild:
+        index.rebuild(session)
+    if not services.get_entry(session, args.id):
+        raise CommandError(f"Entry with ID {args.id} not found.")
+    related = index.related(session, args.id, args.limit)
+    rows = {row.id: row for row in entries_by_ids(session, [item.entry_id for item in related])}
+    return [
+        dict(_entry_row_dict(rows[item.entry_id]), score=round(item.score, 4), shared_tags=item.shared_tags)
+        for item in related if item.entry_id in rows
+    ]
+
+
+def cmd_analytics(session, args):
+    snapshot, rebuilt = analytics.get_snapshot(session, settings.analytics_file, refresh=args.rebuild)
+    snapshot = analytics.select_entries(snapshot, None if args.status is None else args.status == 'private')
+    days, words, entries = analytics.words_per_day(snapshot)
+    streak = analytics.streaks(days)
+    tag_ids, matrix = analytics.tag_cooccurrence(snapshot, top=args.tags)
+    names = analytics.tag_names(session, tag_ids)
+    return {
+        'entries': int(len(snapshot.ids)),
+        'words': int(words.sum()),
+        'days_written': int(len(days)),
+        'words_per_day': [
+            {'day': str(day), 'entries': int(entry_count), 'words': int(word_count)}
+            for day, word_count, entry_count in zip(days[-args.days:], words[-args.days:], entries[-args.days:])
+        ] if args.days > 0 else [],
+        'streaks': {
+            'current': streak.current,
+            'longest': streak.longest,
+            'longest_start': str(streak.longest_start) if streak.longest_start is not None else None,
+            'longest_end': str(streak.longest_end) if streak.longest_end is not None else None,
+        },
+        'longest_gaps': [
+            {'days': gap.days, 'after': str(gap.after), 'before': str(gap.before)}
+            for gap in analytics.longest_gaps(days)
+        ],
+        'hour_heatmap': dict(zip(analytics.WEEKDAYS, analytics.hour_heatmap(snapshot).tolist())),
+        'tag_cooccurrence': {
+            'tags': [names.get(int(tag_id)) for tag_id in tag_ids],
+            'matrix': matrix.tolist(),
+        },
+        'snapshot': {'version': snapshot.version, 'rebuilt': rebuilt},
+    }
+
+
+def cmd_tag_list(session, args):
+    return [{'id': tag.id, 'name': tag.name} for tag in services.list_tags(session)]
+
+
+def cmd_tag_create(session, args):
+    tag, created = services.create_tag(session, args.name)
+    return {'id': tag.id, 'name': tag.name, 'created': created}
+
+
+def cmd_tag_delete(session, args):
+    tag = services.get_tag(session, args.name_or_id)
+    if not tag:
+        raise CommandError(f"Tag '{args.name_or_id}' not found.")
+    result = {'id': tag.id, 'name': tag.name, 'deleted': True}
+    services.delete_tag(session, tag)
+    return result
+
+
+def _change_tags(session, args, add=(), remove=()):
+    entry = services.get_entry(session, args.id)
+    if not entry:
+        raise CommandError(f"Entry with ID {args.id} not found.")
+    changes = services.change_entry_tags(session, entry, add=add, remove=remove)
+    session.commit()
+    return dict(changes._asdict(), id=entry.id)
+
+
+def cmd_tag_add(session, args):
+    return _change_tags(session, args, add=args.names)
+
+
+def cmd_tag_remove(session, args):
+    return _change_tags(session, args, remove=args.names)
+
+
+def cmd_attachment_add(session, args):
+    entry = services.get_entry(session, args.id)
+    if not entry:
+        raise CommandError(f"Entry with ID {args.id} not found.")
+    store = attachments.default_store()
+    return [attachments.attachment_to_dict(attachments.add_attachment(session, store, entry, path))
+            for path in args.paths]
+
+
+def cmd_attachment_list(session, args):
+    return [attachments.attachment_to_dict(attachment) for attachment in attachments.list_attachments(session, args.id)]
+
+
+def cmd_attachment_export(session, args):
+    exported = attachments.export_attachments(session, attachments.default_store(), args.id, args.directory)
+    return [dict(attachments.attachment_to_dict(attachment), path=path) for attachment, path in exported]
+
+
+def cmd_attachment_remove(session, args):
+    attachment = attachments.get_attachment(session, args.attachment_id)
+    if not attachment:
+        raise CommandError(f"Attachment with ID {args.attachment_id} not found.")
+    result = attachments.attachment_to_dict(attachment)
+    files_removed, bytes_freed = attachments.remove_attachment(session, attachments.default_store(), attachment)
+    return dict(result, removed=True, files_removed=files_removed, bytes_freed=bytes_freed)
+
+
+def cmd_attachment_gc(session, args):
+    store = attachments.default_store()
+    files_removed, bytes_freed = attachments.collect_garbage(session, store)
+    result = {'files_removed': files_removed, 'bytes_freed': bytes_freed}
+    if args.sweep:
+        result['orphans_removed'] = attachments.sweep_store(session, store)
+    return result
+
+
+def _add_bulk_filters(parser):
+    _add_date_options(parser)
+    parser.add_argument('--keyword', help="only entries matching this full-text query")
+    parser.add_argument('--tags', metavar='EXPR', help="only entries matching this boolean tag expression")
+    parser.add_argument('--status', choices=('private', 'public'), help="only private or only public entries")
+    parser.add_argument('--all', action='store_true', help="allow running without any filter")
+    parser.add_argument('--dry-run', action='store_true', help="only count what would change")
+
+
+def _bulk_criteria(args):
+    start, end = _date_window(args)
+    is_private = None if args.status is None else args.status == 'private'
+    criteria = bulk.entry_criteria(start, end, args.keyword, args.tags, is_private)
+    if not criteria and not args.all:
+        raise CommandError("Give at least one filter, or --all to select every entry.")
+    return criteria
+
+
+def _bulk_result(args, result):
+    return {
+        'operation': args.bulk_command, 'matched': result.matched, 'changed': result.changed,
+        'dry_run': args.dry_run,
+    }
+
+
+def cmd_bulk_delete(session, args):
+    return _bulk_result(args, bulk.delete_entries(session, _bulk_criteria(args), args.dry_run))
+
+
+def cmd_bulk_privacy(session, args):
+    is_private = args.privacy == 'private'
+    return _bulk_result(args, bulk.set_privacy(session, _bulk_criteria(args), is_private, args.dry_run))
+
+
+def cmd_bulk_tag_add(session, args):
+    return _bulk_result(args, bulk.add_tags(session, _bulk_criteria(args), args.names, args.dry_run))
+
+
+def cmd_bulk_tag_remove(session, args):
+    return _bulk_result(args, bulk.remove_tags(session, _bulk_criteria(args), args.names, args.dry_run))
+
+
+def cmd_import(session, args):
+    errors = []
+    imported, elapsed = transfer.import_entries(session, args.path, args.format, args.batch_size, errors)
+    return {
+        'imported': imported,
+        'skipped': len(errors),
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(imported / elapsed) if elapsed else None,
+    }
+
+
+def cmd_export(session, args):
+    exported, elapsed = transfer.export_entries(session, args.path, args.format)
+    return {'exported': exported, 'seconds': round(elapsed, 3)}
+
+
+def cmd_site(session, args):
+    summary = static_site.export_site(session, args.directory, args.format, args.workers, args.full)
+    return dict(summary._asdict(), seconds=round(summary.seconds, 3))
+
+
+def cmd_serve(session, args):
+    from . import api  # http.server is slow to import and only needed here
+    server = api.make_server(args.host, args.port, quiet=args.quiet)
+    host, port = server.server_address[:2]
+    sys.stderr.write(f"Serving the journal read-only at http://{host}:{port}/ (Ctrl+C to stop)\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return {'served': f"http://{host}:{port}/", 'stopped': True}
+
+
+def cmd_rebuild_index(session, args):
+    with engine.begin() as connection:
+        fts.ensure_fts(connection)
+        fts.rebuild_fts(connection)
+    return {'rebuilt': True}
+
+
+def cmd_compress(session, args):
+    codec = content_codec.ContentCodec(
+        args.codec or settings.compression,
+        settings.compression_threshold if args.threshold is None else args.threshold,
+    )
+    with engine.begin() as connection:
+        examined, rewritten, bytes_before, bytes_after = content_codec.recompress_content(connection, codec)
+    if args.vacuum:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.exec_driver_sql("VACUUM")
+    return {
+        'codec': codec.codec, 'threshold': codec.threshold, 'examined': examined, 'rewritten': rewritten,
+        'bytes_before': bytes_before, 'bytes_after': bytes_after,
+    }
+
+
+def _backup_result(result):
+    return {'path': result.path, 'pages': result.pages, 'size': result.size, 'seconds': round(result.seconds, 3)}
+
+
+def cmd_backup_create(session, args):
+    directory = args.dir or settings.backups_directory
+    pages = settings.backup_pages if args.pages is None else args.pages
+    sleep = (settings.backup_sleep if args.sleep is None else args.sleep) / 1000
+    result = _backup_result(backup.create_backup(engine, directory, pages, sleep))
+    keep = settings.backup_keep if args.keep is None else args.keep
+    result['rotated'] = len(backup.rotate_backups(directory, keep)) if keep > 0 else 0
+    return result
+
+
+def cmd_backup_list(session, args):
+    return [backup.backup_file_to_dict(item) for item in backup.list_backups(args.dir or settings.backups_directory)]
+
+
+def cmd_backup_verify(session, args):
+    problems = backup.verify_backup(args.path)
+    if problems:
+        raise CommandError(f"'{args.path}' failed verification: {'; '.join(problems[:10])}")
+    return {'path': args.path, 'ok': True}
+
+
+def cmd_backup_restore(session, args):
+    session.close()
+    safety = backup.restore_backup(engine, args.path, None if args.no_safety_copy else settings.backups_directory)
+    return {'restored': args.path, 'safety_copy': safety.path if safety else None}
+
+
+def _archive_result(result):
+    return dict(result._asdict(), seconds=round(result.seconds, 3))
+
+
+def cmd_partition_archive(session, args):
+    if args.year:
+        results = [partitions.archive_year(session, args.year)]
+    else:
+        results = partitions.archive_years(session, args.before)
+    if args.vacuum and results:
+        session.close()
+        partitions.compact_database(engine)
+    return [_archive_result(result) for result in results]
+
+
+def cmd_partition_list(session, args):
+    return [partitions.partition_to_dict(partition) for partition in partitions.list_partitions(session)]
+
+
+def cmd_partition_check(session, args):
+    problems = partitions.check_partitions(session)
+    if problems:
+        raise CommandError(f"Archived years do not match the registry: {'; '.join(problems[:10])}")
+    return {'years': len(partitions.list_partitions(session)), 'ok': True}
+
+
+def cmd_partition_restore(session, args):
+    return {'year': args.year, 'restored': partitions.restore_year(session, args.year)}
+
+
+def cmd_partition_forget(session, args):
+    return {'year': args.year, 'lost': partitions.forget_year(session, args.year)}
+
+
+def _stats_differences(differences):
+    return [
+        f"{table} {key}: stored {list(stored or ())}, actual {list(actual or ())}"
+        for table, key, stored, actual in differences
+    ]
+
+
+def cmd_stats(session, args):
+    if args.verify or args.rebuild:
+        with engine.begin() as connection:
+            differences = stats.verify_stats(connection)
+            if args.rebuild:
+                stats.rebuild_stats(connection)
+        return {'drift': _stats_differences(differences), 'rebuilt': args.rebuild}
+    return {
+        'totals': partitions.get_totals(session),
+        'months': [
+            {'month': month, 'entries': entries, 'private': private}
+            for month, entries, private in partitions.get_monthly(session, args.months)
+        ],
+        'tags': [{'name': name, 'entries': count} for name, count in partitions.get_tag_counts(session, args.tags)],
+    }
+
+
+def build_parser():
+    """Builds the argument parser for the non-interactive subcommands."""
+    parser = _ArgumentParser(prog='journal', description="Journal App command line interface.")
+    parser.add_argument('--output', choices=('json', 'tsv'), default='json', help="output format (default json)")
+    parser.add_argument('--batch', action='store_true',
+                        help="read one subcommand per line from stdin and run them all in one process")
+    parser.add_argument('--profile', action='store_true',
+                        help="print SQL statement counts and timings per command to stderr")
+    parser.add_argument('--profile-trace', metavar='PATH',
+                        help="also write every profiled statement to a JSON trace file (implies --profile)")
+    parser.add_argument('--cprofile', action='store_true',
+                        help="also run each command under cProfile (implies --profile)")
+    subparsers = parser.add_subparsers(dest='command', parser_class=_ArgumentParser)
+
+    add = subparsers.add_parser('add', help="add an entry")
+    add.add_argument('--title', required=True)
+    add.add_argument('--content', required=True, help="entry text, or '-' to read it from stdin")
+    add.add_argument('--public', action='store_true', help="make the entry public (default private)")
+    add.add_argument('--private', action='store_true', help=argparse.SUPPRESS)
+    add.add_argument('--tags', type=_parse_tags, help="comma-separated tag names")
+    add.set_defaults(handler=cmd_add)
+
+    list_parser = subparsers.add_parser('list', help="list entries, newest first")
+    list_parser.add_argument('--limit', type=int, default=100)
+    _add_date_options(list_parser)
+    list_parser.set_defaults(handler=cmd_list)
+
+    show = subparsers.add_parser('show', help="show one entry with its content")
+    show.add_argument('id', type=int)
+    show.set_defaults(handler=cmd_show)
+
+    search = subparsers.add_parser('search', help="search by keyword, date or tag expression")
+    search.add_argument('keyword', nargs='?')
+    search.add_argument('--tags', metavar='EXPR',
+                        help="boolean tag expression, e.g. 'work AND (travel OR idea) AND NOT draft'")
+    _add_date_options(search)
+    search.set_defaults(handler=cmd_search)
+
+    update = subparsers.add_parser('update', help="update an entry")
+    update.add_argument('id', type=int)
+    update.add_argument('--title')
+    update.add_argument('--content', help="new text, or '-' to read it from stdin")
+    privacy = update.add_mutually_exclusive_group()
+    privacy.add_argument('--private', action='store_true')
+    privacy.add_argument('--public', action='store_true')
+    update.set_defaults(handler=cmd_update)
+
+    delete = subparsers.add_parser('delete', help="delete an entry")
+    delete.add_argument('id', type=int)
+    delete.set_defaults(handler=cmd_delete)
+
+    related = subparsers.add_parser('related', help="entries most similar to an entry (needs numpy)")
+    related.add_argument('id', type=int)
+    related.add_argument('--limit', type=int, default=5)
+    related.add_argument('--rebuild', action='store_true', help="rebuild the similarity index first")
+    related.set_defaults(handler=cmd_related)
+
+    writing = subparsers.add_parser('analytics', help="words per day, streaks, gaps, posting hours and tag co-occurrence (needs numpy)")
+    writing.add_argument('--status', choices=('private', 'public'), help="only private or only public entries")
+    writing.add_argument('--days', type=int, default=30, help="days written to list words for (default 30)")
+    writing.add_argument('--tags', type=int, default=10, help="most used tags in the co-occurrence matrix")
+    writing.add_argument('--rebuild', action='store_true', help="rebuild the cached snapshot first")
+    writing.set_defaults(handler=cmd_analytics)
+
+    tag = subparsers.add_parser('tag', help="tag operations")
+    tag_commands = tag.add_subparsers(dest='tag_command', required=True, parser_class=_ArgumentParser)
+    tag_commands.add_parser('list', help="list tags").set_defaults(handler=cmd_tag_list)
+    tag_create = tag_commands.add_parser('create', help="create a tag")
+    tag_create.add_argument('name')
+    tag_create.set_defaults(handler=cmd_tag_create)
+    tag_delete = tag_commands.add_parser('delete', help="delete a tag by name or ID")
+    tag_delete.add_argument('name_or_id')
+    tag_delete.set_defaults(handler=cmd_tag_delete)
+    tag_add = tag_commands.add_parser('add', help="add tags to an entry")
+    tag_add.add_argument('id', type=int)
+    tag_add.add_argument('names', nargs='+')
+    tag_add.set_defaults(handler=cmd_tag_add)
+    tag_remove = tag_commands.add_parser('remove', help="remove tags from an entry")
+    tag_remove.add_argument('id', type=int)
+    tag_remove.add_argument('names', nargs='+')
+    tag_remove.set_defaults(handler=cmd_tag_remove)
+
+    attachment = subparsers.add_parser('attachment', help="attachment operations")
+    attachment_commands = attachment.add_subparsers(
+        dest='attachment_command', required=True, parser_class=_ArgumentParser
+    )
+    attachment_add = attachment_commands.add_parser('add', help="attach files to an entry")
+    attachment_add.add_argument('id', type=int)
+    attachment_add.add_argument('paths', nargs='+')
+    attachment_add.set_defaults(handler=cmd_attachment_add)
+    attachment_list = attachment_commands.add_parser('list', help="list an entry's attachments")
+    attachment_list.add_argument('id', type=int)
+    attachment_list.set_defaults(handler=cmd_attachment_list)
+    attachment_export = attachment_commands.add_parser('export', help="copy an entry's attachments to a directory")
+    attachment_export.add_argument('id', type=int)
+    attachment_export.add_argument('directory')
+    attachment_export.set_defaults(handler=cmd_attachment_export)
+    attachment_remove = attachment_commands.add_parser('remove', help="remove an attachment by its ID")
+    attachment_remove.add_argument('attachment_id', type=int)
+    attachment_remove.set_defaults(handler=cmd_attachment_remove)
+    attachment_gc = attachment_commands.add_parser('gc', help="delete stored files no attachment references")
+    attachment_gc.add_argument('--sweep', action='store_true',
+                               help="also remove stray files left by interrupted imports")
+    attachment_gc.set_defaults(handler=cmd_attachment_gc)
+
+    bulk_parser = subparsers.add_parser('bulk', help="delete, re-privacy or retag every entry matching a filter")
+    bulk_commands = bulk_parser.add_subparsers(dest='bulk_command', required=True, parser_class=_ArgumentParser)
+    bulk_delete = bulk_commands.add_parser('delete', help="delete matching entries")
+    _add_bulk_filters(bulk_delete)
+    bulk_delete.set_defaults(handler=cmd_bulk_delete)
+    bulk_privacy = bulk_commands.add_parser('privacy', help="make matching entries private or public")
+    bulk_privacy.add_argument('privacy', choices=('private', 'public'))
+    _add_bulk_filters(bulk_privacy)
+    bulk_privacy.set_defaults(handler=cmd_bulk_privacy)
+    bulk_tag_add = bulk_commands.add_parser('tag-add', help="add tags to matching entries")
+    bulk_tag_add.add_argument('names', nargs='+')
+    _add_bulk_filters(bulk_tag_add)
+    bulk_tag_add.set_defaults(handler=cmd_bulk_tag_add)
+    bulk_tag_remove = bulk_commands.add_parser('tag-remove', help="remove tags from matching entries")
+    bulk_tag_remove.add_argument('names', nargs='+')
+    _add_bulk_filters(bulk_tag_remove)
+    bulk_tag_remove.set_defaults(handler=cmd_bulk_tag_remove)
+
+    import_parser = subparsers.add_parser('import', help="bulk import entries from JSONL, CSV or Markdown")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--format', choices=transfer.FORMATS)
+    import_parser.add_argument('--batch-size', type=int, default=transfer.DEFAULT_BATCH_SIZE)
+    import_parser.set_defaults(handler=cmd_import)
+
+    export_parser = subparsers.add_parser('export', help="export entries to JSONL, CSV or Markdown")
+    export_parser.add_argument('path')
+    export_parser.add_argument('--format', choices=transfer.FORMATS)
+    export_parser.set_defaults(handler=cmd_export)
+
+    site = subparsers.add_parser('site', help="publish public entries as a static Markdown or HTML site")
+    site.add_argument('directory')
+    site.add_argument('--format', choices=static_site.SITE_FORMATS, default='html')
+    site.add_argument('--workers', type=int, help="rendering processes (default: one per CPU, 1 renders in-process)")
+    site.add_argument('--full', action='store_true', help="re-render every page, ignoring the manifest")
+    site.set_defaults(handler=cmd_site)
+
+    serve = subparsers.add_parser('serve', help="serve entries, search, tags and stats as read-only JSON over HTTP")
+    serve.add_argument('--host', help=f"address to listen on (default {settings.api_host})")
+    serve.add_argument('--port', type=int, help=f"port to listen on (default {settings.api_port}, 0 picks a free one)")
+    serve.add_argument('--quiet', action='store_true', help="do not log requests")
+    serve.set_defaults(handler=cmd_serve)
+
+    subparsers.add_parser('rebuild-index', help="rebuild the full-text search index") \
+        .set_defaults(handler=cmd_rebuild_index)
+
+    compress = subparsers.add_parser(
+        'compress', help="re-encode stored entry content with a compression codec (migrates existing rows)"
+    )
+    compress.add_argument('--codec', choices=content_codec.CODECS,
+                          help="codec to store content with (default: the configured compression)")
+    compress.add_argument('--threshold', type=int, help="bytes below which content stays uncompressed")
+    compress.add_argument('--vacuum', action='store_true', help="VACUUM afterwards to return freed space to the OS")
+    compress.set_defaults(handler=cmd_compress)
+
+    backup_parser = subparsers.add_parser('backup', help="online backups: create, list, verify and restore snapshots")
+    backup_commands = backup_parser.add_subparsers(
+        dest='backup_command', required=True, parser_class=_ArgumentParser
+    )
+    backup_create = backup_commands.add_parser('create', help="snapshot the database while it stays in use")
+    backup_create.add_argument('--dir', help="snapshot directory (default: the configured backup_path)")
+    backup_create.add_argument('--pages', type=int, help="pages copied per step (-1 copies everything in one step)")
+    backup_create.add_argument('--sleep', type=int, help="milliseconds to pause between steps")
+    backup_create.add_argument('--keep', type=int, help="snapshots to keep after rotation (0 keeps all)")
+    backup_create.set_defaults(handler=cmd_backup_create)
+    backup_list = backup_commands.add_parser('list', help="list snapshots, newest first")
+    backup_list.add_argument('--dir', help="snapshot directory (default: the configured backup_path)")
+    backup_list.set_defaults(handler=cmd_backup_list)
+    backup_verify = backup_commands.add_parser('verify', help="check a snapshot's integrity")
+    backup_verify.add_argument('path')
+    backup_verify.set_defaults(handler=cmd_backup_verify)
+    backup_restore = backup_commands.add_parser('restore', help="replace the database with a verified snapshot")
+    backup_restore.add_argument('path')
+    backup_restore.add_argument('--no-safety-copy', action='store_true',
+                                help="skip backing up the current database first")
+    backup_restore.set_defaults(handler=cmd_backup_restore)
+
+    partition_parser = subparsers.add_parser(
+        'partition', help="archive past years to read-only per-year files, list them or move them back"
+    )
+    partition_commands = partition_parser.add_subparsers(
+        dest='partition_command', required=True, parser_class=_ArgumentParser
+    )
+    partition_archive = partition_commands.add_parser(
+        'archive', help="move past years out of the database (all years before the current one by default)"
+    )
+    archive_years = partition_archive.add_mutually_exclusive_group()
+    archive_years.add_argument('--year', type=int, help="archive just this year")
+    archive_years.add_argument('--before', type=int, help="archive every year before this one")
+    partition_archive.add_argument('--vacuum', action='store_true', help="compact the database afterwards to shrink it")
+    partition_archive.set_defaults(handler=cmd_partition_archive)
+    partition_commands.add_parser('list', help="list archived years, newest first") \
+        .set_defaults(handler=cmd_partition_list)
+    partition_commands.add_parser('check', help="check that every archived year's file is on disk as registered") \
+        .set_defaults(handler=cmd_partition_check)
+    partition_restore = partition_commands.add_parser('restore', help="move an archived year back into the database")
+    partition_restore.add_argument('year', type=int)
+    partition_restore.set_defaults(handler=cmd_partition_restore)
+    partition_forget = partition_commands.add_parser(
+        'forget', help="drop an archived year whose file is gone from the registry, giving up its entries"
+    )
+    partition_forget.add_argument('year', type=int)
+    partition_forget.set_defaults(handler=cmd_partition_forget)
+
+    stats_parser = subparsers.add_parser('stats', help="show entry counts per month and per tag")
+    stats_parser.add_argument('--months', type=int, default=12, help="most recent months to show (0 for all)")
+    stats_parser.add_argument('--tags', type=int, default=20, help="most used tags to show (0 for all)")
+    stats_parser.add_argument('--verify', action='store_true', help="compare the statistics tables with the entries")
+    stats_parser.add_argument('--rebuild', action='store_true', help="recompute the statistics tables from scratch")
+    stats_parser.set_defaults(handler=cmd_stats)
+    return parser
+
+
+def write_result(result, output: str, stream=None):
+    """Writes a command result as one JSON line or as TSV rows with a header."""
+    stream = stream or sys.stdout
+    if output == 'json':
+        stream.write(json.dumps(result, ensure_ascii=False) + '\n')
+        return
+    rows = result if isinstance(result, list) else [result]
+    if not rows:
+        return
+    fields = list(rows[0].keys())
+    writer = csv.writer(stream, delimiter='\t', lineterminator='\n')
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow([
+            ','.join(value) if isinstance(value, list) else
+            str(value).replace('\t', ' ').replace('\n', ' ') if value is not None else ''
+            for value in (row[field] for field in fields)
+        ])
+
+
+def run_command(session, args, output: str):
+    """Runs one parsed subcommand and writes its result."""
+    if not getattr(args, 'handler', None):
+        raise CommandError("No command given.")
+    if getattr(args, 'content', None) == '-':
+        if args.batch_mode:
+            raise CommandError("Reading content from stdin is not available in --batch mode.")
+        args.content = sys.stdin.read().strip()
+    name = args.command
+    if args.command == 'tag':
+        name = f"tag {args.tag_command}"
+    elif args.command == 'attachment':
+        name = f"attachment {args.attachment_command}"
+    elif args.command == 'bulk':
+        name = f"bulk {args.bulk_command}"
+    elif args.command == 'backup':
+        name = f"backup {args.backup_command}"
+    elif args.command == 'partition':
+        name = f"partition {args.partition_command}"
+    with profiler.command(name):
+        result = args.handler(session, args)
+    write_result(result, output)
+
+
+def run_batch(parser, session, output: str, lines):
+    """Runs one subcommand per input line inside a single process and session.
+
+    Returns the number of failed commands; failures are reported on stderr
+    with their line number and do not stop the batch.
+    """
+    failures = 0
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            args = parser.parse_args(shlex.split(line))
+            args.batch_mode = True
+            run_command(session, args, output)
+        except SystemExit as e:
+            # -h/--help prints its text and exits argparse; that ends the line, not the batch.
+            if e.code:
+                failures += 1
+                sys.stderr.write(f"line {number}: error: exited with status {e.code}\n")
+        except Exception as e:
+            session.rollback()
+            failures += 1
+            sys.stderr.write(f"line {number}: error: {e}\n")
+    return failures
+
+
+def main(argv=None, menu=None):
+    """Entry point for the subcommand interface. Returns a process exit code.
+
+    With no subcommand (e.g. just --profile) the interactive menu is run instead,
+    when a menu callable is given.
+    """
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except CommandError as e:
+        parser.print_usage(sys.stderr)
+        sys.stderr.write(f"error: {e}\n")
+        return 2
+    args.batch_mode = False
+
+    if args.profile or args.profile_trace or args.cprofile:
+        profiler.enable(trace=bool(args.profile_trace), use_cprofile=args.cprofile)
+    try:
+        if not args.command and not args.batch:
+            if menu is None:
+                parser.print_usage(sys.stderr)
+                return 2
+            menu()
+            return 0
+        return _run_noninteractive(parser, args)
+    finally:
+        if profiler.enabled:
+            from rich.console import Console
+            profiler.print_summary(Console(stderr=True))
+            if args.profile_trace:
+                profiler.export(args.profile_trace)
+
+
+def _run_noninteractive(parser, args):
+    create_db_and_tables(verbose=False)
+    session = get_session()
+    try:
+        if args.batch:
+            return 1 if run_batch(parser, session, args.output, sys.stdin) else 0
+        run_command(session, args, args.output)
+        return 0
+    except Exception as e:
+        session.rollback()
+        sys.stderr.write(f"error: {e}\n")
+        return 1
+    finally:
+        session.close()
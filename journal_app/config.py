@@ -0,0 +1,115 @@
+import configparser
+import os
+from dataclasses import dataclass, fields
+
+CONFIG_ENV_VAR = "JOURNAL_CONFIG"
+CONFIG_FILE_LOCATIONS = (
+    "journal.ini",
+    os.path.join(os.path.expanduser("~"), ".config", "journal_app", "config.ini"),
+)
+
+
+@dataclass
+class DatabaseSettings:
+    """Database location and SQLite tuning knobs.
+
+    Values come from the defaults below, then the [database] section of the
+    config file, then JOURNAL_DB_* environment variables (e.g. JOURNAL_DB_PATH,
+    JOURNAL_DB_BUSY_TIMEOUT), each overriding the previous source.
+    """
+    url: str = ""
+    path: str = "journal.db"
+    journal_mode: str = "wal"
+    synchronous: str = "normal"
+    busy_timeout: int = 5000        # milliseconds
+    cache_size: int = -64000        # negative means KiB, so 64 MiB
+    mmap_size: int = 268435456      # 256 MiB
+    temp_store: str = "memory"
+    foreign_keys: bool = False
+    pool: str = "queue"             # "queue" for threaded use, "null" for multi-process use
+    pool_size: int = 5
+    max_overflow: int = 10
+    compression: str = "none"       # entry content codec: "none", "zlib", "zstd" or "auto"
+    compression_threshold: int = 1024   # bytes; shorter content is stored uncompressed
+    attachments_path: str = ""      # attachment store directory; defaults to <db name>_attachments
+    query_cache_size: int = 128     # listing/search results kept in memory; 0 disables the cache
+    backup_path: str = ""           # snapshot directory; defaults to <db name>_backups
+    backup_keep: int = 7            # snapshots kept by rotation
+    backup_interval: int = 0        # minutes between scheduled backups while the menu runs; 0 disables
+    backup_pages: int = 256         # pages copied per backup step
+    backup_sleep: int = 50          # milliseconds to pause between backup steps
+    similarity_path: str = ""       # related-entries index directory; defaults to <db name>_similarity
+    analytics_path: str = ""        # analytics snapshot file; defaults to <db name>_analytics.npz
+    partitions_path: str = ""       # archived per-year files; defaults to <db name>_partitions
+    api_host: str = "127.0.0.1"     # address the read-only HTTP API listens on
+    api_port: int = 8765
+
+    @property
+    def database_url(self) -> str:
+        """The SQLAlchemy URL, built from path unless url is set explicitly."""
+        return self.url or f"sqlite:///{self.path}"
+
+    @property
+    def attachments_directory(self) -> str:
+        """Where attachment files are stored, next to the database unless set explicitly."""
+        return self.attachments_path or os.path.splitext(self.path)[0] + "_attachments"
+
+    @property
+    def backups_directory(self) -> str:
+        """Where backup snapshots are written, next to the database unless set explicitly."""
+        return self.backup_path or os.path.splitext(self.path)[0] + "_backups"
+
+    @property
+    def similarity_directory(self) -> str:
+        """Where the related-entries index is kept, next to the database unless set explicitly."""
+        return self.similarity_path or os.path.splitext(self.path)[0] + "_similarity"
+
+    @property
+    def analytics_file(self) -> str:
+        """Where the columnar analytics snapshot is cached, next to the database unless set explicitly."""
+        return self.analytics_path or os.path.splitext(self.path)[0] + "_analytics.npz"
+
+
+def _coerce(value: str, current):
+    """Converts a config/env string to the type of the field's default."""
+    if isinstance(current, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(current, int):
+        return int(value)
+    return value.strip()
+
+
+def find_config_file():
+    """Returns the config file to read, or None when there is none."""
+    explicit = os.environ.get(CONFIG_ENV_VAR)
+    if explicit:
+        return explicit
+    for location in CONFIG_FILE_LOCATIONS:
+        if os.path.exists(location):
+            return location
+    return None
+
+
+def load_settings(config_file: str = None, environ=None) -> DatabaseSettings:
+    """Builds DatabaseSettings from defaults, the config file and the environment."""
+    environ = os.environ if environ is None else environ
+    settings = DatabaseSettings()
+    values = {}
+
+    config_file = config_file or find_config_file()
+    if config_file:
+        parser = configparser.ConfigParser()
+        if not parser.read(config_file):
+            raise FileNotFoundError(f"Config file '{config_file}' could not be read.")
+        if parser.has_section("database"):
+            values.update(parser.items("database"))
+
+    for field in fields(DatabaseSettings):
+        env_value = environ.get(f"JOURNAL_DB_{field.name.upper()}")
+        if env_value is not None:
+            values[field.name] = env_value
+
+    for field in fields(DatabaseSettings):
+        if field.name in values:
+            setattr(settings, field.name, _coerce(values[field.name], getattr(settings, field.name)))
+    return settings
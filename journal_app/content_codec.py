@@ -0,0 +1,119 @@
+import zlib
+from sqlalchemy import text
+from sqlalchemy.types import TypeDecorator, String
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+CODECS = ('none', 'zlib', 'zstd', 'auto')
+
+# Compressed content is stored as a BLOB starting with a one-byte codec marker;
+# content that is short or does not shrink stays plain TEXT, so old rows need no migration to be read.
+ZLIB_MARKER = b'z'
+ZSTD_MARKER = b's'
+
+# SQL name of decode(), registered on every connection for the FTS triggers and source view.
+SQL_FUNCTION = 'journal_content'
+
+
+def decode(value):
+    """Returns stored content as text, decompressing it if it carries a codec marker."""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    marker, payload = value[:1], value[1:]
+    if marker == ZLIB_MARKER:
+        return zlib.decompress(payload).decode('utf-8')
+    if marker == ZSTD_MARKER:
+        if zstandard is None:
+            raise ValueError("This entry is zstd-compressed; install the 'zstandard' package to read it.")
+        return zstandard.ZstdDecompressor().decompress(payload).decode('utf-8')
+    raise ValueError(f"Unknown content codec marker {marker!r}.")
+
+
+class ContentCodec:
+    """How new content is stored: codec name and the size in bytes below which it stays plain text."""
+
+    def __init__(self, codec: str = 'none', threshold: int = 1024):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown compression '{codec}'. Use one of: {', '.join(CODECS)}.")
+        if codec == 'auto':
+            codec = 'zstd' if zstandard is not None else 'zlib'
+        if codec == 'zstd' and zstandard is None:
+            raise ValueError("zstd compression needs the 'zstandard' package.")
+        self.codec = codec
+        self.threshold = threshold
+        self._zstd = zstandard.ZstdCompressor(level=3) if codec == 'zstd' else None
+
+    def encode(self, content):
+        """Returns the value to store for content: the text itself or a marked, compressed BLOB."""
+        if content is None or self.codec == 'none':
+            return content
+        raw = content.encode('utf-8')
+        if len(raw) < self.threshold:
+            return content
+        if self.codec == 'zlib':
+            packed = ZLIB_MARKER + zlib.compress(raw, 6)
+        else:
+            packed = ZSTD_MARKER + self._zstd.compress(raw)
+        return packed if len(packed) < len(raw) else content
+
+
+def attach_codec(engine, settings):
+    """Makes engine store entry content with the codec configured in settings."""
+    engine.dialect.content_codec = ContentCodec(settings.compression, settings.compression_threshold)
+
+
+def register_functions(dbapi_connection):
+    """Registers journal_content(value) on a DB-API connection so SQL can read compressed content."""
+    dbapi_connection.create_function(SQL_FUNCTION, 1, decode, deterministic=True)
+
+
+class ContentText(TypeDecorator):
+    """Text column that is compressed on write according to the engine's ContentCodec.
+
+    Reads always decode, whatever codec the engine is configured with, so
+    switching codecs never makes existing rows unreadable.
+    """
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        codec = getattr(dialect, 'content_codec', None)
+        return codec.encode(value) if codec else value
+
+    def process_result_value(self, value, dialect):
+        return decode(value)
+
+
+def recompress_content(connection, codec: ContentCodec, batch_size: int = 500):
+    """Re-encodes every stored entry body with codec; the migration for existing databases.
+
+    Works in id order, batch_size rows per SELECT, and only rewrites rows
+    whose stored form changes. Returns (examined, rewritten, bytes_before, bytes_after).
+    """
+    examined = rewritten = bytes_before = bytes_after = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            text("SELECT id, content FROM entries WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {'last_id': last_id, 'limit': batch_size},
+        ).all()
+        if not rows:
+            return examined, rewritten, bytes_before, bytes_after
+        updates = []
+        for entry_id, stored in rows:
+            encoded = codec.encode(decode(stored))
+            before = len(stored.encode('utf-8') if isinstance(stored, str) else stored)
+            after = len(encoded.encode('utf-8') if isinstance(encoded, str) else encoded)
+            bytes_before += before
+            bytes_after += after
+            if type(encoded) is not type(stored) or encoded != stored:
+                updates.append({'id': entry_id, 'content': encoded})
+        if updates:
+            connection.execute(text("UPDATE entries SET content = :content WHERE id = :id"), updates)
+        examined += len(rows)
+        rewritten += len(updates)
+        last_id = rows[-1][0]
@@ -1,17 +1,109 @@
-from sqlalchemy import create_engine
+import os
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from .models import Base  
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+from .content_codec import attach_codec, register_functions
+from .config import load_settings
+from .profiling import profiler
+from .migrations import bootstrap, SCHEMA_VERSION
+from .query_cache import QueryCache, file_signature, track_writes
 
-DATABASE_URL = "sqlite:///journal.db" 
+settings = load_settings()
+DATABASE_URL = settings.database_url
 
-engine = create_engine(DATABASE_URL)
+
+def _is_memory_database(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def apply_pragmas(dbapi_connection, settings):
+    """Applies the configured SQLite pragmas to a freshly opened DB-API connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.busy_timeout)}")
+        cursor.execute(f"PRAGMA journal_mode = {settings.journal_mode}")
+        cursor.execute(f"PRAGMA synchronous = {settings.synchronous}")
+        cursor.execute(f"PRAGMA cache_size = {int(settings.cache_size)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings.mmap_size)}")
+        cursor.execute(f"PRAGMA temp_store = {settings.temp_store}")
+        cursor.execute(f"PRAGMA foreign_keys = {'ON' if settings.foreign_keys else 'OFF'}")
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine):
+    """Feeds every statement's duration to the profiler while profiling is enabled."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if profiler.enabled:
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if profiler.enabled and conn.info.get("query_start"):
+            profiler.record(statement, time.perf_counter() - conn.info["query_start"].pop())
+
+
+def build_engine(settings):
+    """Creates an engine for the given DatabaseSettings with pragmas and pooling applied.
+
+    The queue pool shares connections between threads (hence check_same_thread
+    is off); the null pool opens a connection per checkout, which is the safe
+    choice when several processes use the same file.
+    """
+    url = settings.database_url
+    connect_args = {"check_same_thread": False, "timeout": settings.busy_timeout / 1000}
+    if _is_memory_database(url):
+        engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    elif settings.pool == "null":
+        engine = create_engine(url, connect_args=connect_args, poolclass=NullPool)
+    elif settings.pool == "queue":
+        engine = create_engine(
+            url, connect_args=connect_args, poolclass=QueuePool,
+            pool_size=settings.pool_size, max_overflow=settings.max_overflow,
+        )
+    else:
+        raise ValueError(f"Unknown pool '{settings.pool}'. Use 'queue' or 'null'.")
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, settings)
+        register_functions(dbapi_connection)
+
+    attach_codec(engine, settings)
+    instrument_engine(engine)
+    return engine
+
+
+def build_query_cache(engine, settings):
+    """Creates the query cache for engine's database and hooks it to the engine's commits."""
+    database = engine.url.database
+    signature = None if _is_memory_database(str(engine.url)) or not database else file_signature(database)
+    cache = QueryCache(settings.query_cache_size, signature)
+    track_writes(engine, cache)
+    return cache
+
+
+engine = build_engine(settings)
 Session = sessionmaker(bind=engine)
+query_cache = build_query_cache(engine, settings)
+
+# A forked child must not reuse the parent's pooled SQLite connections.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
+def create_db_and_tables(verbose: bool = True):
+    """Creates or upgrades the database schema; a single lookup when it is already current.
 
-def create_db_and_tables():
-    """Creates all tables defined in models.py if they don't exist."""
-    Base.metadata.create_all(engine)
-    print(f"Database and tables created at {DATABASE_URL}")
+    Returns the migration versions that were applied.
+    """
+    with engine.connect() as connection:
+        applied = bootstrap(connection)
+    if verbose and applied:
+        print(f"Database schema at {DATABASE_URL} upgraded to version {SCHEMA_VERSION}.")
+    return applied
 
 def get_session():
     """Returns a new session."""
-    return Session()
\ No newline at end of file
+    return Session()
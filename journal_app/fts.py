@@ -0,0 +1,145 @@
+import re
+from sqlalchemy import Integer, column, text
+
+# Markers SQLite wraps around matched terms in snippets. Control characters are
+# used so they can never collide with user text or rich markup.
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+# The index reads through a view that decodes compressed content, so snippets and
+# 'rebuild' see plain text. Touching compressed rows therefore needs the journal_content()
+# SQL function, which the app registers on every connection.
+FTS_SOURCE_VIEW = "entries_fts_source"
+
+
+def _decoded(column: str) -> str:
+    """SQL for a content column as text; plain TEXT values skip the Python function call."""
+    return f"CASE WHEN typeof({column}) = 'blob' THEN journal_content({column}) ELSE {column} END"
+
+
+FTS_DDL = [
+    f"""
+    CREATE VIEW IF NOT EXISTS {FTS_SOURCE_VIEW} AS
+    SELECT id, title, {_decoded('content')} AS content FROM entries
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+        title, content,
+        content='{FTS_SOURCE_VIEW}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS entries_fts_ai AFTER INSERT ON entries BEGIN
+        INSERT INTO entries_fts(rowid, title, content)
+        VALUES (new.id, new.title, {_decoded('new.content')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS entries_fts_ad AFTER DELETE ON entries BEGIN
+        INSERT INTO entries_fts(entries_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, {_decoded('old.content')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS entries_fts_au AFTER UPDATE OF title, content ON entries BEGIN
+        INSERT INTO entries_fts(entries_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, {_decoded('old.content')});
+        INSERT INTO entries_fts(rowid, title, content)
+        VALUES (new.id, new.title, {_decoded('new.content')});
+    END
+    """,
+]
+
+FTS_DROP = [
+    "DROP TRIGGER IF EXISTS entries_fts_ai",
+    "DROP TRIGGER IF EXISTS entries_fts_ad",
+    "DROP TRIGGER IF EXISTS entries_fts_au",
+    "DROP TABLE IF EXISTS entries_fts",
+    f"DROP VIEW IF EXISTS {FTS_SOURCE_VIEW}",
+]
+
+_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def ensure_fts(connection):
+    """Creates the FTS5 index and its sync triggers, backfilling it if it is new."""
+    existing = connection.execute(
+        text("SELECT sql FROM sqlite_master WHERE type='table' AND name='entries_fts'")
+    ).first()
+    exists = existing is not None
+    if exists and FTS_SOURCE_VIEW not in existing.sql:
+        # Indexes created before content compression read entries.content directly.
+        for statement in FTS_DROP:
+            connection.execute(text(statement))
+        exists = False
+    for statement in FTS_DDL:
+        connection.execute(text(statement))
+    if not exists:
+        rebuild_fts(connection)
+
+
+def rebuild_fts(connection):
+    """Repopulates the FTS5 index from the entries table."""
+    connection.execute(text("INSERT INTO entries_fts(entries_fts) VALUES ('rebuild')"))
+
+
+def build_match_query(keyword: str) -> str:
+    """Turns user input into a safe FTS5 MATCH expression.
+
+    Words are ANDed together, "quoted text" is matched as a phrase and a
+    trailing * turns a word into a prefix query.
+    """
+    terms = []
+    for phrase, word in _TOKEN_RE.findall(keyword):
+        if phrase:
+            terms.append('"' + phrase.replace('"', '""') + '"')
+            continue
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if not word:
+            continue
+        terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return " ".join(terms)
+
+
+def search(session, keyword: str, limit: int = None):
+    """Returns (entry_id, rank, snippet) rows for a keyword, best matches first."""
+    match = build_match_query(keyword)
+    if not match:
+        return []
+    sql = (
+        "SELECT rowid, bm25(entries_fts, 10.0, 1.0) AS rank, "
+        "snippet(entries_fts, -1, :hl_start, :hl_end, '…', 12) AS snippet "
+        "FROM entries_fts WHERE entries_fts MATCH :match ORDER BY rank"
+    )
+    params = {"match": match, "hl_start": HIGHLIGHT_START, "hl_end": HIGHLIGHT_END}
+    if limit:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+    return session.execute(text(sql), params).all()
+
+
+def match_ids(keyword: str):
+    """Returns a SELECT of the ids of entries matching keyword, for IN (...) criteria.
+
+    Returns None when the keyword contains no searchable terms.
+    """
+    match = build_match_query(keyword)
+    if not match:
+        return None
+    return (
+        text("SELECT rowid FROM entries_fts WHERE entries_fts MATCH :match")
+        .bindparams(match=match)
+        .columns(column('rowid', Integer))
+    )
+
+
+def snippet_markup(snippet: str, style: str = "bold red") -> str:
+    """Converts a raw FTS snippet into rich markup with the matches highlighted."""
+    from rich.markup import escape
+    return (
+        escape(snippet or "")
+        .replace(HIGHLIGHT_START, f"[{style}]")
+        .replace(HIGHLIGHT_END, f"[/{style}]")
+    )
@@ -0,0 +1,104 @@
+import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from .models import Base
+from .fts import ensure_fts
+from .stats import ensure_stats
+from .attachments import ensure_attachments
+from .similarity import ensure_similarity
+from .change_state import ensure_change_state, ensure_change_triggers
+from .partitions import autoincrement_entries, ensure_partitions
+
+SCHEMA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )
+"""
+
+
+def _baseline(connection):
+    """Everything up to the introduction of schema_version; each step is idempotent,
+    so databases created by earlier releases are brought up to date in place."""
+    Base.metadata.create_all(connection)
+    # create_all skips indexes on tables that already exist, so add any new ones.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    ensure_fts(connection)
+    ensure_stats(connection)
+    ensure_attachments(connection)
+
+
+# (version, description, step) in order. Append new steps; never change one that has shipped.
+MIGRATIONS = [
+    (1, "baseline: tables, indexes, search index, statistics, attachment triggers", _baseline),
+    (2, "similarity index change queue", ensure_similarity),
+    (3, "change counter for the analytics snapshot", ensure_change_state),
+    (4, "change counter covers titles, tag names and attachments", ensure_change_triggers),
+    (5, "registry of years archived to partition files", ensure_partitions),
+    (6, "entry ids are never reused, so archived ids stay unique", autoincrement_entries),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+class SchemaVersionError(RuntimeError):
+    """Raised when the database was written by a newer version of the app."""
+
+
+def current_version(connection) -> int:
+    """Returns the database's schema version, 0 for a database that predates schema_version."""
+    try:
+        return connection.execute(text("SELECT max(version) FROM schema_version")).scalar() or 0
+    except OperationalError:
+        return 0
+
+
+def upgrade(connection):
+    """Applies pending migrations inside the connection's transaction. Returns the versions applied."""
+    connection.execute(text(SCHEMA_VERSION_DDL))
+    version = current_version(connection)
+    if version > SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"The database has schema version {version}, but this app only knows up to {SCHEMA_VERSION}."
+        )
+    applied = []
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        step(connection)
+        connection.execute(
+            text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+            {'v': number, 'd': description, 't': datetime.datetime.now().isoformat(timespec='seconds')},
+        )
+        applied.append(number)
+    return applied
+
+
+def bootstrap(connection):
+    """Brings the schema up to date. When it already is, this costs a single query.
+
+    Otherwise the migrations run under BEGIN IMMEDIATE, so when several
+    processes start at once one migrates and the others wait, then find
+    nothing left to do. Foreign keys are off meanwhile, as SQLite needs
+    for rebuilding a table; they can only be switched outside a transaction.
+    Returns the versions applied.
+    """
+    if current_version(connection) == SCHEMA_VERSION:
+        return []
+    foreign_keys = connection.exec_driver_sql("PRAGMA foreign_keys").scalar()
+    if foreign_keys:
+        connection.exec_driver_sql("PRAGMA foreign_keys = OFF")
+    try:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            applied = upgrade(connection)
+        except Exception:
+            connection.rollback()
+            raise
+        connection.commit()
+    finally:
+        if foreign_keys:
+            connection.exec_driver_sql("PRAGMA foreign_keys = ON")
+    return applied
@@ -1,8 +1,8 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Boolean 
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
+from sqlalchemy.orm import declarative_base, relationship, deferred
 from sqlalchemy.schema import Table
 import datetime
+from .content_codec import ContentText
 
 
 Base = declarative_base()
@@ -10,7 +10,9 @@ Base = declarative_base()
 entry_tag_association = Table(
     'entry_tag_association', Base.metadata,
     Column('entry_id', Integer, ForeignKey('entries.id'), primary_key=True),
-    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True)
+    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True),
+    # Reverse lookup for "entries with tag X"; the primary key only serves entry_id first.
+    Index('ix_entry_tag_tag_entry', 'tag_id', 'entry_id')
 )
 
 class Entry(Base):
@@ -19,16 +21,28 @@ class Entry(Base):
 
     id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
-    content = Column(String, nullable=False)
+    # Deferred so listings never load bodies; may be stored compressed (see content_codec).
+    content = deferred(Column(ContentText, nullable=False))
     date = Column(DateTime, default=datetime.datetime.utcnow)
     is_private = Column(Boolean, default=True, nullable=False)
 
+    # Supports newest-first listings and keyset pagination on (date, id). AUTOINCREMENT
+    # keeps ids of deleted and archived entries from being handed out again.
+    __table_args__ = (Index('ix_entries_date_id', 'date', 'id'), {'sqlite_autoincrement': True})
     
     tags = relationship(
         'Tag',
         secondary=entry_tag_association,
         back_populates='entries'
     )
+    # Attachment rows are removed by a trigger when the entry is deleted, so the ORM need not load them.
+    attachments = relationship(
+        'Attachment',
+        back_populates='entry',
+        cascade='all, delete-orphan',
+        passive_deletes=True,
+        order_by='Attachment.id'
+    )
 
     def __repr__(self):
         privacy_status = "Private" if self.is_private else "Public"
@@ -38,12 +52,14 @@ class Entry(Base):
         """Returns a formatted string for displaying an entry."""
         tag_names = ", ".join([tag.name for tag in self.tags]) if self.tags else "No Tags"
         privacy_status = "PRIVATE" if self.is_private else "PUBLIC"
+        attachment_names = ", ".join(f"{a.filename} (#{a.id})" for a in self.attachments) or "None"
         return (
             f"\n--- Entry ID: {self.id} ---\n"
             f"Title: {self.title}\n"
             f"Date: {self.date.strftime('%Y-%m-%d %H:%M')}\n"
             f"Status: {privacy_status}\n"
             f"Tags: {tag_names}\n"
+            f"Attachments: {attachment_names}\n"
             f"Content:\n{self.content}\n"
             f"-------------------------"
         )
@@ -62,4 +78,29 @@ class Tag(Base):
     )
 
     def __repr__(self):
-        return f"<Tag(id={self.id}, name='{self.name}')>"
\ No newline at end of file
+        return f"<Tag(id={self.id}, name='{self.name}')>"
+
+class Attachment(Base):
+    """A file attached to an entry; the bytes live in the attachment store under their SHA-256."""
+    __tablename__ = 'attachments'
+
+    id = Column(Integer, primary_key=True)
+    entry_id = Column(Integer, ForeignKey('entries.id', ondelete='CASCADE'), nullable=False, index=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    media_type = Column(String)
+    size = Column(Integer, nullable=False)
+    created = Column(DateTime, default=datetime.datetime.utcnow)
+
+    entry = relationship('Entry', back_populates='attachments')
+
+    def __repr__(self):
+        return f"<Attachment(id={self.id}, entry_id={self.entry_id}, filename='{self.filename}')>"
+
+class AttachmentBlob(Base):
+    """One stored file and the number of attachments referencing it, maintained by triggers."""
+    __tablename__ = 'attachment_blobs'
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,658 @@
+import datetime
+import heapq
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from collections import Counter, namedtuple
+from contextlib import ExitStack, contextmanager
+from sqlalchemy import MetaData, create_engine, delete, event, func, select, text
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.orm import Session, selectinload, undefer
+from sqlalchemy.pool import NullPool, QueuePool
+from .content_codec import register_functions
+from .fts import ensure_fts
+from .models import Base, Entry, Attachment, entry_tag_association
+from . import queries, services, stats
+
+# Past years can be moved out of the live database into one SQLite file per year.
+# The live database keeps every write path, the tags (the shared catalog) and this
+# registry; an archived year is compacted and then only ever opened read-only.
+# Listings, searches, entry details, exports, the static site and the statistics
+# span both; editing an archived entry, and analytics and related entries, need its
+# year restored first.
+PARTITIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS partitions (
+        year INTEGER PRIMARY KEY,
+        filename TEXT NOT NULL,
+        entry_count INTEGER NOT NULL,
+        first_date DATETIME NOT NULL,
+        last_date DATETIME NOT NULL,
+        size INTEGER NOT NULL,
+        archived_at DATETIME NOT NULL
+    )
+"""
+
+PARTITION_PREFIX = "entries-"
+PARTITION_SUFFIX = ".db"
+PARTIAL_SUFFIX = ".partial"
+CATALOG_SCHEMA = "catalog"
+
+Partition = namedtuple('Partition', ['year', 'path', 'entry_count', 'first_date', 'last_date', 'size', 'archived_at'])
+ArchiveResult = namedtuple('ArchiveResult', ['year', 'path', 'entries', 'kept', 'size', 'seconds'])
+# One archived year's share of the statistics: {'entries': n, 'private': n},
+# {month: (entry_count, private_count)} and {tag_id: entry_count}.
+ArchivedStats = namedtuple('ArchivedStats', ['totals', 'monthly', 'tags'])
+
+
+class PartitionError(RuntimeError):
+    """Raised when a year cannot be archived or restored."""
+
+
+class MissingPartitionWarning(UserWarning):
+    """Issued when a registered year's file is missing or changed on disk; reads leave that year out."""
+
+
+def ensure_partitions(connection):
+    """Creates the registry of archived years."""
+    connection.execute(text(PARTITIONS_DDL))
+
+
+def _database_path(bind) -> str:
+    database = bind.url.database
+    if not database or database == ':memory:':
+        raise PartitionError("Archiving years needs a database file.")
+    return os.path.abspath(database)
+
+
+def _parse(value):
+    return value if isinstance(value, datetime.datetime) else datetime.datetime.fromisoformat(value)
+
+
+def _archived_max_id(connection) -> int:
+    """The highest entry id in any archived year, read from the files themselves."""
+    rows = connection.execute(text("SELECT filename FROM partitions")).all()
+    if not rows:
+        return 0
+    directory = partitions_directory(connection.engine)
+    highest = 0
+    for (filename,) in rows:
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            continue
+        archived = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+        try:
+            highest = max(highest, archived.execute("SELECT max(id) FROM entries").fetchone()[0] or 0)
+        finally:
+            archived.close()
+    return highest
+
+
+def autoincrement_entries(connection):
+    """Rebuilds entries with AUTOINCREMENT, unless it has it, and starts its id sequence past every archived id.
+
+    Without it SQLite hands out max(id) + 1, which reuses the ids of an
+    archived year once the live entries above them are deleted. The table
+    is copied as is and its indexes and triggers recreated from their
+    stored SQL; bootstrap runs this with foreign keys off.
+    """
+    created = connection.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'entries'")).scalar()
+    if 'AUTOINCREMENT' not in created.upper():
+        dependents = connection.execute(text(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = 'entries' AND type IN ('index', 'trigger') "
+            "AND sql IS NOT NULL ORDER BY type, name"
+        )).scalars().all()
+        rebuilt = Entry.__table__.to_metadata(MetaData(), name='entries_rebuilt')
+        connection.execute(CreateTable(rebuilt))
+        connection.execute(text(
+            "INSERT INTO entries_rebuilt (id, title, content, date, is_private) "
+            "SELECT id, title, content, date, is_private FROM entries"
+        ))
+        connection.execute(text("DROP TABLE entries"))
+        # Legacy renaming leaves the search index's view alone; it names entries, as it should.
+        connection.execute(text("PRAGMA legacy_alter_table = ON"))
+        connection.execute(text("ALTER TABLE entries_rebuilt RENAME TO entries"))
+        connection.execute(text("PRAGMA legacy_alter_table = OFF"))
+        for statement in dependents:
+            connection.execute(text(statement))
+    floor = max(connection.execute(text("SELECT max(id) FROM entries")).scalar() or 0, _archived_max_id(connection))
+    if floor and not connection.execute(
+        text("UPDATE sqlite_sequence SET seq = max(seq, :floor) WHERE name = 'entries'"), {'floor': floor}
+    ).rowcount:
+        connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('entries', :floor)"), {'floor': floor})
+
+
+def partitions_directory(bind) -> str:
+    """Where archived years live: the partitions_path setting, or <db name>_partitions next to the database."""
+    from .database import settings
+    return settings.partitions_path or os.path.splitext(_database_path(bind))[0] + "_partitions"
+
+
+def list_partitions(session):
+    """Returns the archived years, newest first; empty (and cheap) when nothing was archived."""
+    rows = session.execute(text(
+        "SELECT year, filename, entry_count, first_date, last_date, size, archived_at FROM partitions ORDER BY year DESC"
+    )).all()
+    if not rows:
+        return []
+    directory = partitions_directory(session.get_bind())
+    return [
+        Partition(row.year, os.path.join(directory, row.filename), row.entry_count,
+                  _parse(row.first_date), _parse(row.last_date), row.size, _parse(row.archived_at))
+        for row in rows
+    ]
+
+
+def partition_problem(partition: Partition):
+    """Returns why a registered year's file cannot be read, or None when it is on disk as registered."""
+    try:
+        size = os.path.getsize(partition.path)
+    except OSError:
+        return f"{partition.year}: '{partition.path}' is missing"
+    if size != partition.size:
+        return f"{partition.year}: '{partition.path}' is {size} bytes, the registry says {partition.size}"
+    return None
+
+
+def _readable(session):
+    """The archived years whose files are on disk as registered, newest first; the others are skipped with a warning.
+
+    A database restored from an older backup, or a file deleted by hand,
+    then costs the reads that year's entries instead of failing them all.
+    """
+    readable = []
+    for partition in list_partitions(session):
+        problem = partition_problem(partition)
+        if problem:
+            warnings.warn(f"Leaving out archived year {problem}.", MissingPartitionWarning, stacklevel=3)
+        else:
+            readable.append(partition)
+    return readable
+
+
+def check_partitions(session):
+    """Compares the registry with the partition directory. Returns a list of problems, empty when they agree."""
+    partitions = list_partitions(session)
+    problems = [problem for problem in map(partition_problem, partitions) if problem]
+    directory = partitions_directory(session.get_bind())
+    registered = {os.path.basename(partition.path) for partition in partitions}
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if name.startswith(PARTITION_PREFIX) and name.endswith(PARTITION_SUFFIX) and name not in registered:
+                problems.append(f"'{os.path.join(directory, name)}' is not a registered year")
+    return problems
+
+
+def _overlapping(partitions, start=None, end=None):
+    """Prunes partitions to those whose date span meets [start, end)."""
+    return [
+        partition for partition in partitions
+        if (start is None or partition.last_date >= start) and (end is None or partition.first_date < end)
+    ]
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _connect(path: str, catalog: str):
+    # immutable: the file never changes while it is registered, so SQLite can skip locking.
+    connection = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+    register_functions(connection)
+    # Tag names resolve through the catalog; the partition file has no tags table.
+    connection.execute(f"ATTACH DATABASE ? AS {CATALOG_SCHEMA}", (f"file:{catalog}?mode=ro",))
+    return connection
+
+
+def _engine_for(partition: Partition, catalog: str):
+    status = os.stat(partition.path)
+    # A file put back under the same name (by a restore, in this process or another) is a new engine.
+    identity = (status.st_ino, status.st_mtime_ns)
+    with _engines_lock:
+        cached = _engines.get(partition.path)
+        if cached is not None and cached[0] == identity:
+            return cached[1]
+        if cached is not None:
+            cached[1].dispose()
+        # Pooled: the file is immutable, so a kept connection can never see stale data.
+        engine = create_engine("sqlite://", creator=lambda: _connect(partition.path, catalog), poolclass=QueuePool)
+        _engines[partition.path] = (identity, engine)
+        return engine
+
+
+def _forget_engine(path: str):
+    with _engines_lock:
+        cached = _engines.pop(path, None)
+        _archived_stats.pop(path, None)
+    if cached is not None:
+        cached[1].dispose()
+
+
+@contextmanager
+def partition_session(session, partition: Partition):
+    """A read-only session on one archived year, with the live database attached for tag names.
+
+    The application's queries run on it unchanged: entries and tag links
+    resolve to the partition, tags to the catalog.
+    """
+    archived = Session(bind=_engine_for(partition, _database_path(session.get_bind())))
+    try:
+        yield archived
+    finally:
+        archived.close()
+
+
+def _sort_key(row):
+    return row.date, row.id
+
+
+def page_entries(session, limit, after=None, before=None):
+    """queries.page_entries across the live database and the archived years.
+
+    Only years that can hold rows past the key are opened, in date order,
+    and only until limit rows are found: years never overlap, so an older
+    year cannot beat a newer one's rows.
+    """
+    rows = queries.page_entries(session, limit, after=after, before=before)
+    partitions = _readable(session)
+    if not partitions:
+        return rows
+    # A full page from the live database also bounds the dates an archived row needs to beat it.
+    full = len(rows) >= limit
+    found = []
+    if before is None:
+        candidates = _overlapping(
+            partitions,
+            start=rows[-1].date if full else None,
+            end=after[0] + datetime.timedelta(microseconds=1) if after else None,
+        )
+    else:
+        candidates = _overlapping(
+            partitions, start=before[0], end=rows[0].date + datetime.timedelta(microseconds=1) if full else None
+        )[::-1]
+    for partition in candidates:
+        if len(found) >= limit:
+            break
+        with partition_session(session, partition) as archived:
+            found += queries.page_entries(archived, limit - len(found), after=after, before=before)
+    if before is None:
+        return sorted(rows + found, key=_sort_key, reverse=True)[:limit]
+    return sorted(rows + found, key=_sort_key)[:limit][::-1]
+
+
+def has_entries(session, after=None, before=None):
+    """queries.has_entries across the live database and the archived years."""
+    if queries.has_entries(session, after=after, before=before):
+        return True
+    partitions = _readable(session)
+    if after is not None:
+        partitions = _overlapping(partitions, end=after[0] + datetime.timedelta(microseconds=1))
+    if before is not None:
+        partitions = _overlapping(partitions, start=before[0])
+    for partition in partitions:
+        with partition_session(session, partition) as archived:
+            if queries.has_entries(archived, after=after, before=before):
+                return True
+    return False
+
+
+def search_dates(session, start, end, limit: int = None):
+    """services.search_dates across the live database and the archived years that overlap [start, end)."""
+    rows = services.search_dates(session, start, end, limit=limit)
+    if limit and len(rows) >= limit:
+        start = max(start, rows[-1].date) if start else rows[-1].date
+    found = []
+    for partition in _overlapping(_readable(session), start, end):
+        if limit and len(found) >= limit:
+            break
+        with partition_session(session, partition) as archived:
+            found += services.search_dates(archived, start, end, limit=limit - len(found) if limit else None)
+    if not found:
+        return rows
+    return sorted(rows + found, key=_sort_key, reverse=True)[:limit]
+
+
+def search_keyword(session, keyword: str):
+    """services.search_keyword across the live database and every archived year.
+
+    Live matches come first in rank order, then each archived year's,
+    newest year first; ranks are per file, so they are not merged.
+    """
+    rows, snippets = services.search_keyword(session, keyword)
+    for partition in _readable(session):
+        with partition_session(session, partition) as archived:
+            found, found_snippets = services.search_keyword(archived, keyword)
+        rows += found
+        snippets.update(found_snippets)
+    return rows, snippets
+
+
+def search_tags(session, expression: str, keyword: str = None, start=None, end=None, limit: int = None):
+    """services.search_tags across the live database and the archived years that overlap [start, end)."""
+    rows, snippets = services.search_tags(session, expression, keyword, start, end, limit)
+    found = []
+    for partition in _overlapping(_readable(session), start, end):
+        if limit and len(found) >= limit:
+            break
+        with partition_session(session, partition) as archived:
+            more, more_snippets = services.search_tags(archived, expression, keyword, start, end, limit)
+        found += more
+        if more_snippets:
+            snippets.update(more_snippets)
+    if not found:
+        return rows, snippets
+    if keyword:
+        return (rows + found)[:limit] if limit else rows + found, snippets
+    return sorted(rows + found, key=_sort_key, reverse=True)[:limit], snippets
+
+
+def get_entry(session, entry_id: int):
+    """services.get_entry, falling back to the archived years.
+
+    Archived entries come back detached, with content, tags and attachments loaded.
+    """
+    entry = services.get_entry(session, entry_id)
+    if entry is not None:
+        return entry
+    for partition in _readable(session):
+        with partition_session(session, partition) as archived:
+            entry = archived.execute(
+                select(Entry).where(Entry.id == entry_id)
+                .options(undefer(Entry.content), selectinload(Entry.tags), selectinload(Entry.attachments))
+            ).scalar_one_or_none()
+            if entry is not None:
+                archived.expunge_all()
+                return entry
+    return None
+
+
+def _stream_key(row):
+    # SQLite sorts entries without a date first.
+    return row.date or datetime.datetime.min, row.id
+
+
+def iter_rows(session, statement):
+    """Streams statement's rows from the live database and every archived year, merged oldest first.
+
+    statement must select Entry.id and Entry.date and be ordered by them;
+    each file's rows are fetched as the merge reaches them.
+    """
+    with ExitStack() as stack:
+        streams = [session.execute(statement)]
+        for partition in _readable(session):
+            archived = stack.enter_context(partition_session(session, partition))
+            streams.append(archived.execute(statement))
+        yield from heapq.merge(*streams, key=_stream_key)
+
+
+_archived_stats = {}
+
+
+def _stats_for(session, partition: Partition) -> ArchivedStats:
+    """Counts an archived year's entries, months and tag links once per file; the file never changes."""
+    status = os.stat(partition.path)
+    identity = (status.st_ino, status.st_mtime_ns)
+    with _engines_lock:
+        cached = _archived_stats.get(partition.path)
+    if cached is not None and cached[0] == identity:
+        return cached[1]
+    with partition_session(session, partition) as archived:
+        counted = ArchivedStats(
+            dict(archived.execute(text(stats.FRESH_TOTALS)).all()),
+            {row.month: (row.entry_count, row.private_count) for row in archived.execute(text(stats.FRESH_MONTHLY))},
+            dict(archived.execute(
+                text("SELECT tag_id, count(*) FROM main.entry_tag_association GROUP BY tag_id")
+            ).all()),
+        )
+    with _engines_lock:
+        _archived_stats[partition.path] = (identity, counted)
+    return counted
+
+
+def get_totals(session):
+    """stats.get_totals with the archived years' entries added."""
+    totals = stats.get_totals(session)
+    for partition in _readable(session):
+        archived = _stats_for(session, partition).totals
+        totals['entries'] += archived.get('entries', 0)
+        totals['private'] += archived.get('private', 0)
+    totals['public'] = totals['entries'] - totals['private']
+    return totals
+
+
+def get_monthly(session, limit: int = None):
+    """stats.get_monthly with the archived years' months added, newest month first."""
+    partitions = _readable(session)
+    if not partitions:
+        return stats.get_monthly(session, limit)
+    months = {row.month: (row.entry_count, row.private_count) for row in stats.get_monthly(session)}
+    for partition in partitions:
+        for month, (entry_count, private_count) in _stats_for(session, partition).monthly.items():
+            live_count, live_private = months.get(month, (0, 0))
+            months[month] = (live_count + entry_count, live_private + private_count)
+    rows = sorted(((month, *counts) for month, counts in months.items()), reverse=True)
+    return rows[:limit] if limit else rows
+
+
+def get_tag_counts(session, limit: int = None):
+    """stats.get_tag_counts with the archived years' links added; tags deleted since are left out."""
+    partitions = _readable(session)
+    if not partitions:
+        return stats.get_tag_counts(session, limit)
+    archived = Counter()
+    for partition in partitions:
+        archived.update(_stats_for(session, partition).tags)
+    rows = session.execute(text(
+        "SELECT tags.id, tags.name, coalesce(stats_tag_counts.entry_count, 0) FROM tags "
+        "LEFT JOIN stats_tag_counts ON stats_tag_counts.tag_id = tags.id"
+    )).all()
+    counts = sorted(((name, entry_count + archived[tag_id]) for tag_id, name, entry_count in rows),
+                    key=lambda row: (-row[1], row[0]))
+    return counts[:limit] if limit else counts
+
+
+def _archivable(start, end):
+    """Entries of [start, end) that can move out of the live database.
+
+    Entries with attachments stay, since attachment rows and files belong to
+    the live database. Archived ids are never handed out again: entries uses
+    AUTOINCREMENT (see autoincrement_entries).
+    """
+    return (
+        Entry.date >= start, Entry.date < end,
+        Entry.id.not_in(select(Attachment.entry_id)),
+    )
+
+
+def _build_partition(source: str, partial: str, entry_ids):
+    """Copies the given entries with their tag links from source into a new, compacted file.
+
+    Returns (entry count, first date, last date) as read back from the copy.
+    """
+    if os.path.exists(partial):
+        os.unlink(partial)
+    engine = create_engine(f"sqlite:///{partial}", poolclass=NullPool)
+    event.listen(engine, "connect", lambda dbapi_connection, record: register_functions(dbapi_connection))
+    try:
+        with engine.begin() as connection:
+            Base.metadata.create_all(connection, tables=[Entry.__table__, entry_tag_association, Attachment.__table__])
+            ensure_fts(connection)
+        with engine.connect() as connection:
+            connection.exec_driver_sql("ATTACH DATABASE ? AS source", (source,))
+            connection.exec_driver_sql("CREATE TEMP TABLE archive_ids (id INTEGER PRIMARY KEY)")
+            connection.exec_driver_sql("INSERT INTO archive_ids (id) VALUES (?)", [(entry_id,) for entry_id in entry_ids])
+            connection.exec_driver_sql(
+                "INSERT INTO main.entries (id, title, content, date, is_private) "
+                "SELECT id, title, content, date, is_private FROM source.entries "
+                "WHERE id IN (SELECT id FROM archive_ids)"
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO main.entry_tag_association (entry_id, tag_id) "
+                "SELECT entry_id, tag_id FROM source.entry_tag_association "
+                "WHERE entry_id IN (SELECT id FROM archive_ids)"
+            )
+            connection.commit()
+            connection.exec_driver_sql("DETACH DATABASE source")
+            connection.exec_driver_sql("INSERT INTO entries_fts(entries_fts) VALUES ('optimize')")
+            connection.commit()
+            # One self-contained, compacted file: it is only ever read from now on.
+            connection.exec_driver_sql("PRAGMA journal_mode = DELETE")
+            connection.exec_driver_sql("VACUUM")
+            summary = connection.exec_driver_sql("SELECT count(*), min(date), max(date) FROM entries").one()
+    finally:
+        engine.dispose()
+    with open(partial, 'rb') as handle:
+        os.fsync(handle.fileno())
+    return summary
+
+
+def archive_year(session, year: int, batch_size: int = 500) -> ArchiveResult:
+    """Moves a past year's entries out of the live database into a read-only partition file.
+
+    The registry row is written first, so the live database stays locked
+    against other writers until the year is copied, verified by count and
+    deleted from it. The partition is compacted (FTS optimize and VACUUM)
+    and made read-only before it is registered. Entries with attachments
+    stay behind (see _archivable); kept counts them.
+    """
+    started = time.perf_counter()
+    if year >= datetime.date.today().year:
+        raise PartitionError("Only past years can be archived.")
+    if session.execute(text("SELECT 1 FROM partitions WHERE year = :year"), {'year': year}).first():
+        raise PartitionError(f"{year} is already archived.")
+    bind = session.get_bind()
+    directory = partitions_directory(bind)
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{PARTITION_PREFIX}{year}{PARTITION_SUFFIX}"
+    path = os.path.join(directory, filename)
+    start, end = queries.year_range(year)
+    now = datetime.datetime.now()
+
+    session.execute(
+        text("INSERT INTO partitions (year, filename, entry_count, first_date, last_date, size, archived_at) "
+             "VALUES (:year, :filename, 0, :start, :start, 0, :now)"),
+        {'year': year, 'filename': filename, 'start': start, 'now': now},
+    )
+    try:
+        entry_ids = session.scalars(select(Entry.id).where(*_archivable(start, end))).all()
+        in_year = session.scalar(select(func.count()).select_from(Entry).where(Entry.date >= start, Entry.date < end))
+        if not entry_ids:
+            raise PartitionError(f"No entries from {year} can be archived.")
+        count, first_date, last_date = _build_partition(_database_path(bind), path + PARTIAL_SUFFIX, entry_ids)
+        if count != len(entry_ids):
+            raise PartitionError(f"Copied {count} of {len(entry_ids)} entries from {year}; nothing was archived.")
+        os.replace(path + PARTIAL_SUFFIX, path)
+        os.chmod(path, 0o444)
+        try:
+            for offset in range(0, len(entry_ids), batch_size):
+                batch = entry_ids[offset:offset + batch_size]
+                session.execute(delete(entry_tag_association).where(entry_tag_association.c.entry_id.in_(batch)))
+                session.execute(delete(Entry.__table__).where(Entry.id.in_(batch)))
+            session.execute(
+                text("UPDATE partitions SET entry_count = :count, first_date = :first, last_date = :last, "
+                     "size = :size WHERE year = :year"),
+                {'count': count, 'first': _parse(first_date), 'last': _parse(last_date),
+                 'size': os.path.getsize(path), 'year': year},
+            )
+            session.commit()
+        except BaseException:
+            os.unlink(path)
+            raise
+    except BaseException:
+        session.rollback()
+        if os.path.exists(path + PARTIAL_SUFFIX):
+            os.unlink(path + PARTIAL_SUFFIX)
+        raise
+    return ArchiveResult(year, path, count, in_year - count, os.path.getsize(path), time.perf_counter() - started)
+
+
+def archive_years(session, before: int = None):
+    """Moves every year older than before (default: the current year) into partitions. Returns ArchiveResults.
+
+    This is the migration from the single-file layout; it can be re-run as years pass.
+    """
+    before = before or datetime.date.today().year
+    archived = {partition.year for partition in list_partitions(session)}
+    years = session.scalars(
+        select(func.distinct(func.cast(func.strftime('%Y', Entry.date), Entry.id.type)))
+        .where(Entry.date < datetime.datetime(before, 1, 1))
+    ).all()
+    results = []
+    for year in sorted(year for year in years if year is not None and year not in archived):
+        results.append(archive_year(session, year))
+    return results
+
+
+def restore_year(session, year: int) -> int:
+    """Moves an archived year's entries back into the live database and deletes its partition file.
+
+    Links to tags deleted meanwhile are dropped. Returns the number of entries restored.
+    """
+    partition = next((item for item in list_partitions(session) if item.year == year), None)
+    if partition is None:
+        raise PartitionError(f"{year} is not archived.")
+    problem = partition_problem(partition)
+    if problem:
+        raise PartitionError(f"Cannot restore {problem}; restore a backup that has it, or forget the year.")
+    session.rollback()
+    with session.get_bind().connect() as connection:
+        # The file is read-only on disk, so SQLite attaches it read-only.
+        connection.exec_driver_sql("ATTACH DATABASE ? AS archived", (partition.path,))
+        try:
+            restored = connection.exec_driver_sql(
+                "INSERT INTO main.entries (id, title, content, date, is_private) "
+                "SELECT id, title, content, date, is_private FROM archived.entries"
+            ).rowcount
+            connection.exec_driver_sql(
+                "INSERT INTO main.entry_tag_association (entry_id, tag_id) "
+                "SELECT entry_id, tag_id FROM archived.entry_tag_association "
+                "WHERE tag_id IN (SELECT id FROM main.tags)"
+            )
+            connection.exec_driver_sql("DELETE FROM main.partitions WHERE year = ?", (year,))
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            connection.exec_driver_sql("DETACH DATABASE archived")
+    _forget_engine(partition.path)
+    os.unlink(partition.path)
+    return restored
+
+
+def forget_year(session, year: int) -> int:
+    """Drops a year whose file is missing from the registry, giving up its entries. Returns how many that were.
+
+    For when the file is gone for good; with a backup at hand, restoring
+    that puts it back instead.
+    """
+    partition = next((item for item in list_partitions(session) if item.year == year), None)
+    if partition is None:
+        raise PartitionError(f"{year} is not archived.")
+    if os.path.exists(partition.path):
+        raise PartitionError(f"'{partition.path}' is still there; use restore to move {year} back.")
+    session.execute(text("DELETE FROM partitions WHERE year = :year"), {'year': year})
+    session.commit()
+    _forget_engine(partition.path)
+    return partition.entry_count
+
+
+def compact_database(engine):
+    """Merges the search index (deleted rows linger in it until then) and VACUUMs the live database.
+
+    Worth running once after archiving years, to hand the space they took back.
+    """
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO entries_fts(entries_fts) VALUES ('optimize')")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("VACUUM")
+
+
+def partition_to_dict(partition: Partition):
+    """Converts a Partition into a plain dict."""
+    return {
+        'year': partition.year, 'path': partition.path, 'entries': partition.entry_count,
+        'first_date': partition.first_date.isoformat(), 'last_date': partition.last_date.isoformat(),
+        'size': partition.size, 'archived_at': partition.archived_at.isoformat(),
+    }
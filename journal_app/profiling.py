@@ -0,0 +1,151 @@
+import io
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+SLOWEST_KEPT = 5
+SQL_PREVIEW_LENGTH = 40
+
+
+def _shorten(statement):
+    """Collapses whitespace and truncates a statement for one-line display."""
+    statement = ' '.join(statement.split())
+    if len(statement) > SQL_PREVIEW_LENGTH:
+        return statement[:SQL_PREVIEW_LENGTH - 1] + '…'
+    return statement
+
+
+class CommandStats:
+    """SQL statistics gathered while one command ran."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.wall_time = 0.0
+        self.statement_count = 0
+        self.db_time = 0.0
+        self.slowest = []       # (seconds, statement), longest first
+        self.statements = []    # full trace, only kept when tracing
+        self.cprofile_report = None
+
+    def record(self, statement, seconds, keep_trace):
+        self.statement_count += 1
+        self.db_time += seconds
+        if len(self.slowest) < SLOWEST_KEPT or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[SLOWEST_KEPT:]
+        if keep_trace:
+            self.statements.append({'offset': time.time() - self.started, 'seconds': seconds, 'sql': statement})
+
+    def as_dict(self):
+        return {
+            'command': self.name,
+            'wall_time': self.wall_time,
+            'statement_count': self.statement_count,
+            'db_time': self.db_time,
+            'slowest': [{'seconds': seconds, 'sql': sql} for seconds, sql in self.slowest],
+            'statements': self.statements,
+        }
+
+
+class QueryProfiler:
+    """Attributes SQL statement counts and timings to the command that issued them.
+
+    Disabled by default; when off the engine hooks cost one attribute check
+    per statement. Statements issued outside any command are grouped under
+    '(other)'.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace = False
+        self.use_cprofile = False
+        self.commands = []
+        self._other = None
+        self._local = threading.local()
+
+    def enable(self, trace=False, use_cprofile=False):
+        self.enabled = True
+        self.trace = trace
+        self.use_cprofile = use_cprofile
+
+    def _current(self):
+        stats = getattr(self._local, 'stats', None)
+        if stats is None:
+            if self._other is None:
+                self._other = CommandStats('(other)')
+                self.commands.append(self._other)
+            stats = self._other
+        return stats
+
+    @contextmanager
+    def command(self, name):
+        """Attributes everything run inside the block to the command called name."""
+        if not self.enabled:
+            yield
+            return
+        previous = getattr(self._local, 'stats', None)
+        stats = CommandStats(name)
+        self.commands.append(stats)
+        self._local.stats = stats
+        profile = None
+        if self.use_cprofile:
+            import cProfile  # only needed with --cprofile; keeps it off the startup path
+            profile = cProfile.Profile()
+        started = time.perf_counter()
+        if profile:
+            profile.enable()
+        try:
+            yield stats
+        finally:
+            if profile:
+                profile.disable()
+                import pstats
+                report = io.StringIO()
+                pstats.Stats(profile, stream=report).sort_stats('cumulative').print_stats(15)
+                stats.cprofile_report = report.getvalue()
+            stats.wall_time = time.perf_counter() - started
+            self._local.stats = previous
+
+    def record(self, statement, seconds):
+        if self.enabled:
+            self._current().record(statement, seconds, self.trace)
+
+    def summary_table(self):
+        """Builds a rich table with one row per command."""
+        from rich.markup import escape
+        from rich.table import Table as RichTable
+        table = RichTable(title="SQL profile", show_header=True, header_style="bold magenta")
+        table.add_column("Command", style="green", no_wrap=True)
+        table.add_column("Statements", justify="right", no_wrap=True)
+        table.add_column("DB time", justify="right", style="cyan", no_wrap=True)
+        table.add_column("Wall time", justify="right", no_wrap=True)
+        table.add_column("Slowest statement", style="dim")
+        for stats in self.commands:
+            slowest = stats.slowest[0] if stats.slowest else None
+            table.add_row(
+                stats.name,
+                str(stats.statement_count),
+                f"{stats.db_time * 1000:.2f} ms",
+                f"{stats.wall_time * 1000:.2f} ms" if stats.wall_time else "-",
+                f"{slowest[0] * 1000:.2f} ms  {escape(_shorten(slowest[1]))}" if slowest else "-",
+            )
+        return table
+
+    def print_summary(self, console):
+        console.print(self.summary_table())
+        for stats in self.commands:
+            if stats.cprofile_report:
+                console.print(f"\n[bold]cProfile: {stats.name}[/bold]")
+                console.print(stats.cprofile_report, markup=False, highlight=False)
+
+    def export(self, path):
+        """Writes every recorded command and statement as a JSON trace file."""
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump({'commands': [stats.as_dict() for stats in self.commands]}, handle, indent=2)
+
+
+profiler = QueryProfiler()
+
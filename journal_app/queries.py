@@ -0,0 +1,125 @@
+from collections import namedtuple
+import datetime
+from sqlalchemy import select, func, tuple_
+from .models import Entry, Tag, entry_tag_association
+
+# Lightweight, read-only view of an entry used by the listing screens.
+EntryRow = namedtuple('EntryRow', ['id', 'date', 'title', 'is_private', 'tags'])
+
+# Joins tag names in tag_names_column: the ASCII unit separator, char(31). Unlike
+# a comma, which create_tag accepts inside a name, it is not expected in tag names.
+TAG_SEPARATOR = '\x1f'
+
+
+def tag_names_column():
+    """Correlated subquery yielding an entry's tag names as one TAG_SEPARATOR-joined string."""
+    return (
+        select(func.group_concat(Tag.name, func.char(31)))
+        .select_from(entry_tag_association.join(Tag, Tag.id == entry_tag_association.c.tag_id))
+        .where(entry_tag_association.c.entry_id == Entry.id)
+        .correlate(Entry)
+        .scalar_subquery()
+        .label('tag_names')
+    )
+
+
+def split_tag_names(value):
+    """Turns a tag_names_column value into a sorted list of names."""
+    return sorted(value.split(TAG_SEPARATOR)) if value else []
+
+
+def entry_rows_select(*criteria):
+    """Builds a SELECT of listing columns plus tag names, filtered by criteria."""
+    return select(
+        Entry.id, Entry.date, Entry.title, Entry.is_private, tag_names_column()
+    ).where(*criteria)
+
+
+def fetch_entry_rows(session, statement):
+    """Executes a statement built by entry_rows_select and returns EntryRow objects."""
+    return [
+        EntryRow(row.id, row.date, row.title, row.is_private, split_tag_names(row.tag_names))
+        for row in session.execute(statement)
+    ]
+
+
+def list_entries(session, *criteria, limit=None):
+    """Returns EntryRow objects matching criteria, newest first, in a single query."""
+    statement = entry_rows_select(*criteria).order_by(Entry.date.desc(), Entry.id.desc()).limit(limit)
+    return fetch_entry_rows(session, statement)
+
+
+def entries_by_ids(session, entry_ids, *criteria):
+    """Returns EntryRow objects for the given ids that also match criteria, preserving the order of entry_ids."""
+    entry_ids = list(entry_ids)
+    if not entry_ids:
+        return []
+    statement = entry_rows_select(Entry.id.in_(entry_ids), *criteria)
+    rows = {row.id: row for row in fetch_entry_rows(session, statement)}
+    return [rows[entry_id] for entry_id in entry_ids if entry_id in rows]
+
+
+def page_entries(session, limit, after=None, before=None):
+    """Returns one page of EntryRow objects, newest first, using keyset pagination.
+
+    after and before are (date, id) keys taken from the last or first row of the
+    page currently shown; the query seeks straight to them through
+    ix_entries_date_id, so every page costs the same no matter how deep it is.
+    """
+    key = tuple_(Entry.date, Entry.id)
+    statement = entry_rows_select()
+    if before is not None:
+        statement = statement.where(key > tuple_(*before)).order_by(Entry.date.asc(), Entry.id.asc())
+    else:
+        if after is not None:
+            statement = statement.where(key < tuple_(*after))
+        statement = statement.order_by(Entry.date.desc(), Entry.id.desc())
+    rows = fetch_entry_rows(session, statement.limit(limit))
+    if before is not None:
+        rows.reverse()
+    return rows
+
+
+def has_entries(session, after=None, before=None):
+    """Reports whether any entry lies past the given (date, id) key."""
+    key = tuple_(Entry.date, Entry.id)
+    statement = select(Entry.id)
+    if after is not None:
+        statement = statement.where(key < tuple_(*after))
+    if before is not None:
+        statement = statement.where(key > tuple_(*before))
+    return session.execute(statement.limit(1)).first() is not None
+
+
+def date_range(start, end):
+    """Half-open [start, end) criteria on Entry.date that can use ix_entries_date_id."""
+    criteria = []
+    if start is not None:
+        criteria.append(Entry.date >= start)
+    if end is not None:
+        criteria.append(Entry.date < end)
+    return criteria
+
+
+def day_range(day):
+    """Returns the [start, end) datetimes covering a single calendar day."""
+    start = datetime.datetime.combine(day, datetime.time.min)
+    return start, start + datetime.timedelta(days=1)
+
+
+def month_range(year, month):
+    """Returns the [start, end) datetimes covering a calendar month."""
+    start = datetime.datetime(year, month, 1)
+    end = datetime.datetime(year + 1, 1, 1) if month == 12 else datetime.datetime(year, month + 1, 1)
+    return start, end
+
+
+def year_range(year):
+    """Returns the [start, end) datetimes covering a calendar year."""
+    return datetime.datetime(year, 1, 1), datetime.datetime(year + 1, 1, 1)
+
+
+def last_days_range(days, now=None):
+    """Returns the [start, end) datetimes covering the last N days up to now."""
+    now = now or datetime.datetime.utcnow()
+    return now - datetime.timedelta(days=days), None
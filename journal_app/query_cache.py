@@ -0,0 +1,115 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from sqlalchemy import event
+from .fts import build_match_query
+
+DEFAULT_SIZE = 128
+
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'evictions', 'invalidations', 'size', 'maxsize', 'generation'])
+
+# Statements that never change what a listing or search returns.
+_READ_ONLY_PREFIXES = ("SELECT", "PRAGMA", "WITH", "EXPLAIN")
+
+
+class QueryCache:
+    """Bounded LRU cache of listing and search results, keyed on normalized query parameters.
+
+    Every commit that wrote something bumps the generation and empties the
+    cache (see track_writes), so a result computed before a write is never
+    served after it. Writes by other processes are noticed through the
+    database file signature, checked on every lookup.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_SIZE, signature=None):
+        self.maxsize = maxsize
+        self.signature = signature
+        self.generation = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self._results = OrderedDict()
+        self._seen_signature = signature() if signature else None
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Returns the cached result for key, calling compute() and storing its result on a miss."""
+        if self.maxsize <= 0:
+            return compute()
+        self._check_signature()
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key]
+            self.misses += 1
+            generation = self.generation
+        value = compute()
+        with self._lock:
+            # A write committed while computing makes the value suspect; return it but don't keep it.
+            if generation == self.generation:
+                self._results[key] = value
+                if len(self._results) > self.maxsize:
+                    self._results.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self):
+        """Starts a new generation, dropping every cached result."""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            self._results.clear()
+
+    def _check_signature(self):
+        if self.signature is None:
+            return
+        current = self.signature()
+        if current != self._seen_signature:
+            self._seen_signature = current
+            self.invalidate()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions, self.invalidations,
+                              len(self._results), self.maxsize, self.generation)
+
+    def __len__(self):
+        return len(self._results)
+
+
+def file_signature(path: str):
+    """Returns a callable giving the (mtime, size) of a database file and its WAL.
+
+    Any commit, from this process or another, changes one of them; reads do not.
+    """
+    def signature():
+        result = []
+        for name in (path, path + "-wal"):
+            try:
+                info = os.stat(name)
+                result.append((info.st_mtime_ns, info.st_size))
+            except FileNotFoundError:
+                result.append(None)
+        return tuple(result)
+    return signature
+
+
+def track_writes(engine, cache: QueryCache):
+    """Invalidates cache whenever a transaction on engine that ran a write statement commits."""
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(_READ_ONLY_PREFIXES):
+            conn.info["query_cache_dirty"] = True
+
+    @event.listens_for(engine, "commit")
+    def _commit(conn):
+        if conn.info.pop("query_cache_dirty", False):
+            cache.invalidate()
+
+    @event.listens_for(engine, "rollback")
+    def _rollback(conn):
+        conn.info.pop("query_cache_dirty", None)
+
+
+def keyword_key(keyword: str):
+    """Normalizes a search keyword to the FTS query it runs, so equivalent spellings share an entry."""
+    return build_match_query(keyword)
@@ -0,0 +1,248 @@
+from collections import namedtuple
+from sqlalchemy import select, insert, delete, literal, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from .models import Entry, Tag, entry_tag_association
+from .tag_cache import tag_cache
+from .tag_query import tag_criteria
+from . import fts, attachments
+from .queries import list_entries, entries_by_ids, date_range
+
+# Outcome of changing an entry's tags, used by both the menu and the subcommands.
+TagChanges = namedtuple('TagChanges', ['created', 'added', 'already_present', 'removed', 'not_found'])
+
+
+def entry_to_dict(entry: Entry):
+    """Converts an Entry into a plain dict including its content and tag names."""
+    return {
+        'id': entry.id,
+        'date': entry.date.isoformat() if entry.date else None,
+        'title': entry.title,
+        'is_private': entry.is_private,
+        'tags': sorted(tag.name for tag in entry.tags),
+        'attachments': [attachments.attachment_to_dict(attachment) for attachment in entry.attachments],
+        'content': entry.content,
+    }
+
+
+def entry_row_to_dict(row, snippet=None):
+    """Converts an EntryRow into a plain dict, adding the search snippet when given."""
+    data = {
+        'id': row.id,
+        'date': row.date.isoformat() if row.date else None,
+        'title': row.title,
+        'is_private': row.is_private,
+        'tags': list(row.tags),
+    }
+    if snippet is not None:
+        data['snippet'] = snippet
+    return data
+
+
+def normalize_tag_name(name: str) -> str:
+    """Returns the canonical (capitalized) form the app stores tag names in."""
+    return name.strip().capitalize()
+
+
+def parse_tag_input(tag_input: str):
+    """Splits 'tag1, +tag2, -tag3' into (names_to_add, names_to_remove)."""
+    to_add, to_remove = [], []
+    for tag_name in [t.strip() for t in tag_input.split(',') if t.strip()]:
+        if tag_name.startswith('+'):
+            to_add.append(tag_name[1:])
+        elif tag_name.startswith('-'):
+            to_remove.append(tag_name[1:])
+        else:
+            to_add.append(tag_name)
+    return to_add, to_remove
+
+
+def get_entry(session: Session, entry_id: int):
+    """Returns the entry with the given ID, or None."""
+    return session.query(Entry).filter_by(id=entry_id).first()
+
+
+def create_entry(session: Session, title: str, content: str, is_private: bool = True, tags=()):
+    """Creates and commits a new entry, optionally tagging it."""
+    entry = Entry(title=title, content=content, is_private=is_private)
+    session.add(entry)
+    session.flush()
+    if tags:
+        change_entry_tags(session, entry, add=tags)
+    session.commit()
+    return entry
+
+
+def update_entry(session: Session, entry_id: int, title: str = None, content: str = None, is_private: bool = None):
+    """Updates the given fields of an entry and commits. Returns the entry, or None if missing."""
+    entry = get_entry(session, entry_id)
+    if not entry:
+        return None
+    if title:
+        entry.title = title
+    if content:
+        entry.content = content
+    if is_private is not None:
+        entry.is_private = is_private
+    session.commit()
+    return entry
+
+
+def delete_entry(session: Session, entry_id: int, store=None) -> bool:
+    """Deletes an entry and commits, then collects attachment files nothing references any more.
+
+    Returns False if the entry did not exist. store defaults to the app's attachment store.
+    """
+    entry = get_entry(session, entry_id)
+    if not entry:
+        return False
+    hashes = attachments.attachment_hashes(session, [entry_id])
+    session.delete(entry)
+    session.commit()
+    if hashes:
+        attachments.collect_garbage(session, store or attachments.default_store(), hashes)
+    return True
+
+
+def get_tag(session: Session, name_or_id):
+    """Looks a tag up by numeric ID or by name."""
+    try:
+        return session.query(Tag).filter_by(id=int(name_or_id)).first()
+    except ValueError:
+        return session.query(Tag).filter_by(name=normalize_tag_name(name_or_id)).first()
+
+
+def list_tags(session: Session):
+    """Returns all tags ordered by name."""
+    return session.query(Tag).order_by(Tag.name).all()
+
+
+def create_tag(session: Session, name: str):
+    """Creates a tag if needed. Returns (tag, created)."""
+    name = normalize_tag_name(name)
+    existing = session.query(Tag).filter_by(name=name).first()
+    if existing:
+        return existing, False
+    tag = Tag(name=name)
+    session.add(tag)
+    session.commit()
+    tag_cache.remember(tag.name, tag.id)
+    return tag, True
+
+
+def delete_tag(session: Session, tag: Tag):
+    """Deletes a tag, removing it from every entry, and commits.
+
+    Runs two DELETE statements instead of session.delete(tag), which would load
+    the tag's whole entries collection; tag keeps its loaded name and id.
+    """
+    name, tag_id = tag.name, tag.id
+    session.expunge(tag)
+    session.execute(delete(entry_tag_association).where(entry_tag_association.c.tag_id == tag_id))
+    session.execute(delete(Tag.__table__).where(Tag.id == tag_id))
+    session.commit()
+    tag_cache.invalidate(name)
+
+
+def _create_tags(session: Session, names, tag_ids):
+    """Inserts the named tags unless they exist, adding their ids to tag_ids. Returns the names created."""
+    names = sorted(names)
+    if not names:
+        return []
+    created = session.scalars(
+        sqlite_insert(Tag).on_conflict_do_nothing(index_elements=['name']).returning(Tag.name),
+        [{'name': name} for name in names],
+    ).all()
+    tag_ids.update(tag_cache.lookup(session, names))
+    return sorted(created)
+
+
+def _link_tags(session: Session, entry_id: int, tag_ids):
+    """Links an entry to the {name: id} pairs that still match a row in tags. Returns the names linked.
+
+    The pairs are checked inside the INSERT ... SELECT itself, so an id cached
+    for a tag that has since been deleted (or reused by another tag) links nothing.
+    """
+    if not tag_ids:
+        return set()
+    linked = session.scalars(
+        insert(entry_tag_association)
+        .from_select(
+            ['entry_id', 'tag_id'],
+            select(literal(entry_id), Tag.id).where(tuple_(Tag.id, Tag.name).in_([(i, n) for n, i in tag_ids.items()])),
+        )
+        .returning(entry_tag_association.c.tag_id)
+    ).all()
+    return {name for name, tag_id in tag_ids.items() if tag_id in linked}
+
+
+def change_entry_tags(session: Session, entry: Entry, add=(), remove=()):
+    """Adds and removes tags on an entry with set-based SQL, creating missing tags. Does not commit.
+
+    Costs a handful of statements however many tags change: one lookup for
+    uncached names, one upsert plus lookup for new tags, one read of the
+    entry's current tags and one bulk insert and delete on the links.
+    Cached ids another process has invalidated are dropped and looked up again.
+    """
+    add_names = {normalize_tag_name(n) for n in add if n.strip()}
+    remove_names = {normalize_tag_name(n) for n in remove if n.strip()} - add_names
+    changes = TagChanges([], [], [], [], [])
+    if not add_names and not remove_names:
+        return changes
+
+    current = dict(session.execute(
+        select(Tag.name, Tag.id)
+        .join(entry_tag_association, entry_tag_association.c.tag_id == Tag.id)
+        .where(entry_tag_association.c.entry_id == entry.id)
+    ).all())
+    to_add = add_names - current.keys()
+    tag_ids = tag_cache.lookup(session, to_add)
+    changes.created.extend(_create_tags(session, to_add - tag_ids.keys(), tag_ids))
+    stale = to_add - _link_tags(session, entry.id, tag_ids)
+    if stale:
+        for name in stale:
+            tag_cache.invalidate(name)
+        tag_ids = tag_cache.lookup(session, stale)
+        changes.created.extend(_create_tags(session, stale - tag_ids.keys(), tag_ids))
+        _link_tags(session, entry.id, tag_ids)
+        changes.created.sort()
+
+    for name in sorted(add_names):
+        (changes.already_present if name in current else changes.added).append(name)
+    for name in sorted(remove_names):
+        (changes.removed if name in current else changes.not_found).append(name)
+
+    if changes.removed:
+        session.execute(
+            delete(entry_tag_association)
+            .where(entry_tag_association.c.entry_id == entry.id)
+            .where(entry_tag_association.c.tag_id.in_([current[name] for name in changes.removed]))
+        )
+    # The links changed behind the ORM's back, so reload entry.tags on next access.
+    session.expire(entry, ['tags'])
+    return changes
+
+
+def search_keyword(session: Session, keyword: str, *criteria):
+    """Full-text search. Returns (EntryRow list in rank order, {entry_id: snippet})."""
+    matches = fts.search(session, keyword)
+    snippets = {row.rowid: row.snippet for row in matches}
+    return entries_by_ids(session, [row.rowid for row in matches], *criteria), snippets
+
+
+def search_dates(session: Session, start, end, limit: int = None):
+    """Returns EntryRow objects dated within [start, end), newest first."""
+    return list_entries(session, *date_range(start, end), limit=limit)
+
+
+def search_tags(session: Session, expression: str, keyword: str = None, start=None, end=None, limit: int = None):
+    """Entries matching a boolean tag expression, optionally narrowed by keyword and date range.
+
+    Returns (EntryRow list, snippets); snippets is None unless a keyword was given,
+    in which case rows come in relevance order instead of newest first.
+    """
+    criteria = [tag_criteria(expression), *date_range(start, end)]
+    if keyword:
+        rows, snippets = search_keyword(session, keyword, *criteria)
+        return rows[:limit] if limit else rows, snippets
+    return list_entries(session, *criteria, limit=limit), None
@@ -0,0 +1,422 @@
+import importlib.util
+import json
+import math
+import os
+import re
+import zlib
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from sqlalchemy import select, text
+from .models import Entry, entry_tag_association
+
+# numpy is optional and slow to import, so it is only loaded when an index is opened;
+# the migrations import this module for the change queue on every start.
+numpy = None
+
+# Every change to an entry's text is queued here by triggers, one row per entry,
+# so the index catches up with writes from any path or process the next time it
+# is used. seq never repeats (AUTOINCREMENT), which makes draining race-free.
+SIMILARITY_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS similarity_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        entry_id INTEGER NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS similarity_entries_ai AFTER INSERT ON entries BEGIN
+        INSERT OR REPLACE INTO similarity_changes(entry_id) VALUES (new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS similarity_entries_au AFTER UPDATE OF title, content ON entries BEGIN
+        INSERT OR REPLACE INTO similarity_changes(entry_id) VALUES (new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS similarity_entries_ad AFTER DELETE ON entries BEGIN
+        INSERT OR REPLACE INTO similarity_changes(entry_id) VALUES (old.id);
+    END
+    """,
+]
+
+# Queued in place of an entry id when the database was replaced wholesale (a backup
+# restore), so the next sync rebuilds instead of trusting index files newer than the data.
+REBUILD_MARKER = 0
+
+FORMAT_VERSION = 1
+TERMS_PER_ENTRY = 64        # strongest terms kept per entry
+HASH_BITS = 20              # terms are hashed into 2**20 buckets
+TITLE_WEIGHT = 3            # a title word counts as this many content words
+TAG_BOOST = 0.5             # score multiplier per fraction of shared tags
+CANDIDATE_FACTOR = 5        # candidates re-ranked with tag overlap, per result wanted
+INITIAL_CAPACITY = 1024
+WORD = re.compile(r"[^\W\d_]{2,}")
+
+RelatedEntry = namedtuple('RelatedEntry', ['entry_id', 'score', 'shared_tags'])
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class SimilarityUnavailable(RuntimeError):
+    """Raised when the similarity index is used without numpy installed."""
+
+
+def available() -> bool:
+    """Reports whether numpy is installed, without importing it."""
+    return numpy is not None or importlib.util.find_spec("numpy") is not None
+
+
+def ensure_similarity(connection):
+    """Creates the change queue and the triggers that fill it."""
+    for statement in SIMILARITY_DDL:
+        connection.execute(text(statement))
+
+
+def queue_rebuild(connection):
+    """Asks every index on this database to rebuild at its next sync. Does not commit."""
+    connection.execute(
+        text("INSERT OR REPLACE INTO similarity_changes(entry_id) VALUES (:marker)"), {'marker': REBUILD_MARKER}
+    )
+
+
+def term_counts(title: str, content: str) -> Counter:
+    """Hashed term frequencies of an entry's words; title words count TITLE_WEIGHT times."""
+    counts = Counter()
+    mask = (1 << HASH_BITS) - 1
+    for word in WORD.findall((title or "").lower()):
+        counts[zlib.crc32(word.encode('utf-8')) & mask] += TITLE_WEIGHT
+    for word in WORD.findall((content or "").lower()):
+        counts[zlib.crc32(word.encode('utf-8')) & mask] += 1
+    return counts
+
+
+class SimilarityIndex:
+    """TF-IDF vectors of every entry, stored as memory-mapped NumPy arrays.
+
+    Each entry occupies one row: its TERMS_PER_ENTRY highest-weighted
+    hashed terms (terms.npy, padded with -1) and their L2-normalised
+    TF-IDF weights (weights.npy), with the entry id in ids.npy (0 marks a
+    free row). Document frequencies per hash bucket live in df.npy and
+    counts in meta.json. Term weights use the document frequencies of the
+    moment the entry was indexed; rebuild refreshes them all.
+
+    Cosine similarity against every row is a handful of vectorised NumPy
+    operations over the mapped arrays, so a query costs milliseconds
+    even for tens of thousands of entries.
+
+    Several processes may share one index directory: sync and rebuild run
+    under an exclusive lock on index.lock, queries under a shared one, and
+    an index whose meta.json another process has replaced is reopened
+    before use.
+    """
+
+    def __init__(self, directory: str):
+        global numpy
+        if numpy is None:
+            try:
+                import numpy
+            except ImportError:
+                raise SimilarityUnavailable("Related entries need the 'numpy' package.") from None
+        self.directory = directory
+        self.meta = None
+        self.rows = {}
+        self._query = None
+        self._meta_signature = None
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def exists(self) -> bool:
+        try:
+            with open(self._path("meta.json"), encoding='utf-8') as handle:
+                return json.load(handle).get('version') == FORMAT_VERSION
+        except (FileNotFoundError, ValueError):
+            return False
+
+    @contextmanager
+    def _locked(self, exclusive: bool = True):
+        """Holds index.lock for the block: exclusively while the index is written, shared while read."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path("index.lock"), 'a+b') as handle:
+            if fcntl:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)  # no shared mode on Windows
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _disk_signature(self):
+        """Identifies the meta.json on disk; _save replaces the file, so every save changes it."""
+        try:
+            status = os.stat(self._path("meta.json"))
+        except FileNotFoundError:
+            return None
+        return status.st_ino, status.st_mtime_ns, status.st_size
+
+    def _is_current(self) -> bool:
+        """Reports whether the open index is still the one on disk. Call with the lock held."""
+        return self.meta is not None and self._meta_signature == self._disk_signature()
+
+    def _open(self):
+        self._meta_signature = self._disk_signature()
+        with open(self._path("meta.json"), encoding='utf-8') as handle:
+            self.meta = json.load(handle)
+        self.ids = numpy.load(self._path("ids.npy"), mmap_mode='r+')
+        self.terms = numpy.load(self._path("terms.npy"), mmap_mode='r+')
+        self.weights = numpy.load(self._path("weights.npy"), mmap_mode='r+')
+        self.df = numpy.load(self._path("df.npy"), mmap_mode='r+')
+        used = numpy.flatnonzero(self.ids[:self.meta['count']])
+        self.rows = dict(zip(self.ids[used].tolist(), used.tolist()))
+        self.free = numpy.flatnonzero(self.ids[:self.meta['count']] == 0).tolist()
+
+    def _create(self, capacity: int):
+        """Starts an empty index, replacing any existing files."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._allocate(capacity)
+        self.df = numpy.lib.format.open_memmap(self._path("df.npy"), mode='w+', dtype=numpy.int32,
+                                               shape=(1 << HASH_BITS,))
+        self.meta = {'version': FORMAT_VERSION, 'count': 0, 'documents': 0}
+        self.rows, self.free = {}, []
+
+    def _allocate(self, capacity: int, keep: int = 0):
+        """(Re)creates the per-row arrays with room for capacity rows, keeping the first keep rows."""
+        arrays = {}
+        for name, dtype, shape, fill in (
+            ("ids", numpy.int64, (capacity,), 0),
+            ("terms", numpy.int32, (capacity, TERMS_PER_ENTRY), -1),
+            ("weights", numpy.float32, (capacity, TERMS_PER_ENTRY), 0),
+        ):
+            partial = self._path(f"{name}.npy.partial")
+            array = numpy.lib.format.open_memmap(partial, mode='w+', dtype=dtype, shape=shape)
+            array[:] = fill
+            if keep:
+                array[:keep] = getattr(self, name)[:keep]
+            array.flush()
+            del array
+            arrays[name] = partial
+        for name, partial in arrays.items():
+            os.replace(partial, self._path(f"{name}.npy"))
+        self.ids = numpy.load(self._path("ids.npy"), mmap_mode='r+')
+        self.terms = numpy.load(self._path("terms.npy"), mmap_mode='r+')
+        self.weights = numpy.load(self._path("weights.npy"), mmap_mode='r+')
+
+    def _save(self):
+        for array in (self.ids, self.terms, self.weights, self.df):
+            array.flush()
+        partial = self._path("meta.json.partial")
+        with open(partial, 'w', encoding='utf-8') as handle:
+            json.dump(self.meta, handle)
+        os.replace(partial, self._path("meta.json"))
+        self._meta_signature = self._disk_signature()
+
+    def _weigh(self, counts: Counter):
+        """Returns the strongest terms of counts and their normalised TF-IDF weights."""
+        if not counts:
+            return numpy.empty(0, numpy.int32), numpy.empty(0, numpy.float32)
+        terms = numpy.fromiter(counts.keys(), numpy.int32, len(counts))
+        tf = numpy.fromiter(counts.values(), numpy.float32, len(counts))
+        documents = max(self.meta['documents'], 1)
+        idf = numpy.log((1 + documents) / (1 + self.df[terms])) + 1
+        weights = (1 + numpy.log(tf)) * idf
+        if len(terms) > TERMS_PER_ENTRY:
+            strongest = numpy.argpartition(weights, -TERMS_PER_ENTRY)[-TERMS_PER_ENTRY:]
+            terms, weights = terms[strongest], weights[strongest]
+        norm = math.sqrt(float(numpy.dot(weights, weights)))
+        order = numpy.argsort(terms)
+        return terms[order], (weights[order] / norm if norm else weights[order]).astype(numpy.float32)
+
+    def remove(self, entry_id: int):
+        """Drops an entry's row, if it has one."""
+        row = self.rows.pop(entry_id, None)
+        if row is None:
+            return
+        present = self.terms[row][self.terms[row] >= 0]
+        numpy.subtract.at(self.df, present, 1)
+        self.meta['documents'] -= 1
+        self.ids[row] = 0
+        self.terms[row] = -1
+        self.weights[row] = 0
+        self.free.append(row)
+
+    def upsert(self, entry_id: int, title: str, content: str):
+        """Indexes (or re-indexes) one entry."""
+        self.remove(entry_id)
+        counts = term_counts(title, content)
+        # Count the entry in the document frequencies before weighing, as a rebuild would.
+        keys = numpy.fromiter(counts.keys(), numpy.int32, len(counts))
+        self.df[keys] += 1
+        self.meta['documents'] += 1
+        terms, weights = self._weigh(counts)
+        # Only the kept terms stay counted, so remove() can undo exactly what was added.
+        dropped = numpy.setdiff1d(keys, terms, assume_unique=True)
+        self.df[dropped] -= 1
+        if self.free:
+            row = self.free.pop()
+        else:
+            row = self.meta['count']
+            if row >= len(self.ids):
+                self._allocate(len(self.ids) * 2, keep=row)
+            self.meta['count'] += 1
+        self.ids[row] = entry_id
+        self.terms[row, :len(terms)] = terms
+        self.weights[row, :len(weights)] = weights
+        self.rows[entry_id] = row
+
+    def rebuild(self, session, chunk_size: int = 1000):
+        """Re-indexes every entry from scratch. Returns the number indexed.
+
+        A first pass over the entries counts document frequencies, so every
+        weight uses the same, current IDF.
+        """
+        with self._locked():
+            return self._rebuild(session, chunk_size)
+
+    def _rebuild(self, session, chunk_size: int):
+        last_seq = session.execute(text("SELECT max(seq) FROM similarity_changes")).scalar() or 0
+        count = session.execute(text("SELECT count(*) FROM entries")).scalar()
+        self._create(max(INITIAL_CAPACITY, 1 << count.bit_length()))
+        statement = select(Entry.id, Entry.title, Entry.content).order_by(Entry.id) \
+            .execution_options(yield_per=chunk_size)
+        for row in session.execute(statement):
+            self.df[numpy.fromiter(term_counts(row.title, row.content).keys(), numpy.int32)] += 1
+        self.meta['documents'] = count
+        for row in session.execute(statement):
+            terms, weights = self._weigh(term_counts(row.title, row.content))
+            index = self.meta['count']
+            self.ids[index] = row.id
+            self.terms[index, :len(terms)] = terms
+            self.weights[index, :len(weights)] = weights
+            self.rows[row.id] = index
+            self.meta['count'] += 1
+        # From here on only the kept terms are counted, matching upsert and remove.
+        kept = self.terms[:self.meta['count']]
+        self.df[:] = numpy.bincount(kept[kept >= 0], minlength=len(self.df))
+        self._save()
+        session.execute(text("DELETE FROM similarity_changes WHERE seq <= :seq"), {'seq': last_seq})
+        session.commit()
+        return self.meta['count']
+
+    def sync(self, session, chunk_size: int = 500):
+        """Applies the entry changes queued since the last sync. Returns how many were applied.
+
+        Builds the index first when there is none, and reopens it when another
+        process has saved it since it was opened here. A queued REBUILD_MARKER
+        (see queue_rebuild) rebuilds it from scratch.
+        """
+        with self._locked():
+            return self._sync(session, chunk_size)
+
+    def _sync(self, session, chunk_size: int):
+        if not self._is_current():
+            if not self.exists():
+                self._rebuild(session, 1000)
+                return 0
+            self._open()
+        changes = session.execute(text("SELECT seq, entry_id FROM similarity_changes ORDER BY seq")).all()
+        if not changes:
+            return 0
+        if any(entry_id == REBUILD_MARKER for _, entry_id in changes):
+            self._rebuild(session, 1000)
+            return len(changes)
+        entry_ids = [entry_id for _, entry_id in changes]
+        found = set()
+        for start in range(0, len(entry_ids), chunk_size):
+            chunk = entry_ids[start:start + chunk_size]
+            for row in session.execute(select(Entry.id, Entry.title, Entry.content).where(Entry.id.in_(chunk))):
+                self.upsert(row.id, row.title, row.content)
+                found.add(row.id)
+        for entry_id in set(entry_ids) - found:
+            self.remove(entry_id)
+        self._save()
+        session.execute(text("DELETE FROM similarity_changes WHERE seq <= :seq"), {'seq': changes[-1][0]})
+        session.commit()
+        return len(changes)
+
+    def related(self, session, entry_id: int, limit: int = 5):
+        """Returns up to limit RelatedEntry tuples for the entries most similar to entry_id, best first.
+
+        Cosine similarity ranks CANDIDATE_FACTOR * limit candidates, which are
+        then boosted by the fraction of entry_id's tags they share.
+        """
+        self.sync(session)
+        with self._locked(exclusive=False):
+            if not self._is_current():
+                self._open()  # saved by another process since the sync above
+            candidates = self._candidates(entry_id, limit)
+        if not candidates:
+            return []
+
+        candidate_ids, candidate_scores = candidates
+        tag_rows = session.execute(
+            select(entry_tag_association.c.entry_id, entry_tag_association.c.tag_id)
+            .where(entry_tag_association.c.entry_id.in_(candidate_ids + [entry_id]))
+        ).all()
+        tags = {}
+        for owner, tag_id in tag_rows:
+            tags.setdefault(owner, set()).add(tag_id)
+        own_tags = tags.get(entry_id, set())
+        results = []
+        for candidate, score in zip(candidate_ids, candidate_scores):
+            shared = len(own_tags & tags.get(candidate, set()))
+            boost = 1 + TAG_BOOST * shared / len(own_tags) if own_tags else 1
+            results.append(RelatedEntry(candidate, score * boost, shared))
+        results.sort(key=lambda result: result.score, reverse=True)
+        return results[:limit]
+
+    def _candidates(self, entry_id: int, limit: int):
+        """Returns ([entry id], [cosine score]) for the rows closest to entry_id's, or None."""
+        row = self.rows.get(entry_id)
+        if row is None:
+            return None
+        query_terms = numpy.array(self.terms[row])
+        present = query_terms >= 0
+        query_terms, query_weights = query_terms[present], numpy.array(self.weights[row])[present]
+        if not len(query_terms):
+            return None
+        count = self.meta['count']
+        # Scatter the query into a dense vector over the hash space, then gather it
+        # at every stored term: one pass over the rows gives all the dot products.
+        # The extra last slot stays 0 and is what the -1 padding reads.
+        if self._query is None:
+            self._query = numpy.zeros((1 << HASH_BITS) + 1, numpy.float32)
+        self._query[query_terms] = query_weights
+        try:
+            products = self._query.take(self.terms[:count])
+        finally:
+            self._query[query_terms] = 0
+        products *= self.weights[:count]
+        scores = products.sum(axis=1)
+        scores[row] = 0
+        candidates = min(limit * CANDIDATE_FACTOR, count)
+        top = numpy.argpartition(scores, -candidates)[-candidates:]
+        top = top[scores[top] > 0]
+        if not len(top):
+            return None
+        return self.ids[top].tolist(), scores[top].tolist()
+
+    def __len__(self):
+        return len(self.rows)
+
+
+_default_index = None
+
+
+def default_index() -> SimilarityIndex:
+    """Returns the index configured for the app's database (see DatabaseSettings.similarity_path)."""
+    global _default_index
+    if _default_index is None:
+        from .database import settings
+        _default_index = SimilarityIndex(settings.similarity_directory)
+    return _default_index
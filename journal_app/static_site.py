@@ -0,0 +1,269 @@
+import hashlib
+import html
+import json
+import os
+import re
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import select
+from .models import Entry
+from .queries import split_tag_names, tag_names_column
+from . import partitions
+
+SITE_FORMATS = ('html', 'md')
+MANIFEST_NAME = "manifest.json"
+# Bump when page layout changes so the next export re-renders everything.
+RENDER_VERSION = 1
+DEFAULT_CHUNK_SIZE = 500
+RENDER_BATCH_SIZE = 100
+
+SiteSummary = namedtuple('SiteSummary', ['entries', 'rendered', 'unchanged', 'removed', 'index_pages', 'seconds'])
+
+HTML_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+</head>
+<body>
+<nav><a href="{root}index.html">Journal</a></nav>
+{body}
+</body>
+</html>
+"""
+
+
+def slugify(name: str) -> str:
+    """Returns a file-name-safe, lower-case form of a tag name.
+
+    Names that lose characters on the way get a short hash of the original
+    appended, so e.g. 'C++' and 'C' do not share a page.
+    """
+    slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+    if slug != name.lower():
+        slug = f"{slug or 'tag'}-{hashlib.sha1(name.encode('utf-8')).hexdigest()[:6]}"
+    return slug
+
+
+def entry_path(entry_id: int, fmt: str) -> str:
+    return f"entries/{entry_id}.{fmt}"
+
+
+def tag_path(name: str, fmt: str) -> str:
+    return f"tags/{slugify(name)}.{fmt}"
+
+
+def month_path(month: str, fmt: str) -> str:
+    return f"months/{month}.{fmt}"
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _write(directory: str, relative: str, text: str):
+    """Writes a page atomically, so an interrupted export never leaves a half-written file."""
+    path = os.path.join(directory, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + ".partial"
+    with open(partial, 'w', encoding='utf-8') as handle:
+        handle.write(text)
+    os.replace(partial, path)
+
+
+def render_entry(record, fmt: str) -> str:
+    """Renders one public entry as a page; tag links point at the tag index pages."""
+    if fmt == 'md':
+        tags = ", ".join(f"[{name}](../{tag_path(name, 'md')})" for name in record['tags']) or "No Tags"
+        return (
+            f"# {record['title']}\n\n"
+            f"*{record['date'][:16].replace('T', ' ')}* · {tags}\n\n"
+            f"{record['content']}\n"
+        )
+    tags = ", ".join(
+        f'<a href="../{tag_path(name, "html")}">{html.escape(name)}</a>' for name in record['tags']
+    ) or "No Tags"
+    paragraphs = "\n".join(
+        f"<p>{html.escape(paragraph).replace(chr(10), '<br>')}</p>"
+        for paragraph in re.split(r'\n\s*\n', record['content']) if paragraph.strip()
+    )
+    body = (
+        f"<article>\n<h1>{html.escape(record['title'])}</h1>\n"
+        f"<p><time datetime=\"{record['date']}\">{record['date'][:16].replace('T', ' ')}</time> · {tags}</p>\n"
+        f"{paragraphs}\n</article>"
+    )
+    return HTML_PAGE.format(title=html.escape(record['title']), root="../", body=body)
+
+
+def render_index(title: str, items, fmt: str, root: str) -> str:
+    """Renders a list page of (entry id, title, date) items, linked relative to root."""
+    if fmt == 'md':
+        lines = [f"# {title}", ""]
+        lines += [f"- {date[:10]} [{name}]({root}{entry_path(entry_id, 'md')})" for entry_id, name, date in items]
+        return "\n".join(lines) + "\n"
+    rows = "\n".join(
+        f'<li>{date[:10]} <a href="{root}{entry_path(entry_id, "html")}">{html.escape(name)}</a></li>'
+        for entry_id, name, date in items
+    )
+    return HTML_PAGE.format(title=html.escape(title), root=root, body=f"<h1>{html.escape(title)}</h1>\n<ul>\n{rows}\n</ul>")
+
+
+def render_home(tags, months, fmt: str) -> str:
+    """Renders index.<fmt>: links to every month and tag page, with entry counts."""
+    if fmt == 'md':
+        lines = ["# Journal", "", "## Months", ""]
+        lines += [f"- [{month}]({month_path(month, 'md')}) ({count})" for month, count in months]
+        lines += ["", "## Tags", ""]
+        lines += [f"- [{name}]({tag_path(name, 'md')}) ({count})" for name, count in tags]
+        return "\n".join(lines) + "\n"
+    month_items = "\n".join(
+        f'<li><a href="{month_path(month, "html")}">{month}</a> ({count})</li>' for month, count in months
+    )
+    tag_items = "\n".join(
+        f'<li><a href="{tag_path(name, "html")}">{html.escape(name)}</a> ({count})</li>' for name, count in tags
+    )
+    body = f"<h1>Journal</h1>\n<h2>Months</h2>\n<ul>\n{month_items}\n</ul>\n<h2>Tags</h2>\n<ul>\n{tag_items}\n</ul>"
+    return HTML_PAGE.format(title="Journal", root="", body=body)
+
+
+def render_batch(records, fmt: str, directory: str) -> int:
+    """Renders and writes a batch of entry pages. Runs in the worker processes; returns the page count."""
+    for record in records:
+        _write(directory, entry_path(record['id'], fmt), render_entry(record, fmt))
+    return len(records)
+
+
+def iter_public_records(session, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Streams public entries oldest first as plain dicts, fetching chunk_size rows at a time, archived years included."""
+    statement = (
+        select(Entry.id, Entry.title, Entry.content, Entry.date, tag_names_column())
+        .where(Entry.is_private.is_(False))
+        .order_by(Entry.date, Entry.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for row in partitions.iter_rows(session, statement):
+        yield {
+            'id': row.id,
+            'title': row.title,
+            'content': row.content,
+            'date': row.date.isoformat() if row.date else "",
+            'tags': split_tag_names(row.tag_names),
+        }
+
+
+def load_manifest(directory: str, fmt: str):
+    """Returns the previous export's manifest, or an empty one if it is missing or from another format/layout."""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as handle:
+            manifest = json.load(handle)
+    except (FileNotFoundError, ValueError):
+        manifest = None
+    if not manifest or manifest.get('format') != fmt or manifest.get('render_version') != RENDER_VERSION:
+        return {'format': fmt, 'render_version': RENDER_VERSION, 'entries': {}, 'pages': {}}
+    return manifest
+
+
+def export_site(session, directory: str, fmt: str = 'html', workers: int = None, full: bool = False,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> SiteSummary:
+    """Exports public entries to a static site in directory, re-rendering only what changed.
+
+    Entries are streamed from the database in chunks and hashed (title,
+    content, date and tag names); an entry page is rendered only when its
+    hash differs from the one in the manifest left by the previous export,
+    or full is set. Changed entries are rendered in batches across a
+    process pool of workers processes (None: one per CPU, 1: in this
+    process) with a bounded number of batches in flight. Tag, month and
+    home index pages are hashed and rewritten the same way. Pages of
+    entries that were deleted or made private are removed, and the
+    manifest is replaced last, so an interrupted export is redone next time.
+    """
+    if fmt not in SITE_FORMATS:
+        raise ValueError(f"Unsupported site format '{fmt}'. Use one of: {', '.join(SITE_FORMATS)}.")
+    started = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    previous = load_manifest(directory, fmt)
+    manifest = {'format': fmt, 'render_version': RENDER_VERSION, 'entries': {}, 'pages': {}}
+    by_tag, by_month = defaultdict(list), defaultdict(list)
+    rendered = unchanged = 0
+
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    pending, batch = [], []
+
+    def flush():
+        nonlocal rendered
+        if not batch:
+            return
+        if executor is None:
+            rendered += render_batch(list(batch), fmt, directory)
+        else:
+            pending.append(executor.submit(render_batch, list(batch), fmt, directory))
+            # Keep memory bounded: wait for the oldest batches once enough are queued.
+            while len(pending) > 2 * workers:
+                rendered += pending.pop(0).result()
+        batch.clear()
+
+    try:
+        for record in iter_public_records(session, chunk_size):
+            key = str(record['id'])
+            digest = _digest(record)
+            manifest['entries'][key] = digest
+            item = (record['id'], record['title'], record['date'])
+            for name in record['tags']:
+                by_tag[name].append(item)
+            by_month[record['date'][:7] or 'unknown'].append(item)
+            if not full and previous['entries'].get(key) == digest \
+                    and os.path.exists(os.path.join(directory, entry_path(record['id'], fmt))):
+                unchanged += 1
+                continue
+            batch.append(record)
+            if len(batch) >= RENDER_BATCH_SIZE:
+                flush()
+        flush()
+        for future in pending:
+            rendered += future.result()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    removed = 0
+    for key in previous['entries'].keys() - manifest['entries'].keys():
+        try:
+            os.unlink(os.path.join(directory, entry_path(int(key), fmt)))
+            removed += 1
+        except FileNotFoundError:
+            pass
+
+    # Index pages list entries newest first.
+    pages = {
+        tag_path(name, fmt): (f"Tag: {name}", items[::-1], "../") for name, items in by_tag.items()
+    }
+    pages.update({
+        month_path(month, fmt): (f"Month: {month}", items[::-1], "../") for month, items in by_month.items()
+    })
+    index_pages = 0
+    for relative, (title, items, root) in pages.items():
+        digest = _digest([title, items])
+        manifest['pages'][relative] = digest
+        if full or previous['pages'].get(relative) != digest or not os.path.exists(os.path.join(directory, relative)):
+            _write(directory, relative, render_index(title, items, fmt, root))
+            index_pages += 1
+    tags = sorted((name, len(items)) for name, items in by_tag.items())
+    months = sorted(((month, len(items)) for month, items in by_month.items()), reverse=True)
+    home = f"index.{fmt}"
+    digest = _digest([tags, months])
+    manifest['pages'][home] = digest
+    if full or previous['pages'].get(home) != digest or not os.path.exists(os.path.join(directory, home)):
+        _write(directory, home, render_home(tags, months, fmt))
+        index_pages += 1
+    for relative in previous['pages'].keys() - manifest['pages'].keys():
+        try:
+            os.unlink(os.path.join(directory, relative))
+            removed += 1
+        except FileNotFoundError:
+            pass
+
+    _write(directory, MANIFEST_NAME, json.dumps(manifest, sort_keys=True))
+    return SiteSummary(len(manifest['entries']), rendered, unchanged, removed, index_pages,
+                       time.perf_counter() - started)
@@ -0,0 +1,176 @@
+from sqlalchemy import text
+
+# Aggregates kept up to date by triggers, so every write path (menu, subcommands,
+# bulk import, raw SQL) maintains them and dashboards never GROUP BY the base tables.
+MONTH_KEY = "coalesce(substr({row}.date, 1, 7), 'unknown')"
+
+STATS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS stats_totals (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_monthly (
+        month TEXT PRIMARY KEY,
+        entry_count INTEGER NOT NULL DEFAULT 0,
+        private_count INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_tag_counts (
+        tag_id INTEGER PRIMARY KEY,
+        entry_count INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+]
+
+
+def _entry_delta(row: str, sign: str) -> str:
+    """Trigger body statements adding (sign '+') or removing (sign '-') one entry row."""
+    month = MONTH_KEY.format(row=row)
+    return f"""
+        INSERT INTO stats_totals(name, value) VALUES ('entries', {sign}1)
+            ON CONFLICT(name) DO UPDATE SET value = value {sign} 1;
+        INSERT INTO stats_totals(name, value) VALUES ('private', {sign}({row}.is_private != 0))
+            ON CONFLICT(name) DO UPDATE SET value = value {sign} ({row}.is_private != 0);
+        INSERT INTO stats_monthly(month, entry_count, private_count)
+            VALUES ({month}, {sign}1, {sign}({row}.is_private != 0))
+            ON CONFLICT(month) DO UPDATE SET
+                entry_count = entry_count {sign} 1,
+                private_count = private_count {sign} ({row}.is_private != 0);
+        DELETE FROM stats_monthly WHERE month = {month} AND entry_count = 0;
+    """
+
+
+STATS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stats_entries_ai AFTER INSERT ON entries BEGIN
+        {_entry_delta('new', '+')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stats_entries_ad AFTER DELETE ON entries BEGIN
+        {_entry_delta('old', '-')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stats_entries_au AFTER UPDATE OF date, is_private ON entries BEGIN
+        {_entry_delta('old', '-')}
+        {_entry_delta('new', '+')}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_tags_ai AFTER INSERT ON entry_tag_association BEGIN
+        INSERT INTO stats_tag_counts(tag_id, entry_count) VALUES (new.tag_id, 1)
+            ON CONFLICT(tag_id) DO UPDATE SET entry_count = entry_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_tags_ad AFTER DELETE ON entry_tag_association BEGIN
+        UPDATE stats_tag_counts SET entry_count = entry_count - 1 WHERE tag_id = old.tag_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_tag_deleted AFTER DELETE ON tags BEGIN
+        DELETE FROM stats_tag_counts WHERE tag_id = old.id;
+    END
+    """,
+]
+
+# The same aggregates computed from scratch; used to rebuild and to detect drift.
+FRESH_TOTALS = """
+    SELECT 'entries' AS name, count(*) AS value FROM entries
+    UNION ALL
+    SELECT 'private', count(*) FROM entries WHERE is_private != 0
+"""
+FRESH_MONTHLY = f"""
+    SELECT {MONTH_KEY.format(row='entries')} AS month, count(*) AS entry_count,
+           sum(is_private != 0) AS private_count
+    FROM entries GROUP BY 1
+"""
+FRESH_TAG_COUNTS = """
+    SELECT tags.id AS tag_id, count(entry_tag_association.entry_id) AS entry_count
+    FROM tags LEFT JOIN entry_tag_association ON entry_tag_association.tag_id = tags.id
+    GROUP BY tags.id
+"""
+
+
+def ensure_stats(connection):
+    """Creates the statistics tables and triggers, populating them if they are new."""
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='stats_totals'")
+    ).first()
+    for statement in STATS_TABLES + STATS_TRIGGERS:
+        connection.execute(text(statement))
+    if not exists:
+        rebuild_stats(connection)
+
+
+def rebuild_stats(connection):
+    """Recomputes every statistics table from the base tables."""
+    connection.execute(text("DELETE FROM stats_totals"))
+    connection.execute(text("DELETE FROM stats_monthly"))
+    connection.execute(text("DELETE FROM stats_tag_counts"))
+    connection.execute(text(f"INSERT INTO stats_totals(name, value) {FRESH_TOTALS}"))
+    connection.execute(text(f"INSERT INTO stats_monthly(month, entry_count, private_count) {FRESH_MONTHLY}"))
+    connection.execute(text(f"INSERT INTO stats_tag_counts(tag_id, entry_count) {FRESH_TAG_COUNTS}"))
+
+
+def _table_rows(connection, sql):
+    return {row[0]: tuple(row[1:]) for row in connection.execute(text(sql))}
+
+
+def verify_stats(connection):
+    """Compares stored statistics with freshly computed ones.
+
+    Returns a list of (table, key, stored, actual) tuples, empty when nothing drifted.
+    Zero counts and missing rows are treated as equal.
+    """
+    checks = [
+        ('stats_totals', "SELECT name, value FROM stats_totals", FRESH_TOTALS),
+        ('stats_monthly', "SELECT month, entry_count, private_count FROM stats_monthly", FRESH_MONTHLY),
+        ('stats_tag_counts', "SELECT tag_id, entry_count FROM stats_tag_counts", FRESH_TAG_COUNTS),
+    ]
+    differences = []
+    for table, stored_sql, fresh_sql in checks:
+        stored = _table_rows(connection, stored_sql)
+        actual = _table_rows(connection, fresh_sql)
+        for key in sorted(stored.keys() | actual.keys(), key=str):
+            stored_value = stored.get(key)
+            actual_value = actual.get(key)
+            if stored_value == actual_value:
+                continue
+            if not any(stored_value or ()) and not any(actual_value or ()):
+                continue
+            differences.append((table, key, stored_value, actual_value))
+    return differences
+
+
+def get_totals(session):
+    """Returns {'entries': n, 'private': n, 'public': n} from stored counters."""
+    totals = dict(session.execute(text("SELECT name, value FROM stats_totals")).all())
+    entries = totals.get('entries', 0)
+    private = totals.get('private', 0)
+    return {'entries': entries, 'private': private, 'public': entries - private}
+
+
+def get_monthly(session, limit: int = None):
+    """Returns (month, entry_count, private_count) rows, newest month first."""
+    sql = "SELECT month, entry_count, private_count FROM stats_monthly ORDER BY month DESC"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return session.execute(text(sql)).all()
+
+
+def get_tag_counts(session, limit: int = None):
+    """Returns (tag name, entry_count) rows, most used tags first."""
+    sql = (
+        "SELECT tags.name, coalesce(stats_tag_counts.entry_count, 0) AS entry_count FROM tags "
+        "LEFT JOIN stats_tag_counts ON stats_tag_counts.tag_id = tags.id "
+        "ORDER BY entry_count DESC, tags.name"
+    )
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return session.execute(text(sql)).all()
@@ -0,0 +1,58 @@
+import threading
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from .models import Tag
+
+
+class TagCache:
+    """In-process map of tag name -> tag id.
+
+    Only ids read back from the database are cached, never negative lookups.
+    Tag creation and deletion in this process invalidate the affected names;
+    a rolled-back transaction clears everything, since ids read inside it may
+    belong to tags that were never committed. Another process may still
+    delete or recreate a cached tag, so writers must check cached ids against
+    tags in the statement that uses them (see services._link_tags) and
+    invalidate the names that no longer match.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, session, names):
+        """Returns {name: id} for the names that exist, querying only uncached ones in one IN (...)."""
+        names = set(names)
+        with self._lock:
+            found = {name: self._ids[name] for name in names if name in self._ids}
+        missing = names - found.keys()
+        if missing:
+            rows = session.execute(select(Tag.name, Tag.id).where(Tag.name.in_(missing))).all()
+            loaded = {row.name: row.id for row in rows}
+            with self._lock:
+                self._ids.update(loaded)
+            found.update(loaded)
+        return found
+
+    def remember(self, name, tag_id):
+        with self._lock:
+            self._ids[name] = tag_id
+
+    def invalidate(self, name=None):
+        """Forgets one name, or everything when name is None."""
+        with self._lock:
+            if name is None:
+                self._ids.clear()
+            else:
+                self._ids.pop(name, None)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+tag_cache = TagCache()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_on_rollback(session):
+    tag_cache.invalidate()
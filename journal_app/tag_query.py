@@ -0,0 +1,138 @@
+import re
+from collections import namedtuple
+from sqlalchemy import Select, select, union, intersect, except_
+from .models import Entry, Tag, entry_tag_association
+
+# Parsed expression nodes.
+TagName = namedtuple('TagName', ['name'])
+And = namedtuple('And', ['left', 'right'])
+Or = namedtuple('Or', ['left', 'right'])
+Not = namedtuple('Not', ['operand'])
+
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|("[^"]*")|([^\s()]+))')
+_OPERATORS = {'AND', 'OR', 'NOT'}
+
+
+class TagQueryError(ValueError):
+    """Raised for a malformed tag expression."""
+
+
+def _tokenize(expression: str):
+    tokens, position = [], 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN_RE.match(expression, position)
+        if not match:
+            raise TagQueryError(f"Unexpected character at position {position + 1}.")
+        open_paren, close_paren, quoted, word = match.groups()
+        if open_paren or close_paren:
+            tokens.append(open_paren or close_paren)
+        elif quoted:
+            tokens.append(('TAG', quoted[1:-1]))
+        elif word.upper() in _OPERATORS:
+            tokens.append(word.upper())
+        else:
+            tokens.append(('TAG', word))
+        position = match.end()
+    return tokens
+
+
+def parse(expression: str):
+    """Parses an expression such as 'work AND (travel OR idea) AND NOT draft'.
+
+    NOT binds tightest, then AND, then OR; adjacent tags without an operator
+    are ANDed. Multi-word tag names can be written in double quotes.
+    """
+    tokens = _tokenize(expression)
+    if not tokens:
+        raise TagQueryError("The tag expression is empty.")
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def advance():
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+
+    def parse_or():
+        node = parse_and()
+        while peek() == 'OR':
+            advance()
+            node = Or(node, parse_and())
+        return node
+
+    def parse_and():
+        node = parse_not()
+        while peek() == 'AND' or peek() == 'NOT' or peek() == '(' or isinstance(peek(), tuple):
+            if peek() == 'AND':
+                advance()
+            node = And(node, parse_not())
+        return node
+
+    def parse_not():
+        if peek() == 'NOT':
+            advance()
+            return Not(parse_not())
+        return parse_atom()
+
+    def parse_atom():
+        token = peek()
+        if token is None:
+            raise TagQueryError("The tag expression ends unexpectedly.")
+        if token == '(':
+            advance()
+            node = parse_or()
+            if peek() != ')':
+                raise TagQueryError("Missing closing parenthesis.")
+            advance()
+            return node
+        if isinstance(token, tuple):
+            advance()
+            name = token[1].strip().capitalize()
+            if not name:
+                raise TagQueryError("Empty tag name.")
+            return TagName(name)
+        raise TagQueryError(f"Unexpected '{token}'.")
+
+    node = parse_or()
+    if peek() is not None:
+        raise TagQueryError(f"Unexpected '{peek()}'.")
+    return node
+
+
+def _as_select(selectable):
+    """Wraps a compound select so it can be nested; SQLite rejects parenthesised compounds."""
+    if isinstance(selectable, Select):
+        return selectable
+    subquery = selectable.subquery()
+    return select(subquery.c[0])
+
+
+def compile_node(node):
+    """Compiles a parsed expression into a SELECT of matching entry ids.
+
+    Tag leaves read entry ids straight from ix_entry_tag_tag_entry; AND, OR
+    and NOT become INTERSECT, UNION and EXCEPT, so the set logic runs in SQLite.
+    """
+    if isinstance(node, TagName):
+        tag_id = select(Tag.id).where(Tag.name == node.name).scalar_subquery()
+        return select(entry_tag_association.c.entry_id).where(entry_tag_association.c.tag_id == tag_id)
+    if isinstance(node, Or):
+        return _as_select(union(compile_node(node.left), compile_node(node.right)))
+    if isinstance(node, And):
+        # 'a AND NOT b' is a plain difference; no need to materialise NOT b.
+        if isinstance(node.right, Not):
+            return _as_select(except_(compile_node(node.left), compile_node(node.right.operand)))
+        if isinstance(node.left, Not):
+            return _as_select(except_(compile_node(node.right), compile_node(node.left.operand)))
+        return _as_select(intersect(compile_node(node.left), compile_node(node.right)))
+    if isinstance(node, Not):
+        return _as_select(except_(select(Entry.id), compile_node(node.operand)))
+    raise TypeError(f"Unknown node {node!r}")
+
+
+def tag_criteria(expression: str):
+    """Returns a WHERE criterion restricting entries to those matching the expression."""
+    return Entry.id.in_(compile_node(parse(expression)))
@@ -0,0 +1,324 @@
+import csv
+import datetime
+import json
+import os
+import time
+from collections import namedtuple
+from itertools import islice
+from sqlalchemy import select, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from .models import Entry, Tag, entry_tag_association
+from .queries import split_tag_names, tag_names_column
+from . import partitions
+
+FORMATS = ('jsonl', 'csv', 'md')
+CSV_FIELDS = ['title', 'content', 'date', 'is_private', 'tags']
+DEFAULT_BATCH_SIZE = 1000
+
+# Yielded by a reader in place of a record it could not parse, so the import skips just that one.
+InvalidRecord = namedtuple('InvalidRecord', ['message'])
+
+
+def detect_format(path: str):
+    """Guesses the import/export format from a file extension."""
+    if os.path.isdir(path):
+        return 'md'
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson', 'json'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    if extension in ('md', 'markdown'):
+        return 'md'
+    return None
+
+
+def _parse_bool(value, default=True):
+    """Parses the privacy flag, accepting booleans and common spellings."""
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in ('1', 'true', 'yes', 'y', 'private', 'p'):
+        return True
+    if value in ('0', 'false', 'no', 'n', 'public', 'u'):
+        return False
+    raise ValueError(f"invalid privacy value '{value}'")
+
+
+def _parse_date(value):
+    """Parses an ISO 8601 date or datetime; missing dates default to now (UTC)."""
+    if not value:
+        return datetime.datetime.utcnow()
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.fromisoformat(str(value).strip())
+
+
+def _parse_tags(value):
+    """Returns normalised tag names from a list, a JSON array (see _format_tags) or a comma-separated string."""
+    if not value:
+        return []
+    if isinstance(value, str) and value.lstrip().startswith('['):
+        value = json.loads(value)
+        if not isinstance(value, list):
+            raise ValueError("tags must be a JSON array of names")
+    elif isinstance(value, str):
+        value = value.split(',')
+    return sorted({str(name).strip().capitalize() for name in value if str(name).strip()})
+
+
+def normalize_record(raw: dict):
+    """Validates one raw record and converts it into the shape used for inserts."""
+    title = (raw.get('title') or '').strip()
+    content = (raw.get('content') or '').strip()
+    if not title or not content:
+        raise ValueError("title and content are required")
+    return {
+        'title': title,
+        'content': content,
+        'date': _parse_date(raw.get('date')),
+        'is_private': _parse_bool(raw.get('is_private', raw.get('private'))),
+        'tags': _parse_tags(raw.get('tags')),
+    }
+
+
+def iter_jsonl(path: str):
+    """Yields raw records from a JSON Lines file, one line at a time; broken lines become InvalidRecords."""
+    with open(path, 'rb') as handle:
+        for number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line.decode('utf-8'))
+            except ValueError as e:
+                yield InvalidRecord(f"line {number}: {e}")
+
+
+def iter_csv(path: str):
+    """Yields raw records from a CSV file with a header row; rows the csv module rejects become InvalidRecords."""
+    with open(path, encoding='utf-8', newline='') as handle:
+        reader = csv.DictReader(handle)
+        while True:
+            try:
+                yield next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield InvalidRecord(f"line {reader.line_num}: {e}")
+
+
+def _iter_front_matter_blocks(lines):
+    """Yields (front_matter, body_lines) for each '---' delimited block in lines.
+
+    When the front matter has a 'lines' count (written by write_markdown),
+    exactly that many lines form the body, so a '---' line inside it does
+    not start a new block.
+    """
+    meta, body = None, []
+    lines = iter(lines)
+    for line in lines:
+        if line.rstrip('\n') == '---':
+            if meta is not None:
+                yield meta, body
+            meta, body = {}, []
+            for header in lines:
+                header = header.rstrip('\n')
+                if header == '---':
+                    break
+                key, _, value = header.partition(':')
+                meta[key.strip()] = value.strip()
+            length = meta.pop('lines', '')
+            if length.isdigit():
+                body = list(islice(lines, int(length)))
+        elif meta is not None:
+            body.append(line)
+        elif line.strip():
+            # Text before the first front matter block belongs to an untitled entry.
+            meta, body = {}, [line]
+    if meta is not None:
+        yield meta, body
+
+
+def _markdown_record(meta, body, fallback_title=None):
+    """Builds a raw record from front matter and body lines."""
+    body = ''.join(body).strip('\n')
+    title = meta.get('title')
+    if not title and body.startswith('# '):
+        heading, _, body = body.partition('\n')
+        title = heading[2:].strip()
+    record = dict(meta)
+    record['title'] = title or fallback_title
+    record['content'] = body
+    return record
+
+
+def iter_markdown(path: str):
+    """Yields raw records from a Markdown file or a directory of Markdown files.
+
+    A single file may hold many entries, each starting with a front matter
+    block (title, date, is_private, tags) delimited by '---' lines. In a
+    directory every *.md file is one entry.
+    """
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if not name.lower().endswith(('.md', '.markdown')):
+                continue
+            file_path = os.path.join(path, name)
+            with open(file_path, encoding='utf-8') as handle:
+                for meta, body in _iter_front_matter_blocks(handle):
+                    meta.setdefault('date', datetime.datetime.utcfromtimestamp(os.path.getmtime(file_path)).isoformat())
+                    yield _markdown_record(meta, body, os.path.splitext(name)[0])
+        return
+    with open(path, encoding='utf-8') as handle:
+        for meta, body in _iter_front_matter_blocks(handle):
+            yield _markdown_record(meta, body)
+
+
+READERS = {'jsonl': iter_jsonl, 'csv': iter_csv, 'md': iter_markdown}
+
+
+def iter_records(path: str, fmt: str, errors: list = None):
+    """Yields normalised records, collecting (record_number, message) for rejected and unreadable ones."""
+    for number, raw in enumerate(READERS[fmt](path), start=1):
+        try:
+            if isinstance(raw, InvalidRecord):
+                raise ValueError(raw.message)
+            yield normalize_record(raw)
+        except (ValueError, TypeError, AttributeError) as e:
+            if errors is None:
+                raise ValueError(f"record {number}: {e}") from e
+            errors.append((number, str(e)))
+
+
+def _batches(iterable, size):
+    """Splits an iterable into lists of at most size items without materialising it."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def resolve_tag_ids(session, names):
+    """Upserts tag names in one statement and returns a {name: id} mapping."""
+    names = sorted(set(names))
+    if not names:
+        return {}
+    session.execute(
+        sqlite_insert(Tag).on_conflict_do_nothing(index_elements=['name']),
+        [{'name': name} for name in names],
+    )
+    return dict(session.execute(select(Tag.name, Tag.id).where(Tag.name.in_(names))).all())
+
+
+def insert_batch(session, records):
+    """Inserts one batch of normalised records and their tag links; returns the entry ids."""
+    entry_ids = session.scalars(
+        insert(Entry).returning(Entry.id, sort_by_parameter_order=True),
+        [{key: record[key] for key in ('title', 'content', 'date', 'is_private')} for record in records],
+    ).all()
+    tag_ids = resolve_tag_ids(session, (name for record in records for name in record['tags']))
+    links = [
+        {'entry_id': entry_id, 'tag_id': tag_ids[name]}
+        for entry_id, record in zip(entry_ids, records)
+        for name in record['tags']
+    ]
+    if links:
+        session.execute(insert(entry_tag_association), links)
+    return entry_ids
+
+
+def import_entries(session, path: str, fmt: str = None, batch_size: int = DEFAULT_BATCH_SIZE, errors: list = None):
+    """Streams records from path into the database in batches.
+
+    Each batch is committed on its own. Returns (imported_count, elapsed_seconds).
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(FORMATS)}.")
+    imported = 0
+    started = time.perf_counter()
+    for batch in _batches(iter_records(path, fmt, errors), batch_size):
+        insert_batch(session, batch)
+        session.commit()
+        imported += len(batch)
+    return imported, time.perf_counter() - started
+
+
+def iter_export_records(session, *criteria, chunk_size: int = DEFAULT_BATCH_SIZE):
+    """Streams entries oldest first as plain dicts, fetching chunk_size rows at a time, archived years included."""
+    statement = (
+        select(Entry.id, Entry.title, Entry.content, Entry.date, Entry.is_private, tag_names_column())
+        .where(*criteria)
+        .order_by(Entry.date, Entry.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for row in partitions.iter_rows(session, statement):
+        yield {
+            'title': row.title,
+            'content': row.content,
+            'date': row.date.isoformat() if row.date else None,
+            'is_private': row.is_private,
+            'tags': split_tag_names(row.tag_names),
+        }
+
+
+def _format_tags(names):
+    """Writes tag names for CSV and Markdown as a JSON array, since a name may contain a comma."""
+    return json.dumps(names, ensure_ascii=False) if names else ''
+
+
+def write_jsonl(records, handle):
+    """Writes records as JSON Lines."""
+    for record in records:
+        handle.write(json.dumps(record, ensure_ascii=False) + '\n')
+        yield record
+
+
+def write_csv(records, handle):
+    """Writes records as CSV with a header row; tags are a JSON array."""
+    writer = csv.DictWriter(handle, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for record in records:
+        writer.writerow(dict(record, tags=_format_tags(record['tags'])))
+        yield record
+
+
+def write_markdown(records, handle):
+    """Writes records as Markdown with one front matter block per entry.
+
+    The front matter counts the body's lines, so content with '---' lines
+    of its own reads back whole (see _iter_front_matter_blocks).
+    """
+    for record in records:
+        content = record['content'].replace('\r\n', '\n').replace('\r', '\n')
+        handle.write(
+            "---\n"
+            f"title: {record['title']}\n"
+            f"date: {record['date']}\n"
+            f"is_private: {'true' if record['is_private'] else 'false'}\n"
+            f"tags: {_format_tags(record['tags'])}\n"
+            f"lines: {content.count(chr(10)) + 1}\n"
+            "---\n"
+            f"{content}\n\n"
+        )
+        yield record
+
+
+WRITERS = {'jsonl': write_jsonl, 'csv': write_csv, 'md': write_markdown}
+
+
+def export_entries(session, path: str, fmt: str = None, criteria=(), chunk_size: int = DEFAULT_BATCH_SIZE):
+    """Streams entries into a file. Returns (exported_count, elapsed_seconds)."""
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(FORMATS)}.")
+    exported = 0
+    started = time.perf_counter()
+    with open(path, 'w', encoding='utf-8', newline='' if fmt == 'csv' else None) as handle:
+        for _ in WRITERS[fmt](iter_export_records(session, *criteria, chunk_size=chunk_size), handle):
+            exported += 1
+    return exported, time.perf_counter() - started
@@ -1,8 +1,5 @@
-from journal_app.database import create_db_and_tables
-from journal_app.cli import (
-    add_entry, view_all_entries, view_entry_details, search_entries,
-    update_entry, delete_entry, create_tag, manage_tags_for_entry, delete_tag
-)
+import sys
+from journal_app.profiling import profiler
 from rich.console import Console 
 
 console = Console()
@@ -19,44 +16,72 @@ def display_menu():
     console.print("7. Create New Tag")
     console.print("8. Manage Tags for Entry")
     console.print("9. Delete Tag")
+    console.print("10. Rebuild Search Index")
+    console.print("11. Import Entries")
+    console.print("12. Export Entries")
+    console.print("13. Journal Statistics")
+    console.print("14. Manage Attachments")
+    console.print("15. Bulk Operations")
+    console.print("16. Backup & Restore")
+    console.print("17. Publish Static Site")
+    console.print("18. Writing Analytics")
     console.print("[bold red]Q.[/bold red] Quit")
     console.print("------------------------")
 
+# Menu choices name functions in journal_app.cli. That module pulls in SQLAlchemy, so it is
+# imported (and the schema checked) in the background while the first menu is on screen.
+MENU_ACTIONS = {
+    '1': 'add_entry',
+    '2': 'view_all_entries',
+    '3': 'view_entry_details',
+    '4': 'search_entries',
+    '5': 'update_entry',
+    '6': 'delete_entry',
+    '7': 'create_tag',
+    '8': 'manage_tags_by_id',
+    '9': 'delete_tag',
+    '10': 'rebuild_search_index',
+    '11': 'import_entries',
+    '12': 'export_entries',
+    '13': 'show_statistics',
+    '14': 'manage_attachments',
+    '15': 'bulk_operations',
+    '16': 'backup_and_restore',
+    '17': 'publish_site',
+    '18': 'show_writing_analytics',
+}
+
+def load_app():
+    """Imports the menu functions, brings the database schema up to date and starts scheduled backups."""
+    from journal_app import cli
+    from journal_app.database import create_db_and_tables
+    from journal_app.backup import start_scheduled_backups
+    create_db_and_tables(verbose=False)
+    start_scheduled_backups()
+    return cli
+
 def run_application():
     """Main loop for the CLI application."""
-    create_db_and_tables() 
-
-    while True:
-        display_menu()
-        choice = console.input("Enter your choice: ").strip().upper()
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        app = executor.submit(load_app)
+        while True:
+            display_menu()
+            choice = console.input("Enter your choice: ").strip().upper()
 
-        if choice == '1':
-            add_entry()
-        elif choice == '2':
-            view_all_entries()
-        elif choice == '3':
-            view_entry_details()
-        elif choice == '4':
-            search_entries()
-        elif choice == '5':
-            update_entry()
-        elif choice == '6':
-            delete_entry()
-        elif choice == '7':
-            create_tag()
-        elif choice == '8':
-            try:
-                entry_id = int(console.input("Enter Entry ID to manage tags for: "))
-                manage_tags_for_entry(entry_id)
-            except ValueError:
-                console.print("[red]Invalid ID. Please enter a number.[/red]")
-        elif choice == '9': 
-            delete_tag()
-        elif choice == 'Q':
-            console.print("Exiting Journal App. Goodbye!")
-            break
-        else:
-            console.print("[red]Invalid choice. Please try again.[/red]")
+            name = MENU_ACTIONS.get(choice)
+            if name:
+                action = getattr(app.result(), name)
+                with profiler.command(name):
+                    action()
+            elif choice == 'Q':
+                console.print("Exiting Journal App. Goodbye!")
+                break
+            else:
+                console.print("[red]Invalid choice. Please try again.[/red]")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        from journal_app.commands import main
+        sys.exit(main(sys.argv[1:], menu=run_application))
     run_application()
\ No newline at end of file
@@ -0,0 +1,72 @@
+import os
+import tempfile
+from contextlib import contextmanager
+import pytest
+
+# journal_app.database builds its engine from the environment when first imported; point it
+# at a scratch file so no test can touch a real journal. Tests use the fixtures below instead.
+os.environ["JOURNAL_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="journal-tests-"), "journal.db")
+
+from sqlalchemy import event, insert, select  # noqa: E402
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from journal_app.config import load_settings  # noqa: E402
+from journal_app.database import build_engine  # noqa: E402
+from journal_app.migrations import bootstrap  # noqa: E402
+from journal_app.models import Entry, Tag, entry_tag_association  # noqa: E402
+
+
+def make_engine(path):
+    """An engine on a new, fully migrated database file at path, configured like the app's."""
+    settings = load_settings(environ={"JOURNAL_DB_PATH": str(path)})
+    engine = build_engine(settings)
+    with engine.connect() as connection:
+        bootstrap(connection)
+    return engine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = make_engine(tmp_path / "journal.db")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@contextmanager
+def recorded_statements(engine):
+    """Collects (statement, parameters) for every statement engine sends to SQLite meanwhile."""
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def add_entries(session, records):
+    """Inserts (title, content, date, is_private, tags) tuples with plain INSERTs and commits."""
+    entry_ids = session.scalars(
+        insert(Entry).returning(Entry.id, sort_by_parameter_order=True),
+        [{'title': title, 'content': content, 'date': date, 'is_private': is_private}
+         for title, content, date, is_private, _ in records],
+    ).all()
+    names = sorted({name for *_, tags in records for name in tags})
+    if names:
+        session.execute(sqlite_insert(Tag).on_conflict_do_nothing(index_elements=['name']), [{'name': n} for n in names])
+        tag_ids = dict(session.execute(select(Tag.name, Tag.id).where(Tag.name.in_(names))).all())
+        session.execute(insert(entry_tag_association), [
+            {'entry_id': entry_id, 'tag_id': tag_ids[name]}
+            for entry_id, (*_, tags) in zip(entry_ids, records) for name in sorted(set(tags))
+        ])
+    session.commit()
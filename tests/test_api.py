@@ -0,0 +1,142 @@
+import datetime
+import http.client
+import json
+import threading
+from http import HTTPStatus
+import pytest
+from sqlalchemy.orm import sessionmaker
+from journal_app import partitions
+from journal_app.api import APIServer, JournalAPI
+from journal_app.query_cache import file_signature
+from .conftest import add_entries, recorded_statements
+
+START = datetime.datetime(2024, 3, 1, 9, 0)
+
+
+@pytest.fixture
+def api(engine, session):
+    add_entries(session, [
+        (f"Entry {number}", f"coffee and notes {number}", START + datetime.timedelta(days=number), number % 2 == 0,
+         ["Work"] if number % 3 == 0 else ["Home"])
+        for number in range(45)
+    ])
+    return JournalAPI(sessionmaker(bind=engine), file_signature(engine.url.database))
+
+
+def get(api, target, etag=None):
+    status, headers, body = api.handle(target, etag)
+    return status, headers, json.loads(body) if body else None
+
+
+def test_entries_are_paged_newest_first(api):
+    seen, target = [], "/entries?limit=20"
+    while target:
+        status, _, page = get(api, target)
+        assert status == HTTPStatus.OK
+        assert len(page['entries']) <= 20
+        seen += page['entries']
+        target = page['next']
+    assert len(seen) == 45
+    assert len({entry['id'] for entry in seen}) == 45
+    assert [entry['date'] for entry in seen] == sorted((entry['date'] for entry in seen), reverse=True)
+
+
+def test_entry_details_and_missing_entry(api):
+    _, _, page = get(api, "/entries?limit=1")
+    entry_id = page['entries'][0]['id']
+    status, _, entry = get(api, f"/entries/{entry_id}")
+    assert status == HTTPStatus.OK
+    assert entry['content'].startswith("coffee and notes")
+    status, _, error = get(api, "/entries/999999")
+    assert status == HTTPStatus.NOT_FOUND and "999999" in error['error']
+
+
+def test_unchanged_data_revalidates_without_a_query(api, engine, session):
+    status, headers, _ = get(api, "/entries?limit=5")
+    etag = headers['ETag']
+    with recorded_statements(engine) as statements:
+        status, headers, body = get(api, "/search?q=coffee", etag)
+    assert status == HTTPStatus.NOT_MODIFIED and body is None
+    assert statements == []
+
+    add_entries(session, [("Later", "tea instead", START + datetime.timedelta(days=100), False, [])])
+    status, headers, page = get(api, "/entries?limit=5", etag)
+    assert status == HTTPStatus.OK
+    assert headers['ETag'] != etag
+    assert page['entries'][0]['title'] == "Later"
+
+
+@pytest.mark.parametrize("target, count", [
+    ("/search?q=coffee&limit=200", 45),
+    ("/search?tags=Work&limit=200", 15),
+    ("/search?tags=Work%20and%20not%20Home&q=notes&limit=200", 15),
+    ("/search?date=2024-03-02", 1),
+    ("/search?month=2024-03&limit=200", 31),
+    ("/search?from=2024-04-01&to=2024-04-10", 10),
+])
+def test_search_modes(api, target, count):
+    status, _, result = get(api, target)
+    assert status == HTTPStatus.OK
+    assert len(result['entries']) == count
+
+
+@pytest.mark.parametrize("target", [
+    "/search", "/search?limit=abc&q=x", "/search?date=March", "/search?tags=(Work", "/nowhere",
+])
+def test_bad_requests_are_reported_as_json(api, target):
+    status, _, result = get(api, target)
+    assert status in (HTTPStatus.BAD_REQUEST, HTTPStatus.NOT_FOUND)
+    assert result['error']
+
+
+def test_tags_and_stats(api):
+    _, _, tags = get(api, "/tags")
+    assert {tag['name']: tag['entries'] for tag in tags} == {"Work": 15, "Home": 30}
+    _, _, stats = get(api, "/stats?months=2")
+    assert stats['totals']['entries'] == 45
+    assert [month['month'] for month in stats['monthly']] == ["2024-04", "2024-03"]
+
+
+def test_server_answers_over_loopback(api):
+    server = APIServer(("127.0.0.1", 0), api, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+        connection.request("GET", "/entries?limit=2")
+        response = connection.getresponse()
+        body = json.loads(response.read())
+        assert response.status == HTTPStatus.OK
+        assert response.getheader("Content-Type").startswith("application/json")
+        assert len(body['entries']) == 2
+
+        connection.request("GET", "/entries?limit=2", headers={"If-None-Match": response.getheader("ETag")})
+        response = connection.getresponse()
+        assert response.status == HTTPStatus.NOT_MODIFIED and response.read() == b""
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_relative_windows_move_on_with_the_day(api, monkeypatch):
+    monkeypatch.setattr("journal_app.api._today", lambda: "2024-03-10")
+    status, headers, _ = get(api, "/search?last_days=7")
+    etag = headers['ETag']
+    assert get(api, "/search?last_days=7", etag)[0] == HTTPStatus.NOT_MODIFIED
+    assert get(api, "/entries?limit=5")[1]['ETag'] != etag
+
+    monkeypatch.setattr("journal_app.api._today", lambda: "2024-03-11")
+    status, headers, _ = get(api, "/search?last_days=7", etag)
+    assert status == HTTPStatus.OK and headers['ETag'] != etag
+
+
+def test_stats_and_tags_count_archived_years(api, session):
+    partitions.archive_year(session, START.year)
+    add_entries(session, [("Today", "live entry", datetime.datetime.now(), False, ["Work"])])
+
+    _, _, stats = get(api, "/stats")
+    _, _, tags = get(api, "/tags")
+    assert stats['totals'] == {'entries': 46, 'private': 23, 'public': 23}
+    assert sum(month['entries'] for month in stats['monthly']) == 46
+    assert {tag['name']: tag['entries'] for tag in tags} == {'Work': 16, 'Home': 30}
@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from journal_app.config import load_settings
+
+pytest.importorskip("aiosqlite")
+from journal_app.async_service import AsyncJournalService  # noqa: E402
+
+WRITERS = 100
+READERS = 200
+
+
+def test_overlapping_reads_and_writes(tmp_path):
+    settings = load_settings(environ={"JOURNAL_DB_PATH": str(tmp_path / "journal.db")})
+
+    async def scenario():
+        async with AsyncJournalService(settings) as service:
+            seed = await service.add_entry("Seed", "coffee to start", tags=["Morning"])
+
+            async def write(number):
+                return await service.add_entry(f"Entry {number}", f"coffee number {number}", number % 2 == 0,
+                                               tags=[f"Tag{number % 7}"])
+
+            async def read(number):
+                if number % 3 == 0:
+                    return await service.list_entries(limit=50)
+                if number % 3 == 1:
+                    return await service.search_keyword("coffee")
+                return await service.get_entry(seed['id'])
+
+            calls = [write(number) for number in range(WRITERS)] + [read(number) for number in range(READERS)]
+            # Interleave, so reads overlap writes throughout instead of queueing behind them.
+            calls = [call for pair in zip(calls[:WRITERS], calls[WRITERS:]) for call in pair] + calls[2 * WRITERS:]
+            results = await asyncio.gather(*calls)
+
+            written = [result for result in results if isinstance(result, dict) and result['title'].startswith("Entry")]
+            assert len({entry['id'] for entry in written}) == WRITERS
+            assert all(result is not None for result in results)
+            listed = await service.list_entries(limit=1000)
+            assert len(listed) == WRITERS + 1
+            assert len(await service.search_keyword("coffee")) == WRITERS + 1
+            tags = {tag['name'] for tag in await service.list_tags()}
+            assert tags == {"Morning"} | {f"Tag{number}" for number in range(7)}
+
+    asyncio.run(scenario())
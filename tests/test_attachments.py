@@ -0,0 +1,35 @@
+import datetime
+import os
+from sqlalchemy import delete
+from sqlalchemy.orm import sessionmaker
+from journal_app import attachments
+from journal_app.models import Attachment, Entry
+from .conftest import add_entries
+
+
+def test_collection_between_staging_and_commit_keeps_the_new_reference(engine, session, tmp_path):
+    add_entries(session, [("First", "Body", datetime.datetime(2024, 1, 1), True, []),
+                          ("Second", "Body", datetime.datetime(2024, 1, 2), True, [])])
+    store = attachments.AttachmentStore(str(tmp_path / "files"))
+    source = tmp_path / "note.txt"
+    source.write_bytes(b"shared bytes")
+    first, second = session.get(Entry, 1), session.get(Entry, 2)
+    sha256 = attachments.add_attachment(session, store, first, str(source)).sha256
+    session.execute(delete(Attachment))
+    session.commit()  # the blob now has no references but has not been collected yet
+
+    stage = store.stage
+
+    def stage_then_collect(source):
+        staged = stage(source)
+        with sessionmaker(bind=engine)() as collector:
+            assert attachments.collect_garbage(collector, store) == (1, len(b"shared bytes"))
+        return staged
+
+    store.stage = stage_then_collect
+    attachments.add_attachment(session, store, second, str(source))
+
+    assert store.exists(sha256)
+    assert os.listdir(store.tmp_dir) == []
+    with store.open_view(sha256) as view:
+        assert bytes(view) == b"shared bytes"
@@ -0,0 +1,37 @@
+import pytest
+from journal_app import backup, services
+from journal_app.change_state import change_version
+from journal_app.similarity import SimilarityIndex
+
+
+def test_restore_keeps_change_counter_rising(engine, session, tmp_path):
+    services.create_entry(session, "Before", "kept in the snapshot")
+    snapshot = backup.create_backup(engine, str(tmp_path / "backups"), sleep=0)
+    services.create_entry(session, "After", "written after the snapshot")
+    before_restore = change_version(session)
+    session.close()
+
+    backup.restore_backup(engine, snapshot.path)
+    restored = change_version(session)
+    assert restored > before_restore
+    services.create_entry(session, "Again", "a different write")
+    assert change_version(session) > restored
+    assert [entry.title for entry in services.list_entries(session)] == ["Again", "Before"]
+
+
+def test_restore_rebuilds_the_related_entries_index(engine, session, tmp_path):
+    pytest.importorskip("numpy")
+    index = SimilarityIndex(str(tmp_path / "index"))
+    first = services.create_entry(session, "Garden", "tomatoes and basil in the garden").id
+    second = services.create_entry(session, "Harvest", "picked tomatoes from the garden").id
+    index.sync(session)
+    snapshot = backup.create_backup(engine, str(tmp_path / "backups"), sleep=0)
+    services.delete_entry(session, second)
+    index.sync(session)
+    assert sorted(index.rows) == [first]
+    session.close()
+
+    backup.restore_backup(engine, snapshot.path)
+
+    assert [related.entry_id for related in index.related(session, first)] == [second]
+    assert sorted(index.rows) == [first, second]
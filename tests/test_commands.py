@@ -0,0 +1,33 @@
+import datetime
+import json
+from journal_app.commands import build_parser, run_batch
+from .conftest import add_entries
+
+
+def test_help_on_one_batch_line_does_not_end_the_batch(session, capsys):
+    add_entries(session, [("First", "Body", datetime.datetime(2024, 1, 1), False, [])])
+
+    failures = run_batch(build_parser(), session, 'json', ["list --help", "list", "list --bogus", "list"])
+
+    out, err = capsys.readouterr()
+    assert failures == 1
+    assert "usage:" in out
+    assert [json.loads(line)[0]['title'] for line in out.splitlines() if line.startswith('[')] == ["First", "First"]
+    assert err.startswith("line 3: error:")
+
+
+def test_to_is_only_accepted_with_an_open_window(session, capsys):
+    add_entries(session, [("First", "Body", datetime.datetime(2024, 1, 1), False, [])])
+
+    failures = run_batch(build_parser(), session, 'json', [
+        "list --year 2024 --to 2024-06-30",
+        "list --last-days 3 --to 2024-06-30",
+        "list --from 2023-12-01 --to 2024-01-01",
+        "list --to 2024-01-01",
+    ])
+
+    out, err = capsys.readouterr()
+    assert failures == 2
+    assert "line 1: error: argument --to: not allowed with argument --year" in err
+    assert "--last-days" in err
+    assert [json.loads(line)[0]['title'] for line in out.splitlines()] == ["First", "First"]
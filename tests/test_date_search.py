@@ -0,0 +1,78 @@
+import datetime
+import pytest
+from sqlalchemy import text
+from journal_app import queries, services
+from .conftest import add_entries, recorded_statements
+
+INDEX = "ix_entries_date_id"
+
+
+def _query_plans(engine, search):
+    """Runs search, then EXPLAIN QUERY PLAN for each statement it sent, with the same parameters."""
+    with recorded_statements(engine) as statements:
+        rows = search()
+    plans = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            details = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plans.append(" | ".join(row[-1] for row in details))
+    return rows, plans
+
+
+@pytest.fixture
+def dated(session):
+    start = datetime.datetime(2023, 1, 1, 8, 0)
+    add_entries(session, [
+        (f"Entry {day}", "text", start + datetime.timedelta(days=day), False, ["Daily"]) for day in range(500)
+    ])
+    return session
+
+
+@pytest.mark.parametrize("window, expected", [
+    (queries.day_range(datetime.date(2023, 3, 5)), 1),
+    (queries.month_range(2023, 2), 28),
+    (queries.year_range(2023), 365),
+    ((datetime.datetime(2023, 12, 25), datetime.datetime(2024, 1, 5)), 11),
+    ((datetime.datetime(2024, 5, 1), None), 14),
+    ((None, datetime.datetime(2023, 1, 3)), 2),
+])
+def test_date_ranges_seek_the_date_index(engine, dated, window, expected):
+    rows, plans = _query_plans(engine, lambda: services.search_dates(dated, *window))
+    assert len(rows) == expected
+    main = plans[0]
+    assert f"SEARCH entries USING COVERING INDEX {INDEX}" in main or f"SEARCH entries USING INDEX {INDEX}" in main
+    assert "SCAN entries" not in main
+
+
+def test_last_days_seeks_the_date_index(engine, dated):
+    start, end = queries.last_days_range(30, now=datetime.datetime(2024, 1, 10))
+    rows, plans = _query_plans(engine, lambda: services.search_dates(dated, start, end))
+    assert len(rows) == 156
+    assert f"INDEX {INDEX} (date>?)" in plans[0]
+
+
+def test_text_matching_on_dates_would_scan(engine, dated):
+    # The LIKE filter date search used before range predicates: the plan this change avoids.
+    statement = queries.entry_rows_select(text("entries.date LIKE :day").bindparams(day="2023-03-05%"))
+    rows, plans = _query_plans(engine, lambda: queries.fetch_entry_rows(dated, statement))
+    assert len(rows) == 1
+    assert "SEARCH entries" not in plans[0]
+
+
+def test_date_search_statement_count_does_not_grow_with_rows(engine, session):
+    start = datetime.datetime(2023, 1, 1, 8, 0)
+
+    def add(first, count):
+        add_entries(session, [
+            (f"Entry {hour}", "text", start + datetime.timedelta(hours=hour), False, [f"Tag{hour % 3}"])
+            for hour in range(first, first + count)
+        ])
+
+    add(0, 5)
+    with recorded_statements(engine) as few:
+        services.search_dates(session, start, None)
+    add(5, 295)
+    with recorded_statements(engine) as many:
+        rows = services.search_dates(session, start, None)
+    assert len(rows) == 300 and all(row.tags for row in rows)
+    assert len(many) == len(few)
@@ -0,0 +1,35 @@
+import datetime
+from journal_app import queries
+from .conftest import add_entries, recorded_statements
+
+START = datetime.datetime(2024, 1, 1, 9, 0)
+
+
+def _add(session, first, count):
+    add_entries(session, [
+        (f"Entry {number}", "text", START + datetime.timedelta(hours=number), False, [f"Tag{number % 3}"])
+        for number in range(first, first + count)
+    ])
+
+
+def test_page_statement_count_does_not_grow_with_rows(engine, session):
+    _add(session, 0, 5)
+    with recorded_statements(engine) as few:
+        queries.page_entries(session, 1000)
+    _add(session, 5, 295)
+    with recorded_statements(engine) as many:
+        rows = queries.page_entries(session, 1000)
+    assert len(rows) == 300 and all(row.tags for row in rows)
+    assert len(many) == len(few)
+
+
+def test_pages_follow_the_key_without_gaps(session):
+    _add(session, 0, 25)
+    seen, after = [], None
+    while True:
+        page = queries.page_entries(session, 10, after=after)
+        if not page:
+            break
+        seen += page
+        after = (page[-1].date, page[-1].id)
+    assert [row.id for row in seen] == list(range(25, 0, -1))
@@ -0,0 +1,29 @@
+import datetime
+from journal_app import partitions
+from .conftest import add_entries, recorded_statements
+
+ARCHIVED = datetime.datetime(2023, 6, 1, 9, 0)
+LIVE = datetime.datetime(2024, 1, 1, 9, 0)
+
+
+def _add(session, start, first, count):
+    add_entries(session, [
+        (f"Entry {number}", "text", start + datetime.timedelta(hours=number), False, [f"Tag{number % 3}"])
+        for number in range(first, first + count)
+    ])
+
+
+def test_page_spans_archived_years_in_constant_statements(engine, session):
+    _add(session, ARCHIVED, 0, 5)
+    partitions.archive_year(session, ARCHIVED.year)
+    _add(session, LIVE, 0, 5)
+    with recorded_statements(engine) as few:
+        rows = partitions.page_entries(session, 1000)
+    assert len(rows) == 10
+
+    _add(session, LIVE, 5, 295)
+    with recorded_statements(engine) as many:
+        rows = partitions.page_entries(session, 1000)
+    assert len(rows) == 305 and all(row.tags for row in rows)
+    assert [row.date for row in rows] == sorted((row.date for row in rows), reverse=True)
+    assert len(many) == len(few)
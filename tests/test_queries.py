@@ -0,0 +1,43 @@
+import datetime
+import pytest
+from journal_app import queries, services
+from .conftest import add_entries, recorded_statements
+
+START = datetime.datetime(2024, 1, 1, 9, 0)
+
+
+def _records(first, count):
+    return [
+        (f"Entry {number}", f"coffee notes {number}", START + datetime.timedelta(hours=number), number % 2 == 0,
+         [f"Tag{number % 3}", f"Tag{number % 5}"])
+        for number in range(first, first + count)
+    ]
+
+
+@pytest.mark.parametrize("listing", [
+    lambda session: queries.list_entries(session),
+    lambda session: services.search_keyword(session, "coffee")[0],
+])
+def test_listing_statement_count_does_not_grow_with_rows(engine, session, listing):
+    add_entries(session, _records(0, 5))
+    with recorded_statements(engine) as few:
+        rows = listing(session)
+    assert rows and all(row.tags for row in rows)
+
+    add_entries(session, _records(5, 295))
+    with recorded_statements(engine) as many:
+        rows = listing(session)
+    assert len(rows) > 100 and all(row.tags for row in rows)
+    assert len(many) == len(few)
+
+
+def test_listing_rows_carry_sorted_tag_names(session):
+    add_entries(session, [("Tagged", "text", START, False, ["Zeta", "Alpha"]), ("Bare", "text", START, False, [])])
+    rows = {row.title: row for row in queries.list_entries(session)}
+    assert rows["Tagged"].tags == ["Alpha", "Zeta"]
+    assert rows["Bare"].tags == []
+
+
+def test_tag_names_may_contain_commas(session):
+    add_entries(session, [("Tagged", "text", START, False, ["Rome, Italy", "Travel"])])
+    assert queries.list_entries(session)[0].tags == ["Rome, Italy", "Travel"]
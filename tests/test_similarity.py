@@ -0,0 +1,25 @@
+import datetime
+import pytest
+from journal_app.similarity import SimilarityIndex
+from .conftest import add_entries
+
+pytest.importorskip("numpy")
+
+DAY = datetime.datetime(2024, 5, 1)
+
+
+def test_indexes_sharing_a_directory_do_not_lose_each_others_changes(session, tmp_path):
+    add_entries(session, [("Garden", "tomatoes and basil in the garden", DAY, True, [])])
+    first, second = SimilarityIndex(str(tmp_path / "index")), SimilarityIndex(str(tmp_path / "index"))
+    first.sync(session)
+
+    add_entries(session, [("Harvest", "picked tomatoes from the garden", DAY, True, [])])
+    second.sync(session)
+    add_entries(session, [("Basil", "basil pesto from the garden", DAY, True, [])])
+    first.sync(session)
+
+    fresh = SimilarityIndex(str(tmp_path / "index"))
+    fresh.sync(session)
+    assert sorted(fresh.rows) == [1, 2, 3]
+    assert fresh.meta['documents'] == 3
+    assert [related.entry_id for related in second.related(session, 3)] == [1, 2]
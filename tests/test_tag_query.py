@@ -0,0 +1,37 @@
+import datetime
+import pytest
+from journal_app import services
+from .conftest import add_entries, recorded_statements
+
+START = datetime.datetime(2024, 1, 1, 9, 0)
+
+
+def _add(session, first, count):
+    add_entries(session, [
+        (f"Entry {number}", "coffee", START + datetime.timedelta(hours=number), False,
+         [f"Tag{number % 3}", f"Tag{number % 5}"])
+        for number in range(first, first + count)
+    ])
+
+
+def test_tag_search_statement_count_does_not_grow_with_rows(engine, session):
+    _add(session, 0, 5)
+    with recorded_statements(engine) as few:
+        services.search_tags(session, "Tag1 or Tag2")
+    _add(session, 5, 295)
+    with recorded_statements(engine) as many:
+        rows, _ = services.search_tags(session, "Tag1 or Tag2")
+    assert len(rows) > 100 and all({"Tag1", "Tag2"} & set(row.tags) for row in rows)
+    assert len(many) == len(few)
+
+
+@pytest.mark.parametrize("expression, count", [
+    ("Tag1", 14),
+    ("Tag1 and Tag2", 4),
+    ("Tag0 and not Tag0", 0),
+    ("(Tag1 or Tag2) and not Tag4", 20),
+])
+def test_boolean_expressions(session, expression, count):
+    _add(session, 0, 30)
+    rows, _ = services.search_tags(session, expression)
+    assert len(rows) == count
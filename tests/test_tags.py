@@ -0,0 +1,81 @@
+import datetime
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from journal_app import bulk, services
+from journal_app.models import Entry
+from journal_app.tag_cache import tag_cache
+from .conftest import add_entries
+
+
+@pytest.fixture(autouse=True)
+def empty_tag_cache():
+    tag_cache.invalidate()
+    yield
+    tag_cache.invalidate()
+
+
+def _recreate_elsewhere(engine, name):
+    """Deletes a tag and recreates it under a new id, as another process would, behind the tag cache."""
+    with engine.begin() as connection:
+        old_id = connection.scalar(text("SELECT id FROM tags WHERE name = :name"), {'name': name})
+        connection.execute(text("DELETE FROM entry_tag_association WHERE tag_id = :id"), {'id': old_id})
+        connection.execute(text("DELETE FROM tags WHERE id = :id"), {'id': old_id})
+        connection.execute(text("INSERT INTO tags (name) VALUES ('Filler')"))
+        connection.execute(text("INSERT INTO tags (name) VALUES (:name)"), {'name': name})
+
+
+def _tag_names(session, entry_id):
+    session.expire_all()
+    return sorted(tag.name for tag in session.get(Entry, entry_id).tags)
+
+
+def test_change_entry_tags_relinks_a_tag_recreated_behind_the_cache(engine, session):
+    add_entries(session, [("First", "Body", datetime.datetime(2024, 1, 1), True, ["Work"]),
+                          ("Second", "Body", datetime.datetime(2024, 1, 2), True, [])])
+    tag_cache.lookup(session, ["Work"])
+    session.commit()
+    _recreate_elsewhere(engine, "Work")
+
+    entry = services.get_entry(session, 2)
+    changes = services.change_entry_tags(session, entry, add=["work"])
+    session.commit()
+
+    assert changes.added == ["Work"] and changes.created == []
+    assert _tag_names(session, 2) == ["Work"]
+    orphans = session.scalar(text("SELECT count(*) FROM entry_tag_association WHERE tag_id NOT IN (SELECT id FROM tags)"))
+    assert orphans == 0
+
+
+def test_change_entry_tags_never_links_a_reused_id_to_another_tag(engine, session):
+    add_entries(session, [("First", "Body", datetime.datetime(2024, 1, 1), True, ["Work"])])
+    tag_cache.lookup(session, ["Work"])
+    session.commit()
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM entry_tag_association"))
+        connection.execute(text("UPDATE tags SET name = 'Home' WHERE name = 'Work'"))
+
+    changes = services.change_entry_tags(session, services.get_entry(session, 1), add=["work"])
+    session.commit()
+
+    assert changes.created == ["Work"]
+    assert _tag_names(session, 1) == ["Work"]
+
+
+def test_bulk_add_tags_uses_the_current_tag_ids(engine, session):
+    add_entries(session, [("First", "Body", datetime.datetime(2024, 1, 1), True, ["Work"])])
+    tag_cache.lookup(session, ["Work"])
+    session.commit()
+    _recreate_elsewhere(engine, "Work")
+
+    result = bulk.add_tags(session, [], ["work"])
+
+    assert result.changed == 1
+    assert _tag_names(session, 1) == ["Work"]
+
+
+def test_delete_tag_forgets_the_cached_id(session):
+    tag, _ = services.create_tag(session, "work")
+    services.delete_tag(session, tag)
+
+    assert tag_cache.lookup(session, ["Work"]) == {}
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy.orm import Session
+from journal_app import services, transfer
+from .conftest import make_engine
+
+
+def test_import_skips_unparseable_jsonl_lines(session, tmp_path):
+    path = tmp_path / "entries.jsonl"
+    path.write_text(
+        '{"title": "First", "content": "one"}\n'
+        '{"title": "Broken", "content": \n'
+        '{"title": "Third", "content": "three"}\n',
+        encoding='utf-8',
+    )
+    errors = []
+    imported, _ = transfer.import_entries(session, str(path), errors=errors)
+    assert imported == 2
+    assert [number for number, _ in errors] == [2]
+    assert "line 2" in errors[0][1]
+    assert sorted(entry.title for entry in services.list_entries(session)) == ["First", "Third"]
+
+
+def _exported(session):
+    return [
+        {key: record[key] for key in ('title', 'content', 'is_private', 'tags')}
+        for record in transfer.iter_export_records(session)
+    ]
+
+
+def test_markdown_round_trip_keeps_separator_lines(session, tmp_path):
+    services.create_entry(session, "Rules", "Above\n---\nBelow\n\n---", False, ["Notes"])
+    services.create_entry(session, "Plain", "Just text", True, [])
+    path = tmp_path / "entries.md"
+    exported, _ = transfer.export_entries(session, str(path))
+    assert exported == 2
+
+    copy = make_engine(tmp_path / "copy.db")
+    try:
+        with Session(copy) as imported:
+            errors = []
+            count, _ = transfer.import_entries(imported, str(path), errors=errors)
+            assert (count, errors) == (2, [])
+            assert _exported(imported) == _exported(session)
+    finally:
+        copy.dispose()
+
+
+@pytest.mark.parametrize("name", ["entries.csv", "entries.md", "entries.jsonl"])
+def test_round_trip_keeps_tags_containing_commas(session, tmp_path, name):
+    services.create_entry(session, "Game", "Best of three", False, ["Rock, paper", "Scissors"])
+    path = tmp_path / name
+    transfer.export_entries(session, str(path))
+
+    copy = make_engine(tmp_path / "copy.db")
+    try:
+        with Session(copy) as imported:
+            errors = []
+            assert transfer.import_entries(imported, str(path), errors=errors)[0] == 1 and errors == []
+            assert _exported(imported)[0]['tags'] == ["Rock, paper", "Scissors"]
+    finally:
+        copy.dispose()
+
+
+def test_comma_separated_tags_still_import(session, tmp_path):
+    path = tmp_path / "entries.csv"
+    path.write_text("title,content,tags\nOld,From an older export,\"work, home\"\n", encoding='utf-8')
+    transfer.import_entries(session, str(path))
+    assert _exported(session)[0]['tags'] == ["Home", "Work"]